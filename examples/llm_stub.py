@@ -0,0 +1,77 @@
+"""
+Локальная заглушка LLM-сервиса для проверки анализа резюме без реальной модели.
+
+Запуск:  uvicorn examples.llm_stub:app --port 8001
+Затем:   LLM_SERVICE_URL=http://localhost:8001
+"""
+import asyncio
+import hashlib
+import os
+from typing import List
+
+from fastapi import FastAPI
+from pydantic import BaseModel
+
+# Имитация задержки модели: фиксированная часть на запрос + часть на каждое резюме
+REQUEST_DELAY = float(os.getenv("LLM_STUB_REQUEST_DELAY", 0.5))
+RESUME_DELAY = float(os.getenv("LLM_STUB_RESUME_DELAY", 0.1))
+
+app = FastAPI(title="LLM stub")
+
+
+class Message(BaseModel):
+    role: str
+    content: str
+
+
+class AnalyzeRequest(BaseModel):
+    messages: List[Message]
+
+
+class BatchResume(BaseModel):
+    id: str
+    resume_text: str
+
+
+class BatchAnalyzeRequest(BaseModel):
+    vacancy_text: str
+    resumes: List[BatchResume]
+
+
+def _fake_analysis(vacancy_text: str, resume_text: str) -> dict:
+    digest = hashlib.sha256(f"{vacancy_text}:{resume_text}".encode("utf-8")).hexdigest()
+    return {
+        "candidate_info": {
+            "fullname": f"Candidate {digest[:6]}",
+            "email": f"{digest[:8]}@example.com",
+        },
+        "analysis": {
+            "matching_percentage": int(digest[:2], 16) % 101,
+        },
+    }
+
+
+@app.post("/hr/analyze_cv_by_vacancy")
+async def analyze_cv_by_vacancy(request: AnalyzeRequest):
+    await asyncio.sleep(REQUEST_DELAY + RESUME_DELAY)
+    content = request.messages[-1].content
+    return {
+        "llm_response": _fake_analysis(content, content),
+        "tokens_spent": len(content) // 4 + 500,
+    }
+
+
+@app.post("/hr/analyze_cv_batch")
+async def analyze_cv_batch(request: BatchAnalyzeRequest):
+    await asyncio.sleep(REQUEST_DELAY + RESUME_DELAY * len(request.resumes))
+    return {
+        "results": [
+            {
+                "id": resume.id,
+                "llm_response": _fake_analysis(request.vacancy_text, resume.resume_text),
+                "tokens_spent": len(resume.resume_text) // 4 + 500,
+                "error": None,
+            }
+            for resume in request.resumes
+        ]
+    }
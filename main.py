@@ -24,6 +24,7 @@ from src.routers.api.v1.hh import hh_router
 from src.routers.api.v1.hr_agent import hr_agent_router
 from src.routers.api.v1.interview_common_question import interview_common_question_router
 from src.routers.api.v1.interview_individual_question import interview_individual_question_router
+from src.routers.api.v1.metrics import metrics_router
 from src.routers.api.v1.organization import organization_router
 from src.routers.api.v1.organization_member import organization_member_router
 from src.routers.api.v1.phone_interview import phone_interview_router
@@ -112,6 +113,7 @@ def create_app(create_custom_static_urls: bool = False) -> FastAPI:
     app.include_router(bank_card_router)
     app.include_router(whatsapp_instance_router)
     app.include_router(channels_router)
+    app.include_router(metrics_router)
 
     app.add_middleware(
         CORSMiddleware,
@@ -0,0 +1,42 @@
+"""added foreign key lookup indexes
+
+Revision ID: d5f0b8c3e916
+Revises: c71e4a9b2d35
+Create Date: 2025-05-02 09:27:51.604318
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'd5f0b8c3e916'
+down_revision: Union[str, None] = 'c71e4a9b2d35'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+# (имя индекса, таблица, колонки)
+INDEXES = [
+    ('ix_hr_assistant_tasks_task_id', 'hr_assistant_tasks', ['task_id']),
+    ('ix_favorite_resumes_resume_id', 'favorite_resumes', ['resume_id']),
+    ('ix_favorite_resumes_call_sid', 'favorite_resumes', ['call_sid']),
+    ('ix_vacancy_session_id', 'vacancy', ['session_id']),
+    ('ix_chat_history_messages_session_created', 'chat_history_messages', ['session_id', 'created_at']),
+    ('ix_balance_usage_user_org_created', 'balance_usage', ['user_id', 'organization_id', 'created_at']),
+    ('ix_organization_members_user_id', 'organization_members', ['user_id']),
+    ('ix_billing_transactions_invoice_id', 'billing_transactions', ['invoice_id']),
+]
+
+
+def upgrade() -> None:
+    # CREATE INDEX CONCURRENTLY не блокирует запись, но не работает внутри транзакции
+    with op.get_context().autocommit_block():
+        for name, table, columns in INDEXES:
+            op.create_index(name, table, columns, unique=False, postgresql_concurrently=True)
+
+
+def downgrade() -> None:
+    with op.get_context().autocommit_block():
+        for name, table, _ in reversed(INDEXES):
+            op.drop_index(name, table_name=table, postgresql_concurrently=True, if_exists=True)
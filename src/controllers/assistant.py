@@ -1,13 +1,17 @@
+from typing import Optional
+
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from src import repositories
 from src.core import exceptions
+from src.core.identity import IdentityContext
 
 
 class AssistantController:
 
-    def __init__(self, session: AsyncSession):
+    def __init__(self, session: AsyncSession, identity: Optional[IdentityContext] = None):
         self.session = session
+        self.identity = identity or IdentityContext(session)
         self.user_repo = repositories.UserRepository(session)
         self.assistant_session_repo = repositories.AssistantSessionRepository(session)
         self.assistant_repo = repositories.AssistantRepository(session)
@@ -55,7 +59,7 @@ class AssistantController:
         return await self.assistant_repo.get_all_assistants()
 
     async def _get_organization_assistant(self, user_id: int, assistant_id: int):
-        user_organization = await self.organization_repo.get_user_organization(user_id)
+        user_organization = await self.identity.get_organization(user_id)
         if user_organization is None:
             raise exceptions.BadRequestException("You dont have organization")
         assistant = await self.assistant_repo.get_assistant_by_id(assistant_id)
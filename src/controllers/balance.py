@@ -1,16 +1,18 @@
 import datetime
-from datetime import timedelta
+from typing import Optional
 
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from src import repositories
 from src.core.exceptions import NotFoundException
+from src.core.identity import IdentityContext
 
 
 class BalanceController:
 
-    def __init__(self, session: AsyncSession):
+    def __init__(self, session: AsyncSession, identity: Optional[IdentityContext] = None):
         self.session = session
+        self.identity = identity or IdentityContext(session)
         self.balance_repository = repositories.BalanceRepository(session)
         self.balance_usage_repository = repositories.BalanceUsageRepository(session)
         self.organization_repository = repositories.OrganizationRepository(session)
@@ -19,13 +21,13 @@ class BalanceController:
         self.cash_balance_repository = repositories.CashBalanceRepository(session)
 
     async def get_balance(self, user_id: int) -> dict:
-        user = await self.user_repository.get_by_user_id(user_id)
-        if user is None:
+        identity = await self.identity.get(user_id)
+        if identity is None:
             raise NotFoundException("User not found")
-        organization = await self.organization_repository.get_user_organization(user_id)
+        organization = identity.organization
         if organization is None:
             raise NotFoundException("Organization not found")
-        balance = await self.balance_repository.get_balance(organization.id)
+        balance = identity.balance
         if balance is None:
             balance = await self.balance_repository.create_balance({
                 "organization_id": organization.id,
@@ -36,24 +38,12 @@ class BalanceController:
             "free_trial": balance.free_trial
         }
 
-        organization_active_sub = await (
-            self
-            .organization_subscription_repository
-            .organization_active_subscription(
-                organization.id
-            )
-        )
-        if organization_active_sub:
-            subscription_end = organization_active_sub.bought_date + timedelta(
-                days=organization_active_sub
-                .subscription_plan.active_days
-            )
-
-            days_left = max((subscription_end - datetime.datetime.now()).days, 0)
+        if identity.active_subscription:
+            days_left = max((identity.subscription_expires_at - datetime.datetime.now()).days, 0)
 
             payload['subscription'] = {
                 "has_subscription": True,
-                "subscription": str(organization_active_sub.subscription_plan.subscription_name),
+                "subscription": str(identity.subscription_plan.subscription_name),
                 "days_left": str(days_left)
             }
         else:
@@ -66,10 +56,10 @@ class BalanceController:
         return payload
 
     async def get_balance_usage(self, user_id, assistant_id, start_date, end_date, limit, offset):
-        user = await self.user_repository.get_by_user_id(user_id)
-        if user is None:
+        identity = await self.identity.get(user_id)
+        if identity is None:
             raise NotFoundException("User not found")
-        organization = await self.organization_repository.get_user_organization(user_id)
+        user, organization = identity.user, identity.organization
         balance_usage = await self.balance_usage_repository.get_balance_usage(user.id, organization.id, assistant_id,
                                                                               start_date, end_date, limit, offset)
         return [
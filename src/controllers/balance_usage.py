@@ -1,14 +1,18 @@
+from typing import Optional
+
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from src import models
 from src import repositories
 from src.core import exceptions
+from src.core.identity import IdentityContext
 
 
 class BalanceUsageController:
 
-    def __init__(self, session: AsyncSession):
+    def __init__(self, session: AsyncSession, identity: Optional[IdentityContext] = None):
         self.session = session
+        self.identity = identity or IdentityContext(session)
         self.balance_usage_repository = repositories.BalanceUsageRepository(session)
         self.organization_repository = repositories.OrganizationRepository(session)
         self.user_repository = repositories.UserRepository(session)
@@ -19,10 +23,11 @@ class BalanceUsageController:
         return balance_usage
 
     async def get_balance_usage(self, user_id: int, assistant_id: int, start_date: str, end_date: str):
-        user = await self.user_repository.get_by_user_id(user_id)
-        if user is None:
+        identity = await self.identity.get(user_id)
+        if identity is None:
             raise exceptions.NotFoundException("User not found")
-        organization: models.Organization = await self.organization_repository.get_user_organization(user_id)
+        user = identity.user
+        organization: models.Organization = identity.organization
 
         balance_usage = await self.balance_usage_repository.get_balance_usage(
             user.id,
@@ -1,6 +1,7 @@
 import logging
 import uuid
 from datetime import datetime
+from typing import Optional
 
 import httpx
 from fastapi import File, HTTPException, UploadFile
@@ -8,6 +9,7 @@ from sqlalchemy.ext.asyncio import AsyncSession
 
 from src import repositories
 from src.core import exceptions
+from src.core.identity import IdentityContext
 from src.schemas.requests.billing import TopUpBillingRequest
 from src.services.minio import MinioUploader
 
@@ -17,8 +19,9 @@ logger = logging.getLogger(__name__)
 class BillingController:
     ATL_TOKEN_RATE = 230
 
-    def __init__(self, session: AsyncSession):
+    def __init__(self, session: AsyncSession, identity: Optional[IdentityContext] = None):
         self.session = session
+        self.identity = identity or IdentityContext(session)
         self.billing_transaction_repository = repositories.BillingTransactionRepository(session)
         self.balance_usage_repository = repositories.BalanceUsageRepository(session)
         self.balance_repository = repositories.BalanceRepository(session)
@@ -46,11 +49,11 @@ class BillingController:
             file: UploadFile = File(None)
     ):
         async with self.session.begin():
-            user = await self.user_repository.get_by_user_id(user_id)
-            if user is None:
+            identity = await self.identity.get(user_id)
+            if identity is None:
                 raise exceptions.NotFoundException("User not found")
 
-            organization = await self.organization_repository.get_user_organization(user_id)
+            user, organization = identity.user, identity.organization
             if organization is None:
                 raise exceptions.NotFoundException("Organization not found")
 
@@ -98,11 +101,11 @@ class BillingController:
     ):
         """Пополнение баланса через платежную систему"""
         async with self.session.begin():
-            user = await self.user_repository.get_by_user_id(user_id)
-            if user is None:
+            identity = await self.identity.get(user_id)
+            if identity is None:
                 raise exceptions.NotFoundException("User not found")
 
-            organization = await self.organization_repository.get_user_organization(user_id)
+            user, organization = identity.user, identity.organization
             if organization is None:
                 raise exceptions.NotFoundException("Organization not found")
 
@@ -237,13 +240,14 @@ class BillingController:
     ):
         logger.info(f"Starting refund process for user_id={user_id}, transaction_id={transaction_id}")
 
-        user = await self.user_repository.get_by_user_id(user_id)
+        identity = await self.identity.get(user_id)
+        user = identity.user if identity else None
         logger.info(f"User fetched: {user}")
         if user is None:
             logger.error("User not found")
             raise exceptions.NotFoundException("User not found")
 
-        organization = await self.organization_repository.get_user_organization(user_id)
+        organization = identity.organization
         logger.info(f"Organization fetched: {organization}")
         if organization is None:
             logger.error("Organization not found")
@@ -317,11 +321,11 @@ class BillingController:
                 raise HTTPException(status_code=400, detail=f"Unexpected error: {str(e)}")
 
     async def get_all_billing_transactions_by_organization_id(self, user_id: int, status: str, limit: int, offset: int):
-        user = await self.user_repository.get_by_user_id(user_id)
-        if user is None:
+        identity = await self.identity.get(user_id)
+        if identity is None:
             raise exceptions.NotFoundException("User not found")
 
-        organization = await self.organization_repository.get_user_organization(user_id)
+        organization = identity.organization
         if organization is None:
             raise exceptions.NotFoundException("Organization not found")
 
@@ -331,11 +335,11 @@ class BillingController:
         return billing_transactions
 
     async def get_refunds_application(self, user_id: int, status: str, limit: int | None, offset: int | None):
-        user = await self.user_repository.get_by_user_id(user_id)
-        if user is None:
+        identity = await self.identity.get(user_id)
+        if identity is None:
             raise exceptions.NotFoundException("User not found")
 
-        organization = await self.organization_repository.get_user_organization(user_id)
+        organization = identity.organization
         if organization is None:
             raise exceptions.NotFoundException("Organization not found")
 
@@ -413,10 +417,10 @@ class BillingController:
 
     async def buy_subscription(self, user_id: int, data: dict):
         async with self.session.begin():
-            user = await self.user_repository.get_by_user_id(user_id)
-            organization = await self.organization_repository.get_user_organization(user_id)
-            if organization is None:
+            identity = await self.identity.get(user_id)
+            if identity is None or identity.organization is None:
                 raise exceptions.NotFoundException("Organization not found")
+            user, organization = identity.user, identity.organization
 
             subscription = await self.subscription_repository.get_subscription_plan_by_id(
                 data['subscription_id']
@@ -424,11 +428,7 @@ class BillingController:
             if not subscription:
                 raise exceptions.BadRequestException("No subscription found")
 
-            organization_active_subscription = await self.organization_subscription_repository.organization_active_subscription(
-                organization.id
-            )
-
-            if organization_active_subscription:
+            if identity.active_subscription:
                 raise exceptions.BadRequestException("You already have an active subscription")
 
             price_to_pay = subscription.price
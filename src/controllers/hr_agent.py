@@ -1,13 +1,10 @@
 import asyncio
 import base64
-import csv
 import hashlib
 import json
 import os
 import uuid
-from datetime import datetime, timedelta
 from io import BytesIO
-from io import StringIO
 from typing import List, Optional
 from uuid import UUID
 
@@ -28,11 +25,13 @@ from sqlalchemy.ext.asyncio import AsyncSession
 from twilio.rest import Client
 
 from src.controllers.hh import HHController
-from src.core.backend import BackgroundTasksBackend
+from src.core.backend import BackgroundTasksBackend, decode_results_cursor, encode_results_cursor
 from src.core.dramatiq_worker import DramatiqWorker
 from src.core.exceptions import BadRequestException
 from src.core.exceptions import NotFoundException
+from src.core.identity import IdentityContext
 from src.core.settings import settings
+from src.repositories.analysis_result_cache import AnalysisResultCacheRepository
 from src.repositories.assistant import AssistantRepository
 from src.repositories.assistant_session import AssistantSessionRepository
 from src.repositories.balance import BalanceRepository
@@ -44,6 +43,7 @@ from src.repositories.hh import HHAccountRepository
 from src.repositories.interview_common_question import InterviewCommonQuestionRepository
 from src.repositories.interview_individual_question import InterviewIndividualQuestionRepository
 from src.repositories.organization import OrganizationRepository
+from src.repositories.outbox import OutboxRepository
 from src.repositories.user import UserRepository
 from src.repositories.vacancy import VacancyRepository
 from src.repositories.vacancy_requirement import VacancyRequirementRepository
@@ -51,14 +51,27 @@ from src.services.email import EmailService
 from src.services.extractor import AsyncTextExtractor
 from src.services.minio import MinioUploader
 from src.services.request_sender import RequestSender
+from src.services.resume_ingestion import IngestedResume, ResumeIngestionPipeline
+from src.services.results_exporter import (
+    CSV_MEDIA_TYPE,
+    XLSX_MEDIA_TYPE,
+    SessionResultsExporter,
+    parse_export_columns,
+)
 from src.services.websocket import manager
 
 
 class HRAgentController:
 
-    def __init__(self, session: AsyncSession, text_extractor: AsyncTextExtractor):
+    def __init__(
+            self,
+            session: AsyncSession,
+            text_extractor: AsyncTextExtractor,
+            identity: Optional[IdentityContext] = None
+    ):
         self.session = session
         self.text_extractor = text_extractor
+        self.identity = identity or IdentityContext(session)
         self.request_sender = RequestSender()
         self.user_repo = UserRepository(session)
         self.favorite_repo = FavoriteResumeRepository(session)
@@ -74,11 +87,13 @@ class HRAgentController:
         self.history_repo = ChatHistoryMessageRepository(session)
         self.organization_repo = OrganizationRepository(session)
         self.requirement_repo = VacancyRequirementRepository(session)
+        self.analysis_cache_repo = AnalysisResultCacheRepository(session)
         self.email_service = EmailService()
         self.balance_repo = BalanceRepository(session)
         self.balance_usage_repo = BalanceUsageRepository(session)
+        self.outbox_repo = OutboxRepository(session)
         self.hh_account_repository = HHAccountRepository(session)
-        self.headhunter_service = HHController(session)
+        self.headhunter_service = HHController(session, self.identity)
         self.TWILIO_ACCOUNT_SID = os.getenv("TWILIO_ACCOUNT_SID")
         self.TWILIO_SECRET = os.getenv("TWILIO_SECRET")
         self.TWILIO_AUTH_TOKEN = os.getenv("TWILIO_AUTH_TOKEN")
@@ -134,7 +149,8 @@ class HRAgentController:
         async with self.session.begin() as session:
             try:
 
-                user_organization = await self.organization_repo.get_user_organization(user_id)
+                identity = await self.identity.get(user_id)
+                user_organization = identity.organization if identity else None
                 if user_organization is None:
                     raise BadRequestException('You dont have organization')
                 user_organization_info = {
@@ -143,7 +159,7 @@ class HRAgentController:
                     'company_phone': user_organization.phone_number,
                     'company_email': user_organization.email
                 }
-                balance = await self.balance_repo.get_balance(user_organization.id)
+                balance = identity.balance
                 if balance is None:
                     raise BadRequestException('Balance not found')
                 if balance.atl_tokens < 5:
@@ -168,9 +184,6 @@ class HRAgentController:
                     "role": "user",
                     "content": f"{user_message} user info:{user_organization_info}"
                 })
-                balance = await self.balance_repo.get_balance(user_organization.id)
-                if balance is None:
-                    raise BadRequestException('Balance not found')
                 llm_response = await self.request_sender._send_request(
                     llm_url=f'{settings.LLM_SERVICE_URL}/hr/generate_vacancy',
                     data={"messages": messages}
@@ -317,7 +330,7 @@ class HRAgentController:
     async def session_creator(self, user_id: int, title: str):
         async with self.session.begin() as session:
             try:
-                user_organization = await self.organization_repo.get_user_organization(user_id)
+                user_organization = await self.identity.get_organization(user_id)
                 if user_organization is None:
                     raise BadRequestException("You dont have organization")
                 assistant = await self.assistant_repo.get_assistant_by_name("ИИ Рекрутер")
@@ -361,13 +374,10 @@ class HRAgentController:
                 }
             )
         if cv_task and cv_task.hh_file_url:
-            hh_account = await self.hh_account_repository.get_hh_account_by_user_id(user_id)
+            hh_account = await self.headhunter_service.credentials.get(user_id)
             if hh_account is None:
                 raise NotFoundException("HH account not found")
 
-            if datetime.utcnow() >= hh_account.expires_at - timedelta(minutes=5):
-                hh_account = await self.headhunter_service.refresh_token(user_id)
-
             headers = {"Authorization": f"Bearer {hh_account.access_token}"}
             async with httpx.AsyncClient() as client:
                 response = await client.get(cv_task.hh_file_url, headers=headers)
@@ -393,10 +403,11 @@ class HRAgentController:
             resumes: List[UploadFile],
     ):
         async with self.session.begin():
-            user_organization = await self.organization_repo.get_user_organization(user_id)
+            identity = await self.identity.get(user_id)
+            user_organization = identity.organization if identity else None
             if user_organization is None:
                 raise BadRequestException("You don't have an organization")
-            balance = await self.balance_repo.get_balance(user_organization.id)
+            balance = identity.balance
             if balance is None:
                 raise BadRequestException("Balance not found")
             if balance.atl_tokens < 5:
@@ -418,92 +429,83 @@ class HRAgentController:
             existing_vacancy = await self.requirement_repo.get_text_by_hash(vacancy_hash)
             if existing_vacancy:
                 vacancy_text = existing_vacancy.requirement_text
-            else:
-                await self.requirement_repo.create(
-                    {
-                        "session_id": session_id,
-                        "requirement_hash": vacancy_hash,
-                        "requirement_text": vacancy_text
-                    }
-                )
-
-            resume_texts = await asyncio.gather(
-                *[
-                    self.text_extractor.extract_text(
-                        resume
-                    ) for resume in resumes
-                ]
-            )
-            for resume in resumes:
-                resume.file.seek(0)
+            await self.requirement_repo.ensure_for_session(session_id, vacancy_hash, vacancy_text)
 
-            unique_hashes = set()
-            unique_batch = []
+        await self.minio_service.ensure_bucket_exists()
 
-            for resume, text in zip(resumes, resume_texts):
-                cleaned_text = text.strip()
-                text_hash = self.get_text_hash(cleaned_text)
+        total_files = len(resumes)
+        all_task_ids = []
 
-                if text_hash not in unique_hashes:
-                    unique_hashes.add(text_hash)
-                    unique_batch.append((resume, cleaned_text))
-
-            if not unique_batch:
-                raise BadRequestException("No unique resumes found")
-
-            unique_resumes = [resume for resume, _ in unique_batch]
-            minio_uploader = self.minio_service
-
-            try:
-                file_info = await minio_uploader.save_files_in_minio(
-                    unique_resumes,
-                    session_id
-                )
-            except BadRequestException as e:
-                raise e
-
-            total_files = len(unique_batch)
-            processed_count = 0
-            all_task_ids = []
-
-            for (resume, resume_text), (file_url, file_key) in zip(unique_batch, file_info):
-                balance = await self.balance_repo.get_balance(user_organization.id)
-                if balance.atl_tokens < 5:
-                    raise BadRequestException("Not enough tokens")
-
-                task_id = str(uuid.uuid4())
-                await self.bg_backend.create_task({
-                    "task_id": task_id,
-                    "session_id": session_id,
-                    "task_type": "hr cv analyze",
-                    "task_status": "pending",
-                    "file_key": str(file_key),
-                })
-                candidate_info = await self.candidate_info_repo.create_candidate_info(
+        async def enqueue_batch(batch: List[IngestedResume]):
+            # Каждая порция коммитится отдельно, чтобы воркеры могли начать
+            # анализ до того, как будет обработана вся пачка файлов.
+            # Баланс проверен один раз в начале запроса; окончательно средства
+            # резервирует воркер анализа (BalanceLedgerRepository.reserve)
+            async with self.session.begin():
+                task_ids = [str(uuid.uuid4()) for _ in batch]
+                await self.bg_backend.create_tasks([
+                    {
+                        "task_id": task_id,
+                        "session_id": session_id,
+                        "task_type": "hr cv analyze",
+                        "task_status": "pending",
+                        "file_key": str(item.file_key),
+                    }
+                    for task_id, item in zip(task_ids, batch)
+                ])
+                candidate_info_ids = await self.candidate_info_repo.bulk_create_candidate_info([
                     {
                         "is_hh": True,
-                        "resume_url": str(file_url),
+                        "resume_url": str(item.file_url),
                     }
-                )
-                DramatiqWorker.process_resume.send(
-                    task_id,
+                    for item in batch
+                ])
+                items = [
+                    {
+                        "task_id": task_id,
+                        "resume_text": item.text,
+                        "candidate_info_id": candidate_info_id
+                    }
+                    for task_id, item, candidate_info_id in zip(task_ids, batch, candidate_info_ids)
+                ]
+                # Сообщения уйдут воркерам через outbox только после коммита
+                await self.outbox_repo.add_messages(DramatiqWorker.build_analysis_messages(
+                    session_id,
                     vacancy_text,
-                    resume_text,
+                    items,
                     user_id,
                     user_organization.id,
                     balance.id,
-                    vacancy_text,
-                    candidate_info.id
-                )
-                processed_count += 1
-                await self.send_progress(
-                    user_id,
-                    processed_count=processed_count,
-                    total_files=total_files
-                )
-                all_task_ids.append(task_id)
+                    upload_size=total_files
+                ))
+
+            all_task_ids.extend(item["task_id"] for item in items)
+
+            await self.send_progress(
+                user_id,
+                processed_count=len(all_task_ids),
+                total_files=total_files
+            )
+
+        pipeline = ResumeIngestionPipeline(self.text_extractor, self.minio_service)
+        stats = await pipeline.run(resumes, session_id, enqueue_batch)
 
-            return {"session_id": session_id, "tasks": all_task_ids, "tasks_count": len(all_task_ids)}
+        if not all_task_ids:
+            raise BadRequestException("No unique resumes found")
+
+        # Если обработка прервалась на середине, уже созданные задачи остаются
+        # в работе — сообщаем о них вместе с кодом ошибки (подробности в логе),
+        # а не ошибкой всего запроса
+        return {
+            "session_id": session_id,
+            "tasks": all_task_ids,
+            "tasks_count": len(all_task_ids),
+            "duplicates_count": stats.duplicates,
+            "failed_files": stats.failed_files,
+            "empty_files": stats.empty_files,
+            "partial": stats.error is not None,
+            "error": stats.error,
+        }
 
     async def send_progress(self, user_id: int, processed_count: int, total_files: int):
         """Отправляет прогресс пользователю через WebSocket"""
@@ -513,21 +515,17 @@ class HRAgentController:
             "total_files": total_files,
             "progress_percent": round((processed_count / total_files) * 100, 2),
         }
-        await self.manager.send_json(user_id, progress_data)
+        await self.manager.send_progress(user_id, progress_data)
 
     async def ws_progress(self, websocket: WebSocket, user_id: int):
         await self.manager.connect(user_id, websocket)
-
-        print("12312321")
-        await self.manager.send_json(1, {"hi": "user"})
         try:
             while True:
-                await self.manager.send_json(123123, {"hi": "user"})
                 await websocket.receive_text()
         except Exception as e:
             print(f"WebSocket connection error: {e}")
         finally:
-            await self.manager.disconnect(user_id)
+            await self.manager.disconnect(user_id, websocket)
 
     async def delete_resume_by_session_id(self, user_id: int, session_id: str):
         try:
@@ -544,109 +542,63 @@ class HRAgentController:
         except Exception as e:
             raise e
 
-    async def export_to_csv(self, session_id: str):
-        results = await self.bg_backend.get_session_results_to_export(session_id)
-
-        csv_output = StringIO()
-        fieldnames = [
-            "fullname",
-            "gender",
-            "age",
-            "birth_date",
-            "phone_number",
-            "email",
-            "preferred_contact",
-            "location",
-            "languages",
-            "desired_position",
-            "specializations",
-            "employment_type",
-            "work_schedule",
-            "desired_salary",
-            "overall_years_experience",
-            "experience_details",
-            "education",
-            "skills",
-            "matching_percentage",
-            "overall_comment"
-        ]
-
-        writer = csv.DictWriter(csv_output, fieldnames=fieldnames, delimiter=';', quoting=csv.QUOTE_MINIMAL)
-        writer.writeheader()
+    async def invalidate_analysis_cache(self, user_id: int, session_id: str):
+        """Сбрасывает кэш LLM-анализа для резюме сессии, чтобы повторный запуск вызвал LLM заново"""
+        async with self.session.begin():
+            assistant_session = await self.assistant_session_repo.get_by_session_id(session_id)
+            if assistant_session is None:
+                raise NotFoundException("Assistant session not found")
+            if user_id != assistant_session.user_id:
+                raise BadRequestException('You dont have permission')
 
-        for result in results:
-            try:
-                if isinstance(result.result_data, str):
-                    result_data = json.loads(result.result_data)
-                else:
-                    result_data = result.result_data
-
-                candidate_info = result_data.get("candidate_info", {})
-                job_preferences = result_data.get("job_preferences", {})
-                analysis = result_data.get("analysis", {})
-                experience_obj = result_data.get("experience", {})
-                experience_list = experience_obj.get("details", [])
-                overall_years = experience_obj.get("overall_years", "")
-
-                experience_details = []
-                for exp in experience_list:
-                    duration = exp.get("duration", "N/A")
-                    company = exp.get("company_name", "N/A")
-                    role = exp.get("role", "")
-                    experience_details.append(f"{duration}, {company}, {role}")
-                experience_str = " | ".join(experience_details)
-
-                education_obj = result_data.get("education", {})
-                education_list = education_obj.get("degrees", [])
-                education_str = ", ".join(education_list)
-
-                skills_list = result_data.get("skills", [])
-                skills_str = ", ".join(skills_list)
-
-                languages_list = candidate_info.get("languages", [])
-                languages_str = ", ".join(languages_list)
-
-                row = {
-                    "fullname": candidate_info.get("fullname", ""),
-                    "gender": candidate_info.get("gender", ""),
-                    "age": candidate_info.get("age", ""),
-                    "birth_date": candidate_info.get("birth_date", ""),
-                    "phone_number": candidate_info.get("contacts", {}).get("phone_number", ""),
-                    "email": candidate_info.get("contacts", {}).get("email", ""),
-                    "preferred_contact": candidate_info.get("contacts", {}).get("preferred_contact", ""),
-                    "location": candidate_info.get("location", ""),
-                    "languages": languages_str,
-                    "desired_position": job_preferences.get("desired_position", ""),
-                    "specializations": ", ".join(job_preferences.get("specializations", [])),
-                    "employment_type": job_preferences.get("employment_type", ""),
-                    "work_schedule": job_preferences.get("work_schedule", ""),
-                    "desired_salary": job_preferences.get("desired_salary", ""),
-                    "overall_years_experience": overall_years,
-                    "experience_details": experience_str,
-                    "education": education_str,
-                    "skills": skills_str,
-                    "matching_percentage": analysis.get("matching_percentage", ""),
-                    "overall_comment": analysis.get("overall_comment", "")
-                }
+            resume_hashes = await self.bg_backend.get_text_hashes_by_session_id(session_id)
+            if not resume_hashes:
+                return {"success": True, "invalidated": 0}
+
+            requirements = await self.requirement_repo.get_by_session_id(session_id)
+            vacancy_hashes = [requirement.requirement_hash for requirement in requirements]
+            if not vacancy_hashes:
+                # Без вакансии сессии запись кэша не отличить от чужой — ничего не удаляем
+                return {"success": True, "invalidated": 0}
+            invalidated = await self.analysis_cache_repo.invalidate(
+                vacancy_hashes=vacancy_hashes,
+                resume_hashes=resume_hashes
+            )
+        return {"success": True, "invalidated": invalidated}
 
-                writer.writerow(row)
-            except Exception as e:
-                print(f"Error processing result with id={result.id}: {e}")
+    async def export_to_csv(self, session_id: str, export_format: str = "csv", columns: Optional[str] = None):
+        try:
+            selected_columns = parse_export_columns(columns)
+        except ValueError as e:
+            raise BadRequestException(str(e))
 
-        csv_output.seek(0)
-        csv_data = csv_output.getvalue()
+        exporter = SessionResultsExporter(session_id, selected_columns)
+        if export_format == "xlsx":
+            content, media_type = exporter.stream_xlsx(), XLSX_MEDIA_TYPE
+        else:
+            content, media_type = exporter.stream_csv(), CSV_MEDIA_TYPE
 
-        response = StreamingResponse(
-            iter([csv_data]),
-            media_type="text/csv"
-        )
-        response.headers["Content-Disposition"] = "attachment; filename=export.csv"
+        response = StreamingResponse(content, media_type=media_type)
+        response.headers["Content-Disposition"] = f"attachment; filename=export.{export_format}"
         return response
 
     async def get_cv_analyzer_result_by_session_id(self, session_id: str, user_id: int, offset: Optional[int],
-                                                   limit: Optional[int]):
-        results, total_results = await self.bg_backend.get_results_by_session_id(session_id, user_id, offset, limit)
+                                                   limit: Optional[int], cursor: Optional[str] = None):
+        decoded_cursor = None
+        if cursor:
+            try:
+                decoded_cursor = decode_results_cursor(cursor)
+            except Exception:
+                raise BadRequestException("Invalid cursor")
+
+        results, total_results = await self.bg_backend.get_results_by_session_id(
+            session_id, user_id, offset, limit, decoded_cursor
+        )
         is_completed = all([res[0].result_data is not None for res in results])
+        next_cursor = None
+        if len(results) == limit:
+            last_task = results[-1][0]
+            next_cursor = encode_results_cursor(last_task.score, last_task.id)
         return {
             "session_id": session_id,
             "results": [
@@ -662,7 +614,8 @@ class HRAgentController:
                 "total_results": total_results,
                 "offset": offset,
                 "limit": limit,
-                "total_pages": (total_results + limit - 1) // limit if limit else 1
+                "total_pages": (total_results + limit - 1) // limit if limit else 1,
+                "next_cursor": next_cursor
             },
             "is_completed": is_completed
         }
@@ -1,19 +1,27 @@
-from typing import Dict, Any
+from typing import Dict, Any, Optional
 
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from src.core.dramatiq_worker import DramatiqWorker
 from src.core.exceptions import NotFoundException, BadRequestException
+from src.core.identity import IdentityContext
 from src.models import InterviewIndividualQuestion, GenerateStatus
-from src.repositories import AssistantSessionRepository, AssistantRepository, OrganizationRepository, BalanceRepository
+from src.repositories import (
+    AssistantSessionRepository,
+    AssistantRepository,
+    OrganizationRepository,
+    BalanceRepository,
+    OutboxRepository,
+)
 from src.repositories.favorite_resume import FavoriteResumeRepository
 from src.repositories.interview_individual_question import InterviewIndividualQuestionRepository
 from src.repositories.question_generate_session import QuestionGenerateSessionRepository
 
 
 class InterviewIndividualQuestionController:
-    def __init__(self, session: AsyncSession):
+    def __init__(self, session: AsyncSession, identity: Optional[IdentityContext] = None):
         self.session = session
+        self.identity = identity or IdentityContext(session)
         self.interview_question_repo = InterviewIndividualQuestionRepository(session)
         self.favorite_resume_repo = FavoriteResumeRepository(session)
         self.session_repository = AssistantSessionRepository(session)
@@ -84,22 +92,25 @@ class InterviewIndividualQuestionController:
         if db_session:
             await self.question_generate_session_repository.delete(session_id)
         assistant = await self.assistant_repo.get_assistant_by_name("ИИ Рекрутер")
-        organization = await self.organization_repo.get_user_organization(user_id)
+        identity = await self.identity.get(user_id)
+        organization = identity.organization if identity else None
         if not organization:
             raise NotFoundException("Organization not found")
 
-        user_balance = await self.balance_repo.get_balance(organization.id)
+        user_balance = identity.balance
 
         try:
             await self.question_generate_session_repository.create(session_id)
+            await OutboxRepository(self.session).add_messages([
+                DramatiqWorker.generate_questions_task.message(
+                    session_id,
+                    user_id,
+                    assistant.id,
+                    organization.id,
+                    user_balance.id
+                )
+            ])
             await self.session.commit()
-            DramatiqWorker.generate_questions_task.send(
-                session_id,
-                user_id,
-                assistant.id,
-                organization.id,
-                user_balance.id
-            )
             return {"success": True}
         except Exception as e:
             await self.session.rollback()
@@ -15,13 +15,16 @@ from src.schemas.responses.auth import Token
 from src.repositories.user import UserRepository
 from src.repositories.organization import OrganizationRepository
 from src.repositories.role import RoleRepository
+from src.core.identity import IdentityContext
+from typing import Optional
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.exc import SQLAlchemyError
 
 class OrganizationController:
 
-    def __init__(self,session:AsyncSession):
+    def __init__(self,session:AsyncSession, identity: Optional[IdentityContext] = None):
         self.session = session
+        self.identity = identity or IdentityContext(session)
         self.user_repo = UserRepository(self.session)
         self.organization_repo = OrganizationRepository(self.session)
         self.organization_members_repo = OrganizationMemberRepository(self.session)
@@ -29,7 +32,7 @@ class OrganizationController:
 
     async def get_organization_info(self, user_id: int):
         try:
-            user_organization = await self.organization_repo.get_user_organization(user_id)
+            user_organization = await self.identity.get_organization(user_id)
             if user_organization is None:
                 raise BadRequestException(message="User is not a member of any organization.")
 
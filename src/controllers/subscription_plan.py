@@ -1,10 +1,14 @@
+from typing import Optional
+
 from src import repositories
 from src.core import exceptions
+from src.core.identity import IdentityContext
 
 
 class SubscriptionPlanController:
-    def __init__(self, session):
+    def __init__(self, session, identity: Optional[IdentityContext] = None):
         self.session = session
+        self.identity = identity or IdentityContext(session)
         self.subscription_plan_repository = repositories.SubscriptionPlanRepository(self.session)
         self.organization_subscription_repository = repositories.OrganizationSubscriptionRepository(self.session)
         self.balance_repository = repositories.BalanceRepository(self.session)
@@ -14,13 +18,11 @@ class SubscriptionPlanController:
         return await self.subscription_plan_repository.get_subscription_plans()
 
     async def get_organization_active_subscription(self, user_id):
-        organization = await self.organization_repository.get_user_organization(user_id)
-        if organization is None:
+        identity = await self.identity.get(user_id)
+        if identity is None or identity.organization is None:
             raise exceptions.NotFoundException("Organization not found")
 
-        organization_subscription = await self.organization_subscription_repository.organization_active_subscription(
-            organization.id
-        )
+        organization_subscription = identity.active_subscription
         if not organization_subscription:
             raise exceptions.BadRequestException("No active subscription found")
         return organization_subscription
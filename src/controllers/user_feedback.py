@@ -1,6 +1,9 @@
+from typing import Optional
+
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from src.core.exceptions import NotFoundException, BadRequestException
+from src.core.identity import IdentityContext
 from src.repositories.organization import OrganizationRepository
 from src.repositories.user import UserRepository
 from src.repositories.user_feedback import UserFeedbackRepository
@@ -8,18 +11,19 @@ from src.repositories.user_feedback import UserFeedbackRepository
 
 class UserFeedbackController:
 
-    def __init__(self, session: AsyncSession):
+    def __init__(self, session: AsyncSession, identity: Optional[IdentityContext] = None):
         self.session = session
+        self.identity = identity or IdentityContext(session)
         self.feedback_repo = UserFeedbackRepository(self.session)
         self.user_repo = UserRepository(self.session)
         self.organization_repo = OrganizationRepository(self.session)
 
     async def create_feedback(self, user_id, attributes: dict):
         async with self.session.begin():
-            user = await self.user_repo.get_by_user_id(user_id)
-            organization = await self.organization_repo.get_user_organization(user.id)
-            if user is None:
+            identity = await self.identity.get(user_id)
+            if identity is None:
                 raise NotFoundException('User Not found')
+            user, organization = identity.user, identity.organization
             if organization is None:
                 raise BadRequestException('You dont have organization')
             await self.feedback_repo.create({
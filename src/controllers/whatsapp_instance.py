@@ -1,11 +1,15 @@
+from typing import Optional
+
 from src import models, repositories
 from src.core import exceptions
+from src.core.identity import IdentityContext
 from src.services import green_api_cli
 
 
 class WhatsappInstanceController:
-    def __init__(self, session):
+    def __init__(self, session, identity: Optional[IdentityContext] = None):
         self.session = session
+        self.identity = identity or IdentityContext(session)
         self.user_repo = repositories.UserRepository(session)
         self.org_repo = repositories.OrganizationRepository(session)
         self.org_sub_repo = repositories.OrganizationSubscriptionRepository(session)
@@ -15,15 +19,15 @@ class WhatsappInstanceController:
         self.current_instance_repo = repositories.CurrentWhatsappInstanceRepository(session)
 
     async def add_whatsapp_instance(self, user_id: int):
-        user = await self.user_repo.get_by_user_id(user_id)
-        if not user:
+        identity = await self.identity.get(user_id)
+        if not identity:
             raise exceptions.NotFoundException("User not found")
 
-        organization = await self.org_repo.get_user_organization(user_id)
+        user, organization = identity.user, identity.organization
         if not organization:
             raise exceptions.NotFoundException("Organization not found")
 
-        org_sub = await self.org_sub_repo.organization_active_subscription(organization.id)
+        org_sub = identity.active_subscription
         if not org_sub:
             raise exceptions.BadRequestException("Active subscription required to connect instance")
 
@@ -89,11 +93,11 @@ class WhatsappInstanceController:
         return {"detail": "WhatsApp instance created successfully"}
 
     async def get_organization_instances(self, user_id: int):
-        user = await self.user_repo.get_by_user_id(user_id)
-        organization = await self.org_repo.get_user_organization(user_id)
-        if not organization:
+        identity = await self.identity.get(user_id)
+        if not identity or not identity.organization:
             raise exceptions.NotFoundException("Organization not found")
 
+        user, organization = identity.user, identity.organization
         if user.role.name == models.RoleEnum.ADMIN.value:
             return await self.instance_repo.get_all_by_organization(organization.id, True)
 
@@ -116,11 +120,11 @@ class WhatsappInstanceController:
         }
 
     async def get_instance_qr_code(self, user_id: int):
-        user = await self.user_repo.get_by_user_id(user_id)
-        if not user:
+        identity = await self.identity.get(user_id)
+        if not identity:
             raise exceptions.NotFoundException("User not found")
 
-        organization = await self.org_repo.get_user_organization(user_id)
+        user, organization = identity.user, identity.organization
         if not organization:
             raise exceptions.NotFoundException("Organization not found")
 
@@ -151,7 +155,7 @@ class WhatsappInstanceController:
         raise exceptions.BadRequestException(f"Instance in unexpected state: {state}")
 
     async def get_user_instance(self, user_id: int):
-        organization = await self.org_repo.get_user_organization(user_id)
+        organization = await self.identity.get_organization(user_id)
         if not organization:
             raise exceptions.NotFoundException("Organization not found")
 
@@ -1,66 +1,114 @@
+import logging
+from collections import defaultdict
 from datetime import datetime, timedelta
+from typing import Dict, List
 
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from src import repositories
-from src.services.green_api_instance_cli import GreenApiInstanceCli
+from src.core.dramatiq_worker import DramatiqWorker
+from src.core.settings import settings
+from src.services.http_clients import provider_session
+from src.services.whatsapp_bulk import OutgoingMessage, WhatsappBulkSender
+from src.services.whatsapp_webhooks import (
+    HANDLED_WEBHOOK_TYPES,
+    drop_duplicates,
+    mark_processed,
+    is_valid_webhook,
+    push_webhook,
+    whatsapp_instance_cache,
+)
+
+logger = logging.getLogger(__name__)
 
 
 class WhatsappWebhookController:
+    """
+    Вебхуки Green API.
+
+    accept_webhook только проверяет и кладёт событие в очередь Redis, чтобы
+    Green API сразу получил 200; process_webhooks разбирает очередь пачками
+    в воркере (DramatiqWorker.process_whatsapp_webhooks).
+    """
+
     def __init__(
             self,
             session: AsyncSession
     ):
-        print("[INIT] WhatsappWebhookController: Инициализация контроллера")
         self.session = session
         self.user_interaction_repo = repositories.UserInteractionRepository(session)
         self.whatsapp_instance_repo = repositories.WhatsappInstanceRepository(session)
-        self.green_api_instance_client = GreenApiInstanceCli()
-        self.session_repository = repositories.AssistantSessionRepository(session)
-
-    async def handle_incoming_webhook(self, data: dict) -> dict:
-        webhook_type = data.get("typeWebhook")
 
-        instance_id = str(data.get("instanceData", {}).get("idInstance"))
-        instance_wid = data.get("instanceData", {}).get("wid")
-        sender_chat_id = data.get("senderData", {}).get("chatId")
-        whatsapp_instance = await self.whatsapp_instance_repo.get_by_instance_id(instance_id)
-
-        sender = await self.user_interaction_repo.get_interaction_by_chat_id(str(sender_chat_id), whatsapp_instance.id)
-        print(sender)
-        if not sender:
-            return {}
-
-        if webhook_type == "incomingMessageReceived":
-            print(data)
-            return await self._handle_incoming_message(data, whatsapp_instance)
+    async def accept_webhook(self, data: dict) -> dict:
+        if not is_valid_webhook(data):
+            return {"error": "invalid webhook"}
+        if data["typeWebhook"] not in HANDLED_WEBHOOK_TYPES:
+            return {"status": "ignored"}
+
+        if await push_webhook(data):
+            DramatiqWorker.process_whatsapp_webhooks.send_with_options(delay=settings.WHATSAPP_WEBHOOK_BATCH_DELAY_MS)
+        return {"status": "accepted"}
+
+    async def process_webhooks(self, events: List[dict]) -> Dict[str, int]:
+        """
+        Обрабатывает пачку вебхуков: повторы по idMessage отбрасываются, инстансы
+        берутся из кэша, взаимодействия читаются одним запросом на инстанс.
+        Ответы кандидатам отправляются после коммита.
+        """
+        events = await drop_duplicates(events)
+        messages = [event for event in events if event.get("typeWebhook") == "incomingMessageReceived"]
+        if not messages:
+            await mark_processed(events)
+            return {"received": len(events), "replied": 0}
+
+        instances = await whatsapp_instance_cache.resolve(
+            self.whatsapp_instance_repo,
+            [str(event["instanceData"]["idInstance"]) for event in messages]
+        )
 
-        if webhook_type == "pollAnswer":
-            return await self._handle_poll_answer(data, whatsapp_instance)
+        by_instance = defaultdict(list)
+        for event in messages:
+            instance = instances.get(str(event["instanceData"]["idInstance"]))
+            if instance is None:
+                logger.warning(f"WhatsApp webhook: неизвестный инстанс {event['instanceData']['idInstance']}")
+                continue
+            by_instance[instance].append(event)
+
+        replies = defaultdict(list)
+        for instance, instance_events in by_instance.items():
+            chat_ids = list({
+                event.get("senderData", {}).get("chatId")
+                for event in instance_events
+                if event.get("senderData", {}).get("chatId")
+            })
+            interactions = await self.user_interaction_repo.get_last_interactions(chat_ids, instance.id)
+            for event in instance_events:
+                reply = await self._handle_incoming_message(event, interactions)
+                if reply:
+                    replies[instance].append(reply)
+        await self.session.commit()
+        await mark_processed(events)
 
-        return {"status": "ignored"}
+        replied = 0
+        async with provider_session("green_api") as http_session:
+            for instance, outgoing in replies.items():
+                sender = WhatsappBulkSender(instance.instance_id, instance.instance_token, http_session)
+                replied += len(await sender.send_all(outgoing))
+        return {"received": len(events), "replied": replied}
 
-    async def _handle_incoming_message(self, data: dict, instance) -> dict:
-        chat_id = data["senderData"].get("chatId")
+    async def _handle_incoming_message(self, data: dict, interactions: dict):
+        chat_id = data.get("senderData", {}).get("chatId")
         message_text = data.get("messageData", {}).get("textMessageData", {}).get("textMessage", "")
 
         if not chat_id or not message_text:
-            return {"status": "no_chat_id_or_text"}
+            return None
 
-        interaction = await self.user_interaction_repo.get_not_answered_by_chat(
-            chat_id,
-            instance.id,
-            "RESUME_OFFER"
-        )
-        if not interaction:
-            return {"status": "no_interaction"}
-        print(interaction)
-        if interaction.is_answered:
-            return {"status": "already_answered"}
+        interaction = interactions.get(chat_id)
+        if not interaction or interaction.is_answered:
+            return None
 
         if interaction.created_at + timedelta(hours=24) < datetime.utcnow():
-            print("HELLLLLOOOOO")
-            return {"status": "time expired"}
+            return None
 
         user_answer = message_text.strip()
 
@@ -71,6 +119,8 @@ class WhatsappWebhookController:
                 "https://calendly.com/main-atlantys/30min"
             )
             await self.user_interaction_repo.mark_answered(interaction.id, chat_id, True)
+            # Следующие сообщения этого чата в пачке видят уже отвеченное взаимодействие
+            interaction.is_answered = True
 
         elif user_answer == "2":
             reply = (
@@ -81,15 +131,5 @@ class WhatsappWebhookController:
 
         else:
             reply = "Пожалуйста, отправьте «1» или «2», чтобы выбрать один из вариантов."
-        if instance:
-            await self.green_api_instance_client.send_message(
-                data={"chat_id": chat_id, "message": reply},
-                instance_id=instance.instance_id,
-                instance_token=instance.instance_token
-            )
-
-        await self.session.commit()
-        return {"status": "message_received", "reply": reply}
 
-    async def _handle_poll_answer(self, data: dict, instance) -> dict:
-        return {"status": "poll_answer_handled"}
+        return OutgoingMessage(chat_id, reply)
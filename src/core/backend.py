@@ -1,13 +1,40 @@
-from typing import List
+import base64
+from typing import Dict, List, Optional, Tuple
 from fastapi import Depends
 from sqlalchemy.ext.asyncio import AsyncSession
 from src.models.favorite_resume import FavoriteResume
 from src.models.hr_assistant_task import HRTask
-from sqlalchemy import Integer, case, cast, func, insert,select
+from sqlalchemy import Integer, bindparam, case, cast, func, insert, select, tuple_, update
 from src.core.databases import get_session
 from sqlalchemy import desc, case, cast, Integer
 from sqlalchemy.dialects.postgresql import JSONB
 from sqlalchemy.orm import joinedload
+from src.services.helpers import parse_matching_percentage
+
+# Значение HRTask.score для задач без результата (pending / failed)
+NO_SCORE = -1
+
+
+def get_task_score(result_data: Optional[dict], status: str) -> int:
+    """Оценка для сортировки результатов: matching_percentage завершённой задачи, иначе NO_SCORE"""
+    if status != "completed":
+        return NO_SCORE
+    try:
+        value = (result_data or {}).get("analysis", {}).get("matching_percentage", 0)
+    except AttributeError:
+        return 0
+    return parse_matching_percentage(value)
+
+
+def encode_results_cursor(score: int, task_id: int) -> str:
+    return base64.urlsafe_b64encode(f"{score}:{task_id}".encode()).decode()
+
+
+def decode_results_cursor(cursor: str) -> Tuple[int, int]:
+    score, task_id = base64.urlsafe_b64decode(cursor.encode()).decode().split(":")
+    return int(score), int(task_id)
+
+
 class BackgroundTasksBackend:
 
     def __init__ (self,session: AsyncSession):
@@ -28,53 +55,167 @@ class BackgroundTasksBackend:
         # Возвращаем сохраненный объект
         return task
 
-    async def update_task_result(self, task_id: str, result_data: dict, tokens_spent: int, status: str = 'completed'):
+    async def create_tasks(self, rows: List[dict]) -> List[int]:
+        """
+        Создаёт задачи одним многострочным INSERT ... RETURNING (SQLAlchemy сам
+        режет очень большие пачки на несколько запросов). Возвращает id в порядке rows.
+        """
+        if not rows:
+            return []
+        result = await self.session.execute(
+            insert(HRTask).returning(HRTask.id, sort_by_parameter_order=True),
+            rows
+        )
+        return list(result.scalars().all())
+
+    async def update_task_result(
+            self,
+            task_id: str,
+            result_data: dict,
+            tokens_spent: int,
+            status: str = 'completed',
+            text_hash: str = None
+    ):
         stmt = await self.session.execute(select(HRTask).where(HRTask.task_id == task_id))
         task = stmt.scalars().first()
         if task:
             task.result_data = result_data
             task.task_status = status
-            task.tokens_spent = tokens_spent        
+            task.tokens_spent = tokens_spent
+            task.score = get_task_score(result_data, status)
+            if text_hash is not None:
+                task.text_hash = text_hash
+
+
+    async def bulk_update_task_results(self, results: List[dict]):
+        """
+        Обновляет результаты нескольких задач одним executemany.
+        Элементы: task_id, result_data, tokens_spent, task_status, text_hash.
+        """
+        if not results:
+            return
+        table = HRTask.__table__
+        stmt = (
+            update(table)
+            .where(table.c.task_id == bindparam('b_task_id'))
+            .values(
+                result_data=bindparam('b_result_data'),
+                tokens_spent=bindparam('b_tokens_spent'),
+                task_status=bindparam('b_task_status'),
+                text_hash=bindparam('b_text_hash'),
+                score=bindparam('b_score'),
+            )
+        )
+        await self.session.execute(stmt, [
+            {
+                'b_task_id': item['task_id'],
+                'b_result_data': item['result_data'],
+                'b_tokens_spent': item['tokens_spent'],
+                'b_task_status': item['task_status'],
+                'b_text_hash': item.get('text_hash'),
+                'b_score': get_task_score(item['result_data'], item['task_status']),
+            }
+            for item in results
+        ])
+
+    async def get_text_hashes_by_session_id(self, session_id: str) -> list[str]:
+        result = await self.session.execute(
+            select(HRTask.text_hash)
+            .where(HRTask.session_id == session_id, HRTask.text_hash.isnot(None))
+            .distinct()
+        )
+        return list(result.scalars().all())
 
+    async def get_tasks_by_resume_ids(
+            self,
+            session_id: str,
+            vacancy_id: int,
+            resume_ids: List[str]
+    ) -> Dict[str, Tuple[str, Optional[str], Optional[int]]]:
+        """
+        resume_id -> (task_id, text_hash, candidate_info_id) для уже созданных
+        задач сессии по этой вакансии
+        """
+        if not resume_ids:
+            return {}
+        result = await self.session.execute(
+            select(HRTask.resume_id, HRTask.task_id, HRTask.text_hash, HRTask.candidate_info_id).where(
+                HRTask.session_id == session_id,
+                HRTask.vacancy_id == vacancy_id,
+                HRTask.resume_id.in_(resume_ids)
+            )
+        )
+        return {resume_id: tuple(row) for resume_id, *row in result.all()}
+
+    async def reset_task(self, task_id: str, attributes: dict = None):
+        """Возвращает задачу в pending для повторного анализа"""
+        await self.session.execute(
+            update(HRTask)
+            .where(HRTask.task_id == task_id)
+            .values(
+                task_status="pending",
+                result_data=None,
+                tokens_spent=None,
+                text_hash=None,
+                score=NO_SCORE,
+                **(attributes or {})
+            )
+        )
 
-    async def get_results_by_session_id(self, session_id: str, user_id: int, offset: int = 0, limit: int = 10):
+    async def get_results_by_session_id(
+            self,
+            session_id: str,
+            user_id: int,
+            offset: int = 0,
+            limit: int = 10,
+            cursor: Optional[Tuple[int, int]] = None
+    ):
+        """
+        Страница результатов сессии: сначала завершённые задачи по убыванию
+        score, затем остальные. Сортировка и пагинация выполняются в БД по
+        индексу (session_id, score, id); при переданном cursor (score, id)
+        используется keyset-пагинация вместо offset.
+        Возвращает (строки, общее число задач сессии).
+        """
         favorite_subquery = (
             select(FavoriteResume.resume_id)
             .where(FavoriteResume.user_id == user_id)
             .subquery()
         )
-
-        # Подсчет общего количества записей
-        total_query = select(func.count()).where(HRTask.session_id == session_id)
-        total_results = await self.session.scalar(total_query)  # Получаем общее количество
+        # Общее количество считается в том же запросе
+        total_subquery = (
+            select(func.count())
+            .select_from(HRTask)
+            .where(HRTask.session_id == session_id)
+            .scalar_subquery()
+        )
 
         query = (
             select(
                 HRTask,
-                favorite_subquery.c.resume_id.isnot(None).label("is_favorite")
+                favorite_subquery.c.resume_id.isnot(None).label("is_favorite"),
+                total_subquery.label("total_results")
             )
             .outerjoin(
                 favorite_subquery,
                 HRTask.id == favorite_subquery.c.resume_id
             )
             .where(HRTask.session_id == session_id)
+            .order_by(HRTask.score.desc(), HRTask.id.desc())
+            .limit(limit)
         )
+        if cursor is not None:
+            query = query.where(tuple_(HRTask.score, HRTask.id) < tuple_(*cursor))
+        else:
+            query = query.offset(offset)
 
         result = await self.session.execute(query)
-        tasks = result.all()
-
-        sorted_tasks = sorted(
-            tasks,
-            key=lambda task: (
-                task[0].task_status == "completed",
-                int(task[0].result_data.get("analysis", {}).get("matching_percentage", 0)) if task[0].result_data else 0
-            ),
-            reverse=True
-        )
-
-        paginated_tasks = sorted_tasks[offset:offset + limit]
-
-        return paginated_tasks, total_results  
+        rows = result.all()
+        if rows:
+            total_results = rows[0].total_results
+        else:
+            total_results = await self.session.scalar(select(total_subquery))
+        return [(row[0], row[1]) for row in rows], total_results
 
     async def get_results_by_session_id_ws(self,session_id:int)-> List[HRTask]:
 
@@ -0,0 +1,257 @@
+import inspect
+import logging
+import time
+
+import dramatiq
+from dramatiq.asyncio import get_event_loop_thread
+from dramatiq.middleware import SkipMessage
+
+from src.core.settings import settings
+
+logger = logging.getLogger(__name__)
+
+
+class LLMClientMiddleware(dramatiq.Middleware):
+    """
+    Поднимает общий пул соединений к LLM-сервису в event loop воркера.
+
+    Должен добавляться после AsyncIO: цикл событий запускается в
+    before_worker_boot, а клиент создаём уже внутри него.
+    """
+
+    def after_worker_boot(self, broker, worker):
+        from src.services.llm_client import start_llm_client
+
+        get_event_loop_thread().run_coroutine(start_llm_client())
+
+    def before_worker_shutdown(self, broker, worker):
+        from src.services.llm_client import stop_llm_client
+
+        event_loop_thread = get_event_loop_thread()
+        if event_loop_thread is not None:
+            try:
+                event_loop_thread.run_coroutine(stop_llm_client())
+            except Exception as e:
+                logger.warning(f"Failed to close LLM client: {e}")
+
+
+class HHClientMiddleware(dramatiq.Middleware):
+    """Общий клиент HH API в event loop воркера (см. LLMClientMiddleware)"""
+
+    def after_worker_boot(self, broker, worker):
+        from src.services.hh_client import start_hh_client
+
+        get_event_loop_thread().run_coroutine(start_hh_client())
+
+    def before_worker_shutdown(self, broker, worker):
+        from src.services.hh_client import stop_hh_client
+
+        event_loop_thread = get_event_loop_thread()
+        if event_loop_thread is not None:
+            try:
+                event_loop_thread.run_coroutine(stop_hh_client())
+            except Exception as e:
+                logger.warning(f"Failed to close HH client: {e}")
+
+
+class HTTPClientsMiddleware(dramatiq.Middleware):
+    """Общий пул исходящих HTTP-соединений к внешним API в event loop воркера"""
+
+    def after_worker_boot(self, broker, worker):
+        from src.services.http_clients import start_http_clients
+
+        get_event_loop_thread().run_coroutine(start_http_clients())
+
+    def before_worker_shutdown(self, broker, worker):
+        from src.services.http_clients import stop_http_clients
+
+        event_loop_thread = get_event_loop_thread()
+        if event_loop_thread is not None:
+            try:
+                event_loop_thread.run_coroutine(stop_http_clients())
+            except Exception as e:
+                logger.warning(f"Failed to close outbound HTTP clients: {e}")
+
+
+TENANT_QUEUED_KEY = "dramatiq:tenants:queued"
+
+
+def tenant_inflight_key(tenant) -> str:
+    return f"dramatiq:tenants:inflight:{tenant}"
+
+
+def tenant_stats_key(tenant) -> str:
+    return f"dramatiq:tenants:stats:{tenant}"
+
+
+_ACQUIRE_SLOT_LUA = """
+redis.call('ZREMRANGEBYSCORE', KEYS[1], '-inf', ARGV[1])
+if redis.call('ZCARD', KEYS[1]) < tonumber(ARGV[2]) then
+    redis.call('ZADD', KEYS[1], ARGV[3], ARGV[4])
+    redis.call('EXPIRE', KEYS[1], ARGV[5])
+    return 1
+end
+return 0
+"""
+
+# Уменьшает глубину очереди организации и удаляет поле, когда она дошла до нуля.
+# Отрицательное значение (сообщение взято раньше, чем учтено after_enqueue)
+# остаётся, чтобы следующий HINCRBY его скомпенсировал.
+_DEQUEUE_LUA = """
+local depth = redis.call('HINCRBY', KEYS[1], ARGV[1], -1)
+if depth == 0 then
+    redis.call('HDEL', KEYS[1], ARGV[1])
+end
+return depth
+"""
+
+
+class TenantFairnessMiddleware(dramatiq.Middleware):
+    """
+    Ограничивает число одновременно выполняемых сообщений одной организации.
+
+    Актор включается опцией tenant_arg — именем аргумента с organization_id.
+    Сообщение организации, у которой уже TENANT_MAX_IN_FLIGHT сообщений в
+    работе, возвращается в конец очереди с задержкой TENANT_DEFER_MS, и
+    воркеры тем временем берут сообщения других организаций — так большая
+    загрузка одного клиента чередуется с остальными, а не занимает все потоки.
+
+    Слоты — sorted set в Redis брокера с истечением аренды, поэтому лимит общий
+    для всех процессов. По каждой организации ведутся глубина очереди, число
+    отложенных сообщений и время ожидания (см. get_tenant_queue_stats).
+    При недоступности Redis сообщения обрабатываются без ограничений.
+    """
+
+    actor_options = {"tenant_arg"}
+
+    def __init__(
+        self,
+        max_in_flight: int = settings.TENANT_MAX_IN_FLIGHT,
+        defer_ms: int = settings.TENANT_DEFER_MS,
+    ):
+        self.max_in_flight = max_in_flight
+        self.defer_ms = defer_ms
+        self._acquire_script = None
+        self._dequeue_script = None
+        self._arg_positions = {}
+
+    def _tenant(self, broker, message):
+        try:
+            actor = broker.get_actor(message.actor_name)
+        except dramatiq.ActorNotFound:
+            return None
+        arg = actor.options.get("tenant_arg")
+        if arg is None:
+            return None
+        if arg in message.kwargs:
+            return message.kwargs[arg]
+        position = self._arg_positions.get(actor.actor_name)
+        if position is None:
+            position = list(inspect.signature(actor.fn).parameters).index(arg)
+            self._arg_positions[actor.actor_name] = position
+        return message.args[position] if position < len(message.args) else None
+
+    def after_enqueue(self, broker, message, delay):
+        # Отложенные сообщения считаются, когда брокер вернёт их в основную очередь
+        if delay is not None:
+            return
+        tenant = self._tenant(broker, message)
+        if tenant is None:
+            return
+        try:
+            broker.client.hincrby(TENANT_QUEUED_KEY, tenant, 1)
+        except Exception as e:
+            logger.warning(f"Tenant queue depth update failed: {e}")
+
+    def before_process_message(self, broker, message):
+        tenant = self._tenant(broker, message)
+        if tenant is None:
+            return
+        now = time.time()
+        try:
+            if self._acquire_script is None:
+                self._acquire_script = broker.client.register_script(_ACQUIRE_SLOT_LUA)
+                self._dequeue_script = broker.client.register_script(_DEQUEUE_LUA)
+            with broker.client.pipeline(transaction=False) as pipeline:
+                self._dequeue_script(keys=[TENANT_QUEUED_KEY], args=[tenant], client=pipeline)
+                self._acquire_script(
+                    keys=[tenant_inflight_key(tenant)],
+                    args=[now, self.max_in_flight, now + settings.TENANT_LEASE_SECONDS, message.message_id,
+                          settings.TENANT_LEASE_SECONDS],
+                    client=pipeline,
+                )
+                _, acquired = pipeline.execute()
+        except Exception as e:
+            logger.warning(f"Tenant slot acquisition failed, processing without limit: {e}")
+            return
+
+        if not acquired:
+            broker.enqueue(message.copy(), delay=self.defer_ms)
+            self._record(broker, tenant, deferred=1)
+            raise SkipMessage(f"Organization {tenant} is at its in-flight limit")
+
+        self._record(broker, tenant, started=1, wait_ms=max(int(now * 1000) - message.message_timestamp, 0))
+
+    @staticmethod
+    def _record(broker, tenant, deferred=0, started=0, wait_ms=None):
+        stats_key = tenant_stats_key(tenant)
+        try:
+            with broker.client.pipeline(transaction=False) as pipeline:
+                if deferred:
+                    pipeline.hincrby(stats_key, "deferred", deferred)
+                if started:
+                    pipeline.hincrby(stats_key, "started", started)
+                    pipeline.hincrby(stats_key, "wait_ms_total", wait_ms)
+                    pipeline.hset(stats_key, "last_wait_ms", wait_ms)
+                pipeline.expire(stats_key, settings.TENANT_STATS_TTL)
+                pipeline.execute()
+        except Exception as e:
+            logger.warning(f"Tenant stats update failed: {e}")
+
+    def _release(self, broker, message):
+        tenant = self._tenant(broker, message)
+        if tenant is None:
+            return
+        try:
+            broker.client.zrem(tenant_inflight_key(tenant), message.message_id)
+        except Exception as e:
+            logger.warning(f"Tenant slot release failed: {e}")
+
+    def after_process_message(self, broker, message, *, result=None, exception=None):
+        self._release(broker, message)
+
+    def after_skip_message(self, broker, message):
+        self._release(broker, message)
+
+
+def get_tenant_queue_stats(client) -> dict:
+    """
+    Глубина очереди, занятые слоты и время ожидания по организациям.
+    client — синхронный клиент Redis брокера (redis_broker.client).
+    """
+    queued = client.hgetall(TENANT_QUEUED_KEY)
+    tenants = [tenant.decode() if isinstance(tenant, bytes) else tenant for tenant in queued]
+    now = time.time()
+    with client.pipeline(transaction=False) as pipeline:
+        for tenant in tenants:
+            pipeline.zcount(tenant_inflight_key(tenant), now, "+inf")
+            pipeline.hgetall(tenant_stats_key(tenant))
+        replies = pipeline.execute()
+
+    stats = {}
+    for index, (tenant, depth) in enumerate(zip(tenants, queued.values())):
+        in_flight, counters = replies[2 * index], replies[2 * index + 1]
+        counters = {
+            (key.decode() if isinstance(key, bytes) else key): int(value)
+            for key, value in counters.items()
+        }
+        started = counters.get("started", 0)
+        stats[tenant] = {
+            "queued": max(int(depth), 0),
+            "in_flight": in_flight,
+            "started": started,
+            "deferred": counters.get("deferred", 0),
+            "avg_wait_ms": round(counters.get("wait_ms_total", 0) / started) if started else None,
+            "last_wait_ms": counters.get("last_wait_ms"),
+        }
+    return {"max_in_flight": settings.TENANT_MAX_IN_FLIGHT, "tenants": stats}
@@ -1,31 +1,66 @@
+import asyncio
 import logging
+import uuid
 from datetime import datetime, timedelta
+from typing import List
 
 import dramatiq
-from dramatiq.brokers.redis import RedisBroker
 from dramatiq.middleware import time_limit
 from dramatiq.middleware.asyncio import AsyncIO
 
 from src.core.databases import session_manager
+from src.core.dramatiq_broker import PipelinedRedisBroker
+from src.core.dramatiq_middlewares import (
+    HHClientMiddleware,
+    HTTPClientsMiddleware,
+    LLMClientMiddleware,
+    TenantFairnessMiddleware,
+)
+from src.core.settings import settings
 from src.models import GenerateStatus
 from src.repositories import HHAccountRepository
+from src.repositories.balance_ledger import BATCH_REFERENCE_PREFIX, InsufficientFundsError
 from src.repositories.candidate_info import CandidateInfoRepository
+from src.repositories.outbox import OutboxRepository
 from src.services.head_hunter_cli import HeadHunterCLI
+from src.services.helpers import get_text_hash
 from src.services.request_sender import RequestSender
 from src.services.websocket import manager
 
 logger = logging.getLogger(__name__)
 
-redis_broker = RedisBroker(host="redis", port=6379)
+# Порядок откликов для инкрементальной синхронизации HH: сначала изменённые последними
+HH_NEGOTIATIONS_NEWEST_FIRST = {"order_by": "updated_at", "order": "desc"}
+
+# Полосы анализа резюме: небольшие загрузки идут в интерактивную очередь и
+# обгоняют массовые (у воркера меньшее значение priority обрабатывается раньше)
+ANALYSIS_INTERACTIVE_QUEUE = "analysis_interactive"
+ANALYSIS_BULK_QUEUE = "analysis_bulk"
+ANALYSIS_INTERACTIVE_PRIORITY = 0
+ANALYSIS_BULK_PRIORITY = 100
+
+redis_broker = PipelinedRedisBroker(host="redis", port=6379)
 redis_broker.add_middleware(AsyncIO())
 redis_broker.add_middleware(time_limit.TimeLimit())
+redis_broker.add_middleware(LLMClientMiddleware())
+redis_broker.add_middleware(HHClientMiddleware())
+redis_broker.add_middleware(HTTPClientsMiddleware())
+redis_broker.add_middleware(TenantFairnessMiddleware())
 dramatiq.set_broker(redis_broker)
 
 
 class DramatiqWorker:
 
     @staticmethod
-    @dramatiq.actor(max_retries=3, min_backoff=1000)
+    @dramatiq.actor(
+        max_retries=3,
+        min_backoff=1000,
+        # Повтор не поможет, пока баланс не пополнен
+        throws=(InsufficientFundsError,),
+        queue_name=ANALYSIS_BULK_QUEUE,
+        priority=ANALYSIS_BULK_PRIORITY,
+        tenant_arg="organization_id",
+    )
     async def process_resume(
             task_id: str,
             vacancy_text: str,
@@ -39,34 +74,69 @@ class DramatiqWorker:
     ):
         from src.core.backend import BackgroundTasksBackend
         from src.repositories import AssistantRepository
-        from src.repositories import BalanceRepository
         from src.repositories import BalanceUsageRepository
+        from src.repositories import AnalysisResultCacheRepository
+        from src.repositories import BalanceLedgerRepository
         from src.services.request_sender import RequestSender
         from src.core.databases import session_manager
         logging.info(f"Начало задачи {task_id} для user_id={user_id}")
 
+        reservation_id = None
         try:
+            reservation_id = await DramatiqWorker._reserve_tokens(
+                organization_id,
+                settings.ANALYSIS_RESERVE_ATL_TOKENS,
+                reference=task_id
+            )
+
+            vacancy_hash = get_text_hash(vacancy_text)
+            resume_hash = get_text_hash(resume_text)
+            cache_version = settings.analysis_cache_version
+
+            # Кэш читается обычным SELECT, а LLM вызывается вне транзакции:
+            # ни строки кэша, ни соединение из пула не держатся на время запроса к LLM
+            async with session_manager.session() as session:
+                cached = await AnalysisResultCacheRepository(session).get(vacancy_hash, resume_hash, cache_version)
+
+            if cached is not None:
+                # Эта пара уже анализировалась — LLM не вызываем,
+                # списываем долю исходной стоимости согласно настройке.
+                logging.info(f"Задача {task_id}: результат взят из кэша анализа")
+                llm_response = cached.result_data
+                task_tokens = cached.tokens_spent
+                gpt_tokens = 0
+                atl_tokens = round(cached.tokens_spent * settings.ANALYSIS_CACHE_BILLING_RATE / 3000, 2)
+            else:
+                prompt = [{"role": "user", "content": f"vacancy_text:{vacancy_text} resume_text:{resume_text}"}]
+                response_data = await RequestSender()._send_request(data={'messages': prompt})
+
+                if not response_data or "llm_response" not in response_data or response_data.get("error"):
+                    raise ValueError("Некорректный ответ от LLM")
+
+                llm_response = response_data["llm_response"]
+                task_tokens = gpt_tokens = response_data.get("tokens_spent", 0)
+                atl_tokens = round(gpt_tokens / 3000, 2)
+
             async with session_manager.session() as session:
                 async with session.begin():
                     bg_session = BackgroundTasksBackend(session)
-                    balance_repo = BalanceRepository(session)
+                    ledger_repo = BalanceLedgerRepository(session)
                     assistant_repo = AssistantRepository(session)
                     usage_repo = BalanceUsageRepository(session)
-                    llm_service = RequestSender()
                     candidate_info = CandidateInfoRepository(session)
+                    cache_repo = AnalysisResultCacheRepository(session)
 
-                    balance = await balance_repo.get_balance(organization_id)
-                    if balance.atl_tokens < 5:
-                        raise ValueError(f"Недостаточно ATL токенов: {balance.atl_tokens} < 5")
-
-                    prompt = [{"role": "user", "content": f"vacancy_text:{vacancy_text} resume_text:{resume_text}"}]
-                    response_data = await llm_service._send_request(data={'messages': prompt})
-
-                    if not response_data or "llm_response" not in response_data or response_data.get("error"):
-                        raise ValueError("Некорректный ответ от LLM")
-
-                    llm_tokens = response_data.get("tokens_spent", 0)
-                    atl_tokens = round(llm_tokens / 3000, 2)
+                    if cached is not None:
+                        await cache_repo.record_hits([cached.id])
+                    else:
+                        await cache_repo.put(
+                            vacancy_hash=vacancy_hash,
+                            resume_hash=resume_hash,
+                            version=cache_version,
+                            result_data=llm_response,
+                            tokens_spent=gpt_tokens,
+                            ttl=timedelta(hours=settings.ANALYSIS_CACHE_TTL_HOURS)
+                        )
 
                     assistant = await assistant_repo.get_assistant_by_name("ИИ Рекрутер")
 
@@ -77,26 +147,28 @@ class DramatiqWorker:
                         'organization_id': organization_id,
                         'balance_id': balance_id,
                         'input_text_count': len(user_message),
-                        'gpt_token_spent': llm_tokens,
-                        'input_token_count': llm_tokens,
+                        'gpt_token_spent': gpt_tokens,
+                        'input_token_count': gpt_tokens,
                         'file_count': 1 if file else 0,
                         'file_size': getattr(file, 'size', None),
                         'atl_token_spent': atl_tokens,
                     })
 
-                    if not await balance_repo.withdraw_balance(organization_id, atl_tokens):
-                        raise ValueError("Не удалось списать ATL токены — возможно, недостаточно средств")
+                    await DramatiqWorker._commit_reservation(
+                        ledger_repo, reservation_id, organization_id, atl_tokens, reference=task_id
+                    )
 
                     await bg_session.update_task_result(
                         task_id=task_id,
-                        result_data=response_data["llm_response"],
-                        tokens_spent=llm_tokens,
-                        status="completed"
+                        result_data=llm_response,
+                        tokens_spent=task_tokens,
+                        status="completed",
+                        text_hash=resume_hash
                     )
                     await candidate_info.update_candidate_info(
                         candidate_id=candidate_info_id,
                         data={
-                            "candidate_info": response_data["llm_response"]
+                            "candidate_info": llm_response
                         }
                     )
                     logging.info(f"Задача {task_id} завершена успешно")
@@ -104,13 +176,508 @@ class DramatiqWorker:
         except Exception as e:
             logging.error(f"Ошибка в задаче {task_id}: {e}")
             async with session_manager.session() as session:
-                bg_session = BackgroundTasksBackend(session)
-                await bg_session.update_task_result(
-                    task_id=task_id,
-                    result_data={"error": str(e)},
-                    tokens_spent=0,
-                    status="failed"
+                async with session.begin():
+                    if reservation_id:
+                        await BalanceLedgerRepository(session).release(reservation_id)
+                    bg_session = BackgroundTasksBackend(session)
+                    await bg_session.update_task_result(
+                        task_id=task_id,
+                        result_data={"error": str(e)},
+                        tokens_spent=0,
+                        status="failed"
+                    )
+            raise
+
+    @staticmethod
+    async def _reserve_tokens(organization_id: int, amount: float, reference: str) -> str:
+        """
+        Резервирует токены в отдельной короткой транзакции: блокировка строки
+        balances держится только на время одного UPDATE, а не всего вызова LLM.
+        """
+        from src.repositories import BalanceLedgerRepository
+
+        async with session_manager.session() as session:
+            async with session.begin():
+                reservation_id = await BalanceLedgerRepository(session).reserve(organization_id, amount, reference)
+        if reservation_id is None:
+            raise InsufficientFundsError(f"Недостаточно ATL токенов для резервирования {amount}")
+        return reservation_id
+
+    @staticmethod
+    async def _commit_reservation(ledger_repo, reservation_id: str, organization_id: int, spent: float, reference: str):
+        """
+        Фиксирует списание по резерву. Если резерв уже снят (задача пробыла в
+        pending дольше BALANCE_RESERVATION_MAX_HOURS, и его освободила задача
+        compact_balance_ledger), потраченное списывается заново новым резервом в
+        той же транзакции. Если средств на это не хватает, InsufficientFundsError
+        откатывает транзакцию: результат анализа не сохраняется, задача
+        завершается ошибкой, а не отдаётся без оплаты.
+        """
+        if await ledger_repo.commit(reservation_id, spent):
+            return
+        logging.warning(f"Резерв {reservation_id} уже снят, повторно списываем {spent} ATL токенов")
+        if spent <= 0:
+            return
+        recharge_id = await ledger_repo.reserve(organization_id, spent, reference)
+        if recharge_id is None:
+            raise InsufficientFundsError(
+                f"Не удалось повторно списать {spent} ATL токенов организации {organization_id}: "
+                f"недостаточно средств"
+            )
+        await ledger_repo.commit(recharge_id, spent)
+
+    @staticmethod
+    @dramatiq.actor(
+        max_retries=0,
+        queue_name=ANALYSIS_BULK_QUEUE,
+        priority=ANALYSIS_BULK_PRIORITY,
+        tenant_arg="organization_id",
+    )
+    async def process_resume_batch(
+            session_id: str,
+            vacancy_text: str,
+            items: list,
+            user_id: int,
+            organization_id: int,
+            balance_id: int,
+            user_message: str,
+    ):
+        """
+        Пакетный анализ резюме одной сессии по одной вакансии.
+
+        items: [{"task_id", "resume_text", "candidate_info_id"}, ...].
+        Вакансия отправляется в LLM один раз на пакет, все результаты
+        записываются одной транзакцией. Резюме, по которым пакетный
+        анализ не удался, переотправляются в process_resume по одному.
+        """
+        from src.core.backend import BackgroundTasksBackend
+        from src.repositories import AssistantRepository
+        from src.repositories import BalanceUsageRepository
+        from src.repositories import AnalysisResultCacheRepository
+        from src.repositories import BalanceLedgerRepository
+        logging.info(f"Начало пакетной задачи для сессии {session_id}: {len(items)} резюме")
+
+        fallback = []
+        reservation_id = None
+        try:
+            reservation_id = await DramatiqWorker._reserve_tokens(
+                organization_id,
+                settings.ANALYSIS_RESERVE_ATL_TOKENS * len(items),
+                reference=f"{BATCH_REFERENCE_PREFIX}{session_id}"
+            )
+
+            vacancy_hash = get_text_hash(vacancy_text)
+            cache_version = settings.analysis_cache_version
+            for item in items:
+                item["resume_hash"] = get_text_hash(item["resume_text"])
+
+            # Как и в process_resume: чтение кэша без блокировок, LLM — вне транзакции
+            async with session_manager.session() as session:
+                cached = await AnalysisResultCacheRepository(session).get_many(
+                    vacancy_hash,
+                    [item["resume_hash"] for item in items],
+                    cache_version
+                )
+
+            misses = [item for item in items if item["resume_hash"] not in cached]
+            llm_results = {}
+            if misses:
+                try:
+                    llm_results = await RequestSender()._send_batch_request(
+                        vacancy_text,
+                        [{"id": item["task_id"], "resume_text": item["resume_text"]} for item in misses]
+                    )
+                except Exception as e:
+                    logging.warning(f"Пакетный анализ недоступен, переход на поштучную обработку: {e}")
+
+            completed, usages, new_cache_entries, cache_hits = [], [], [], []
+            total_atl_tokens = 0
+            for item in items:
+                hit = cached.get(item["resume_hash"])
+                if hit is not None:
+                    llm_response = hit.result_data
+                    task_tokens = hit.tokens_spent
+                    gpt_tokens = 0
+                    atl_tokens = round(hit.tokens_spent * settings.ANALYSIS_CACHE_BILLING_RATE / 3000, 2)
+                    cache_hits.append(hit.id)
+                else:
+                    result = llm_results.get(item["task_id"])
+                    if not result or "llm_response" not in result or result.get("error"):
+                        fallback.append(item)
+                        continue
+                    llm_response = result["llm_response"]
+                    task_tokens = gpt_tokens = result.get("tokens_spent", 0)
+                    atl_tokens = round(gpt_tokens / 3000, 2)
+                    new_cache_entries.append((item["resume_hash"], llm_response, gpt_tokens))
+
+                total_atl_tokens += atl_tokens
+                completed.append((item, llm_response, task_tokens))
+                usages.append({
+                    'user_id': user_id,
+                    'type': "resume analysis",
+                    'organization_id': organization_id,
+                    'balance_id': balance_id,
+                    'input_text_count': len(user_message),
+                    'gpt_token_spent': gpt_tokens,
+                    'input_token_count': gpt_tokens,
+                    'file_count': 0,
+                    'file_size': None,
+                    'atl_token_spent': atl_tokens,
+                })
+
+            async with session_manager.session() as session:
+                async with session.begin():
+                    bg_session = BackgroundTasksBackend(session)
+                    ledger_repo = BalanceLedgerRepository(session)
+                    usage_repo = BalanceUsageRepository(session)
+                    cache_repo = AnalysisResultCacheRepository(session)
+                    candidate_info = CandidateInfoRepository(session)
+
+                    if completed:
+                        assistant = await AssistantRepository(session).get_assistant_by_name("ИИ Рекрутер")
+                        for usage in usages:
+                            usage['assistant_id'] = assistant.id
+                        await usage_repo.bulk_create(usages)
+
+                        await bg_session.bulk_update_task_results([
+                            {
+                                "task_id": item["task_id"],
+                                "result_data": llm_response,
+                                "tokens_spent": task_tokens,
+                                "task_status": "completed",
+                                "text_hash": item["resume_hash"],
+                            }
+                            for item, llm_response, task_tokens in completed
+                        ])
+                        await candidate_info.bulk_update_candidate_info([
+                            {"id": item["candidate_info_id"], "candidate_info": llm_response}
+                            for item, llm_response, _ in completed
+                        ])
+                        await cache_repo.record_hits(cache_hits)
+                        await cache_repo.put_many(
+                            vacancy_hash,
+                            cache_version,
+                            new_cache_entries,
+                            ttl=timedelta(hours=settings.ANALYSIS_CACHE_TTL_HOURS)
+                        )
+                    # Неиспользованная часть резерва (в т.ч. за резюме из fallback) возвращается на баланс
+                    await DramatiqWorker._commit_reservation(
+                        ledger_repo,
+                        reservation_id,
+                        organization_id,
+                        round(total_atl_tokens, 2),
+                        reference=f"{BATCH_REFERENCE_PREFIX}{session_id}"
+                    )
+                    logging.info(f"Пакет сессии {session_id}: готово {len(completed)}, на поштучную обработку {len(fallback)}")
+
+        except Exception as e:
+            # Транзакция откатилась целиком — все резюме пакета уходят в поштучный путь
+            logging.error(f"Ошибка пакетной задачи для сессии {session_id}: {e}")
+            fallback = items
+            if reservation_id:
+                async with session_manager.session() as session:
+                    async with session.begin():
+                        await BalanceLedgerRepository(session).release(reservation_id)
+
+        if fallback:
+            resume_actor, _ = DramatiqWorker._analysis_actors(len(items))
+            redis_broker.enqueue_many(
+                resume_actor.message(
+                    item["task_id"],
+                    vacancy_text,
+                    item["resume_text"],
+                    user_id,
+                    organization_id,
+                    balance_id,
+                    user_message,
+                    item["candidate_info_id"]
+                )
+                for item in fallback
+            )
+
+    @staticmethod
+    def _analysis_actors(resume_count: int):
+        """(поштучный, пакетный) акторы полосы, в которую попадает загрузка из resume_count резюме"""
+        if resume_count <= settings.ANALYSIS_INTERACTIVE_MAX_RESUMES:
+            return DramatiqWorker.process_resume_interactive, DramatiqWorker.process_resume_batch_interactive
+        return DramatiqWorker.process_resume, DramatiqWorker.process_resume_batch
+
+    @staticmethod
+    def build_analysis_messages(
+            session_id: str,
+            vacancy_text: str,
+            items: list,
+            user_id: int,
+            organization_id: int,
+            balance_id: int,
+            upload_size: int = None,
+    ) -> List[dramatiq.Message]:
+        """
+        Сообщения для созданных задач анализа: пакетами по LLM_BATCH_SIZE или
+        по одной, если пакетный режим выключен. Небольшие загрузки уходят в
+        интерактивную полосу, остальные — в массовую. Сообщения записываются в
+        outbox (OutboxRepository.add_messages) в транзакции, создающей задачи.
+        items: [{"task_id", "resume_text", "candidate_info_id"}, ...];
+        upload_size — размер всей загрузки, если items только её часть.
+        """
+        resume_actor, batch_actor = DramatiqWorker._analysis_actors(upload_size or len(items))
+        if settings.LLM_BATCH_SIZE > 1:
+            return [
+                batch_actor.message(
+                    session_id,
+                    vacancy_text,
+                    items[start:start + settings.LLM_BATCH_SIZE],
+                    user_id,
+                    organization_id,
+                    balance_id,
+                    vacancy_text
+                )
+                for start in range(0, len(items), settings.LLM_BATCH_SIZE)
+            ]
+        return [
+            resume_actor.message(
+                item["task_id"],
+                vacancy_text,
+                item["resume_text"],
+                user_id,
+                organization_id,
+                balance_id,
+                vacancy_text,
+                item["candidate_info_id"]
+            )
+            for item in items
+        ]
+
+    @staticmethod
+    @dramatiq.actor(max_retries=3, min_backoff=5000, time_limit=2 * 60 * 60 * 1000)
+    async def process_hh_analysis_job(job_id: str):
+        """
+        Анализ откликов на вакансию HH постранично.
+
+        Каждая страница откликов обрабатывается своей короткой транзакцией:
+        задачи HRTask создаются вместе с контрольной точкой (last_page), а
+        сообщения воркерам анализа отправляются после коммита. Повторный запуск
+        (ретрай Dramatiq или новый запрос) продолжает со следующей страницы.
+
+        Первый проход просматривает все отклики. Дальше задача синхронизируется
+        инкрементально: отклики читаются по убыванию updated_at до водяного знака
+        прошлого прохода. Резюме уже оценённого кандидата переанализируется,
+        только если его текст изменился; для новых резюме создаются задачи.
+        """
+        from src.models.hh_analysis_job import HHAnalysisJobStatus
+        from src.repositories import BalanceRepository, HHAnalysisJobRepository, VacancyRequirementRepository
+        from src.core.backend import BackgroundTasksBackend
+        from src.services.hh_client import get_hh_client, parse_hh_datetime
+        from src.services.hh_credentials import hh_credentials
+        from src.services.hh_extractor import (
+            assemble_candidate_summary,
+            extract_full_candidate_info,
+            extract_vacancy_summary,
+        )
+
+        hh_client = get_hh_client()
+
+        async with session_manager.session() as session:
+            async with session.begin():
+                job_repo = HHAnalysisJobRepository(session)
+                job = await job_repo.get_by_id(job_id)
+                if job is None or job.status == HHAnalysisJobStatus.COMPLETED:
+                    return
+                balance = await BalanceRepository(session).get_balance(job.organization_id)
+                await job_repo.update_job(job_id, {"status": HHAnalysisJobStatus.RUNNING, "error": None})
+                session_id = str(job.session_id)
+                user_id, organization_id, vacancy_id = job.user_id, job.organization_id, job.vacancy_id
+                page, pages_total = job.last_page + 1, job.pages_total
+                tasks_created, skipped_resumes = job.tasks_created, list(job.skipped_resumes or [])
+                watermark, pending_watermark = job.watermark_updated_at, job.pending_watermark
+        incremental = watermark is not None
+
+        async def publish(status: str, **extra):
+            payload = {
+                "type": "hh_analysis_progress",
+                "job_id": job_id,
+                "session_id": session_id,
+                "vacancy_id": vacancy_id,
+                "status": status,
+                "incremental": incremental,
+                "page": page,
+                "pages_total": pages_total,
+                "tasks_created": tasks_created,
+                "skipped_count": len(skipped_resumes),
+                **extra
+            }
+            if status == HHAnalysisJobStatus.RUNNING:
+                await manager.send_progress(user_id, payload)
+            else:
+                await manager.send_json(user_id, payload)
+
+        try:
+            async def get_credentials():
+                # Задача может идти дольше жизни токена — берём его заново на каждой странице
+                credentials = await hh_credentials.get(user_id)
+                if credentials is None:
+                    raise ValueError("HH account not found")
+                return credentials.access_token, str(credentials.id)
+
+            access_token, account_key = await get_credentials()
+            vacancy_raw = await hh_client.get_json(f"/vacancies/{vacancy_id}", access_token, account_key)
+            vacancy_text = extract_vacancy_summary(vacancy_raw)
+            async with session_manager.session() as session:
+                async with session.begin():
+                    # Связь сессии с текстом вакансии нужна для сброса кэша анализа
+                    await VacancyRequirementRepository(session).ensure_for_session(
+                        session_id, get_text_hash(vacancy_text), vacancy_text
+                    )
+
+            reached_watermark = False
+            while not reached_watermark and (pages_total is None or page < pages_total):
+                access_token, account_key = await get_credentials()
+                params = {"vacancy_id": vacancy_id, "page": page, "per_page": settings.HH_ANALYSIS_PAGE_SIZE}
+                if incremental:
+                    params.update(HH_NEGOTIATIONS_NEWEST_FIRST)
+                data = await hh_client.get_json("/negotiations/response", access_token, account_key, params=params)
+                pages_total = max(int(data.get("pages") or 1), 1)
+
+                resume_ids = []
+                for negotiation in data.get("items", []):
+                    resume_id = (negotiation.get("resume") or {}).get("id")
+                    updated_at = parse_hh_datetime(negotiation.get("updated_at") or negotiation.get("created_at"))
+                    if updated_at is not None and (pending_watermark is None or updated_at > pending_watermark):
+                        pending_watermark = updated_at
+                    if incremental and updated_at is not None and updated_at <= watermark:
+                        # Дальше по убыванию updated_at — только уже синхронизированные отклики
+                        reached_watermark = True
+                        continue
+                    if resume_id:
+                        resume_ids.append(resume_id)
+
+                # Задачи, уже созданные для этих резюме: при полном проходе их
+                # резюме даже не запрашиваются, при инкрементальном — сверяется текст
+                async with session_manager.session() as session:
+                    existing = await BackgroundTasksBackend(session).get_tasks_by_resume_ids(
+                        session_id, vacancy_id, resume_ids
+                    )
+                to_fetch = [
+                    resume_id for resume_id in resume_ids
+                    if resume_id not in existing or (incremental and existing[resume_id][1] is not None)
+                ]
+                resumes_data = await asyncio.gather(
+                    *[hh_client.get_resume(resume_id, access_token, account_key) for resume_id in to_fetch],
+                    return_exceptions=True
                 )
+
+                prepared = []
+                new_tasks = []
+                for resume_id, resume_data in zip(to_fetch, resumes_data):
+                    if isinstance(resume_data, Exception):
+                        logger.error(f"Ошибка при получении резюме {resume_id}: {resume_data}")
+                        skipped_resumes.append(resume_id)
+                        continue
+                    resume_text = assemble_candidate_summary(extract_full_candidate_info(resume_data))
+                    if not resume_text:
+                        skipped_resumes.append(resume_id)
+                        continue
+
+                    pdf_url = resume_data.get("download", {}).get("pdf", {}).get("url", None)
+                    if resume_id in existing:
+                        task_id, text_hash, _ = existing[resume_id]
+                        if text_hash == get_text_hash(resume_text):
+                            continue
+                    else:
+                        task_id = str(uuid.uuid4())
+                        new_tasks.append({
+                            "task_id": task_id,
+                            "resume_id": resume_id,
+                            "vacancy_id": vacancy_id,
+                            "session_id": session_id,
+                            "task_type": "hh cv analyze",
+                            "task_status": "pending",
+                            "hh_file_url": pdf_url,
+                        })
+                    prepared.append((resume_id, task_id, resume_text, pdf_url))
+
+                async with session_manager.session() as session:
+                    async with session.begin():
+                        bg_backend = BackgroundTasksBackend(session)
+                        candidate_info_repo = CandidateInfoRepository(session)
+
+                        # Карточка создаётся для новых задач и для старых задач, у которых её нет;
+                        # у переоцениваемых задач обновляется уже существующая
+                        missing = [
+                            (task_id, pdf_url) for resume_id, task_id, _, pdf_url in prepared
+                            if resume_id not in existing or existing[resume_id][2] is None
+                        ]
+                        candidate_info_ids = dict(zip(
+                            [task_id for task_id, _ in missing],
+                            await candidate_info_repo.bulk_create_candidate_info(
+                                [{"hh_resume_url": pdf_url} for _, pdf_url in missing]
+                            )
+                        ))
+                        candidate_info_updates = []
+                        for resume_id, task_id, _, pdf_url in prepared:
+                            if resume_id not in existing:
+                                continue
+                            if task_id not in candidate_info_ids:
+                                candidate_info_ids[task_id] = existing[resume_id][2]
+                                candidate_info_updates.append(
+                                    {"id": candidate_info_ids[task_id], "hh_resume_url": pdf_url, "candidate_info": {}}
+                                )
+                            # Резюме изменилось — переоцениваем кандидата в той же задаче
+                            await bg_backend.reset_task(
+                                task_id, {"hh_file_url": pdf_url, "candidate_info_id": candidate_info_ids[task_id]}
+                            )
+                        await candidate_info_repo.bulk_update_candidate_info(candidate_info_updates)
+
+                        for row in new_tasks:
+                            row["candidate_info_id"] = candidate_info_ids[row["task_id"]]
+                        await bg_backend.create_tasks(new_tasks)
+
+                        items = [
+                            {
+                                "task_id": task_id,
+                                "resume_text": resume_text,
+                                "candidate_info_id": candidate_info_ids[task_id]
+                            }
+                            for _, task_id, resume_text, _ in prepared
+                        ]
+                        await OutboxRepository(session).add_messages(DramatiqWorker.build_analysis_messages(
+                            session_id,
+                            vacancy_text,
+                            items,
+                            user_id,
+                            organization_id,
+                            balance.id,
+                            upload_size=pages_total * settings.HH_ANALYSIS_PAGE_SIZE
+                        ))
+                        await HHAnalysisJobRepository(session).checkpoint(
+                            job_id,
+                            page=page,
+                            pages_total=pages_total,
+                            resumes_found=len(resume_ids),
+                            tasks_created=len(new_tasks),
+                            skipped_resumes=skipped_resumes,
+                            pending_watermark=pending_watermark,
+                        )
+
+                # Переоценка изменившихся резюме новых задач не создаёт
+                tasks_created += len(new_tasks)
+                await publish(HHAnalysisJobStatus.RUNNING)
+                page += 1
+
+            async with session_manager.session() as session:
+                async with session.begin():
+                    await HHAnalysisJobRepository(session).complete(job_id, pending_watermark or watermark)
+            await publish(HHAnalysisJobStatus.COMPLETED)
+            logger.info(f"HH анализ {job_id} завершён: создано {tasks_created} задач, пропущено {len(skipped_resumes)}")
+        except Exception as e:
+            logger.error(f"Ошибка HH анализа {job_id} на странице {page}: {e}")
+            async with session_manager.session() as session:
+                async with session.begin():
+                    await HHAnalysisJobRepository(session).update_job(
+                        job_id, {"status": HHAnalysisJobStatus.FAILED, "error": str(e)[:1000]}
+                    )
+            await publish(HHAnalysisJobStatus.FAILED, error=str(e))
+            # Ретрай Dramatiq продолжит с последней контрольной точки
             raise
 
     @staticmethod
@@ -209,13 +776,19 @@ class DramatiqWorker:
             session_id,
             user_id
     ):
+        """
+        Рассылка кандидатам из избранного сессии. Существующие взаимодействия
+        читаются двумя запросами на всю рассылку, сообщения отправляет
+        WhatsappBulkSender, а результаты пишутся в БД порциями по WHATSAPP_BULK_CHUNK_SIZE.
+        """
         from src.repositories import FavoriteResumeRepository
         from src.repositories import WhatsappInstanceRepository
         from src.repositories import CurrentWhatsappInstanceRepository
         from src.repositories import UserInteractionRepository
         from src.repositories import OrganizationRepository
         from src.repositories import VacancyRepository
-        from src.services.green_api_instance_cli import GreenApiInstanceCli
+        from src.services.http_clients import provider_session
+        from src.services.whatsapp_bulk import OutgoingMessage, WhatsappBulkSender, to_whatsapp_chat_id
 
         async with session_manager.session() as session:
             favorite_repo = FavoriteResumeRepository(session)
@@ -225,8 +798,6 @@ class DramatiqWorker:
             organization_repo = OrganizationRepository(session)
             vacancy_repo = VacancyRepository(session)
 
-            green_api_instance_client = GreenApiInstanceCli()
-
             current_instance_id = await current_instance_repo.get_current_instance_id(user_id)
             if not current_instance_id:
                 logger.info("Не найден текущий WhatsApp-инстанс для user_id=%s", user_id)
@@ -245,84 +816,122 @@ class DramatiqWorker:
             organization = await organization_repo.get_user_organization(user_id)
             vacancy = await vacancy_repo.get_by_session_id(session_id)
 
+            candidates = {}
             for _, resume_record in resumes:
                 resume_data = resume_record.result_data.get("candidate_info", {})
-                full_name = resume_data.get("fullname", "")
-                phone_number = resume_data.get("contacts", {}).get("phone_number", "")
+                chat_id = to_whatsapp_chat_id(resume_data.get("contacts", {}).get("phone_number", ""))
+                if chat_id and chat_id not in candidates:
+                    candidates[chat_id] = resume_data.get("fullname", "")
 
-                if not phone_number:
-                    continue
+            chat_ids = list(candidates)
+            contacted = await user_interaction_repo.get_session_chat_ids(session_id, chat_ids)
+            last_interactions = await user_interaction_repo.get_last_interactions(chat_ids, whatsapp_instance.id)
 
-                cleaned_number = "".join(ch for ch in phone_number if ch.isdigit())
-                if cleaned_number.startswith("8"):
-                    cleaned_number = "7" + cleaned_number[1:]
-                chat_id = f"{cleaned_number}@c.us"
-
-                session_interaction = await user_interaction_repo.get_interaction_by_session_id(chat_id, session_id)
-                if session_interaction:
+            ignored_ids = []
+            messages = []
+            for chat_id, full_name in candidates.items():
+                if chat_id in contacted:
                     continue
-
-                existing_interaction = await user_interaction_repo.get_interaction_by_chat_id(
-                    chat_id,
-                    whatsapp_instance.id
-                )
-
-                if existing_interaction:
-                    if (
-                            not existing_interaction.is_answered
-                            and
-                            datetime.utcnow() < existing_interaction.created_at + timedelta(hours=24)
-                    ):
-                        logger.info(
-                            "Пропускаем отправку нового сообщения на %s, т.к. есть неотвеченное взаимодействие с id=%s",
-                            chat_id,
-                            existing_interaction.id
-                        )
-                        await user_interaction_repo.update_interaction(
-                            chat_id,
-                            existing_interaction,
-                            {
-                                "is_ignored": True
-                            }
-                        )
-                        continue
-                    else:
-                        await user_interaction_repo.update_interaction(
-                            chat_id,
-                            existing_interaction,
-                            {
-                                "is_last": False
-                            }
-                        )
-                        text_message = (
-                            f"Здравствуйте, {full_name}! Это AI рекрутер из компании {organization.name}. "
-                            f"Рады снова с Вами связаться. Вы откликнулись на нашу вакансию «{vacancy.title}», "
-                            f"и мы были бы рады обсудить дальнейшие шаги лично. Напишите, пожалуйста, если у Вас возникли вопросы."
-                        )
-                else:
+                existing_interaction = last_interactions.get(chat_id)
+                if existing_interaction is None:
                     text_message = (
                         f"Добрый день, {full_name}! Я — AI-рекрутер компании {organization.name}.\n"
                         f"Вы откликались на нашу вакансию «{vacancy.title}». Мы внимательно изучили ваше резюме "
                         f"и хотели бы обсудить дальнейшие шаги. \n\n"
                         f"Напишите 1, чтобы продолжить, или 2, если не хотите продолжать общение."
                     )
+                elif (
+                        not existing_interaction.is_answered
+                        and datetime.utcnow() < existing_interaction.created_at + timedelta(hours=24)
+                ):
+                    logger.info(
+                        "Пропускаем отправку нового сообщения на %s, т.к. есть неотвеченное взаимодействие с id=%s",
+                        chat_id,
+                        existing_interaction.id
+                    )
+                    ignored_ids.append(existing_interaction.id)
+                    continue
+                else:
+                    text_message = (
+                        f"Здравствуйте, {full_name}! Это AI рекрутер из компании {organization.name}. "
+                        f"Рады снова с Вами связаться. Вы откликнулись на нашу вакансию «{vacancy.title}», "
+                        f"и мы были бы рады обсудить дальнейшие шаги лично. Напишите, пожалуйста, если у Вас возникли вопросы."
+                    )
+                messages.append(OutgoingMessage(chat_id, text_message))
 
-                await green_api_instance_client.send_message(
-                    data={
-                        "chat_id": chat_id,
-                        "message": text_message
-                    },
-                    instance_id=whatsapp_instance.instance_id,
-                    instance_token=whatsapp_instance.instance_token
+            await user_interaction_repo.bulk_update_interactions(ignored_ids, {"is_ignored": True})
+            # Завершаем транзакцию чтения до начала отправки (объекты не истекают: expire_on_commit=False)
+            await session.commit()
+
+            sent_total = 0
+            async with provider_session("green_api") as http_session:
+                sender = WhatsappBulkSender(
+                    whatsapp_instance.instance_id,
+                    whatsapp_instance.instance_token,
+                    http_session
                 )
-                data = {
-                    "chat_id": chat_id,
-                    "instance_id": whatsapp_instance.instance_id,
-                    "session_id": session_id,
-                    "is_whatsapp": True
-                }
-                await user_interaction_repo.create_interaction(data)
-                await session.commit()
+                chunk_size = settings.WHATSAPP_BULK_CHUNK_SIZE
+                for start in range(0, len(messages), chunk_size):
+                    sent = await sender.send_all(messages[start:start + chunk_size])
+                    async with session.begin():
+                        # Новое сообщение становится последним взаимодействием с кандидатом
+                        await user_interaction_repo.bulk_update_interactions(
+                            [last_interactions[chat_id].id for chat_id in sent if chat_id in last_interactions],
+                            {"is_last": False}
+                        )
+                        await user_interaction_repo.bulk_create_interactions([
+                            {
+                                "chat_id": chat_id,
+                                "instance_id": whatsapp_instance.id,
+                                "session_id": session_id,
+                                "is_whatsapp": True
+                            }
+                            for chat_id in sent
+                        ])
+                    sent_total += len(sent)
+
+            logger.info(
+                "Рассылка session_id=%s: отправлено %s из %s, пропущено неотвеченных %s",
+                session_id, sent_total, len(messages), len(ignored_ids)
+            )
+
+    @staticmethod
+    @dramatiq.actor(max_retries=0)
+    async def process_whatsapp_webhooks():
+        """
+        Разбирает очередь вебхуков Green API пачками по WHATSAPP_WEBHOOK_BATCH_SIZE.
+        Пачка подтверждается после коммита; при ошибке она возвращается в
+        очередь и обрабатывается при следующем запуске. Если пока шла обработка
+        пришли новые вебхуки, ставит себя в очередь снова.
+        """
+        from src.controllers.whatsapp_webhook_controller import WhatsappWebhookController
+        from src.services.whatsapp_webhooks import (
+            ack_webhooks,
+            claim_webhooks,
+            parse_webhooks,
+            recover_webhooks,
+            release_flag,
+            requeue_webhooks,
+        )
+
+        delay = settings.WHATSAPP_WEBHOOK_BATCH_DELAY_MS
+        try:
+            if recovered := await recover_webhooks():
+                logger.warning("WhatsApp webhooks: возвращено в очередь %s необработанных вебхуков", recovered)
+            while raw := await claim_webhooks():
+                try:
+                    async with session_manager.session() as session:
+                        result = await WhatsappWebhookController(session).process_webhooks(parse_webhooks(raw))
+                except Exception:
+                    logger.exception("Ошибка обработки пачки из %s вебхуков WhatsApp", len(raw))
+                    await requeue_webhooks(raw)
+                    delay = settings.WHATSAPP_WEBHOOK_RETRY_DELAY_MS
+                    break
+                await ack_webhooks(raw)
+                logger.info("WhatsApp webhooks: %s", result)
+        finally:
+            if await release_flag():
+                DramatiqWorker.process_whatsapp_webhooks.send_with_options(delay=delay)
 
     @staticmethod
     @dramatiq.actor
@@ -367,16 +976,12 @@ class DramatiqWorker:
                 f"в компании {organization.name}. Если у вас есть вопросы или вы хотите обсудить дальнейшие шаги, "
                 "пожалуйста, напишите «1». Если не хотите продолжать общение — напишите «2»."
             )
-            for chat_id in ignored_chats:
+            for ignored_interaction in ignored_chats:
+                chat_id = ignored_interaction.chat_id
                 try:
-                    existing_interaction = await user_interaction_repo.get_interaction_by_chat_id(
-                        chat_id,
-                        whatsapp_instance.id
-                    )
-
                     await user_interaction_repo.update_interaction(
-                        existing_interaction.chat_id,
-                        existing_interaction.instance_id,
+                        chat_id,
+                        whatsapp_instance.id,
                         {
                             "is_last": False
                         }
@@ -390,15 +995,14 @@ class DramatiqWorker:
                         instance_id=whatsapp_instance.instance_id,
                         instance_token=whatsapp_instance.instance_token
                     )
+                    # instance_id взаимодействия — id строки WhatsappInstance, а не idInstance Green API
                     data = {
                         "chat_id": chat_id,
-                        "instance_id": whatsapp_instance.instance_id,
+                        "instance_id": whatsapp_instance.id,
                         "session_id": session_id,
                         "is_whatsapp": True
                     }
-                    await user_interaction_repo.create_interaction(
-                        **data
-                    )
+                    await user_interaction_repo.create_interaction(data)
                     logger.info("Повторное сообщение отправлено на %s", chat_id)
                 except Exception as e:
                     logger.error("Ошибка при повторной отправке сообщения для %s: %s", chat_id, str(e))
@@ -453,3 +1057,24 @@ class DramatiqWorker:
         if last_error:
             raise last_error
         return None
+
+
+# Те же акторы анализа в интерактивной полосе
+DramatiqWorker.process_resume_interactive = dramatiq.actor(
+    DramatiqWorker.process_resume.fn,
+    actor_name="process_resume_interactive",
+    queue_name=ANALYSIS_INTERACTIVE_QUEUE,
+    priority=ANALYSIS_INTERACTIVE_PRIORITY,
+    max_retries=3,
+    min_backoff=1000,
+    throws=(InsufficientFundsError,),
+    tenant_arg="organization_id",
+)
+DramatiqWorker.process_resume_batch_interactive = dramatiq.actor(
+    DramatiqWorker.process_resume_batch.fn,
+    actor_name="process_resume_batch_interactive",
+    queue_name=ANALYSIS_INTERACTIVE_QUEUE,
+    priority=ANALYSIS_INTERACTIVE_PRIORITY,
+    max_retries=0,
+    tenant_arg="organization_id",
+)
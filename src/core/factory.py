@@ -20,11 +20,17 @@ from src.controllers.whatsapp_instance import WhatsappInstanceController
 from src.controllers.whatsapp_webhook_controller import WhatsappWebhookController
 from src.core.backend import BackgroundTasksBackend
 from src.core.databases import get_session
+from src.core.identity import IdentityContext
 from src.services.extractor import AsyncTextExtractor, get_text_extractor
 
 
 class Factory:
 
+    def get_identity_context(session: AsyncSession = Depends(get_session)) -> IdentityContext:
+        return IdentityContext(
+            session
+        )
+
     def get_auth_controller(session: AsyncSession = Depends(get_session)) -> AuthController:
         return AuthController(
             session
@@ -32,16 +38,22 @@ class Factory:
 
     def get_hr_agent_controller(
             session: AsyncSession = Depends(get_session),
-            text_extractor: AsyncTextExtractor = Depends(get_text_extractor)
+            text_extractor: AsyncTextExtractor = Depends(get_text_extractor),
+            identity: IdentityContext = Depends(get_identity_context)
     ) -> HRAgentController:
         return HRAgentController(
             session,
-            text_extractor
+            text_extractor,
+            identity
         )
 
-    def get_organization_controller(session: AsyncSession = Depends(get_session)) -> OrganizationController:
+    def get_organization_controller(
+            session: AsyncSession = Depends(get_session),
+            identity: IdentityContext = Depends(get_identity_context)
+    ) -> OrganizationController:
         return OrganizationController(
-            session
+            session,
+            identity
         )
 
     def get_org_member_controller(session: AsyncSession = Depends(get_session)) -> OrganizationMemberController:
@@ -54,29 +66,49 @@ class Factory:
             session
         )
 
-    def get_assistant_controller(session: AsyncSession = Depends(get_session)) -> AssistantController:
+    def get_assistant_controller(
+            session: AsyncSession = Depends(get_session),
+            identity: IdentityContext = Depends(get_identity_context)
+    ) -> AssistantController:
         return AssistantController(
-            session
+            session,
+            identity
         )
 
-    def get_user_feedback_controller(session: AsyncSession = Depends(get_session), ) -> UserFeedbackController:
+    def get_user_feedback_controller(
+            session: AsyncSession = Depends(get_session),
+            identity: IdentityContext = Depends(get_identity_context)
+    ) -> UserFeedbackController:
         return UserFeedbackController(
-            session
+            session,
+            identity
         )
 
-    def get_balance_controller(session: AsyncSession = Depends(get_session)) -> BalanceController:
+    def get_balance_controller(
+            session: AsyncSession = Depends(get_session),
+            identity: IdentityContext = Depends(get_identity_context)
+    ) -> BalanceController:
         return BalanceController(
-            session
+            session,
+            identity
         )
 
-    def get_billing_controller(session: AsyncSession = Depends(get_session)) -> BillingController:
+    def get_billing_controller(
+            session: AsyncSession = Depends(get_session),
+            identity: IdentityContext = Depends(get_identity_context)
+    ) -> BillingController:
         return BillingController(
-            session
+            session,
+            identity
         )
 
-    def get_hh_controller(session: AsyncSession = Depends(get_session)) -> HHController:
+    def get_hh_controller(
+            session: AsyncSession = Depends(get_session),
+            identity: IdentityContext = Depends(get_identity_context)
+    ) -> HHController:
         return HHController(
-            session
+            session,
+            identity
         )
 
     def get_clone_controller(session: AsyncSession = Depends(get_session)) -> CloneController:
@@ -89,20 +121,28 @@ class Factory:
         return InterviewCommonQuestionController(session)
 
     def get_individual_question_controller(
-            session: AsyncSession = Depends(get_session)) -> InterviewIndividualQuestionController:
-        return InterviewIndividualQuestionController(session)
+            session: AsyncSession = Depends(get_session),
+            identity: IdentityContext = Depends(get_identity_context)
+    ) -> InterviewIndividualQuestionController:
+        return InterviewIndividualQuestionController(session, identity)
 
     def get_promo_code_controller(session: AsyncSession = Depends(get_session)) -> PromoCodeController:
         return PromoCodeController(session)
 
-    def get_subscription_plan_controller(session: AsyncSession = Depends(get_session)) -> SubscriptionPlanController:
-        return SubscriptionPlanController(session)
+    def get_subscription_plan_controller(
+            session: AsyncSession = Depends(get_session),
+            identity: IdentityContext = Depends(get_identity_context)
+    ) -> SubscriptionPlanController:
+        return SubscriptionPlanController(session, identity)
 
     def get_bank_card_controller(session: AsyncSession = Depends(get_session)) -> BankCardController:
         return BankCardController(session)
 
-    def get_whatsapp_instance_controller(session: AsyncSession = Depends(get_session)) -> WhatsappInstanceController:
-        return WhatsappInstanceController(session)
+    def get_whatsapp_instance_controller(
+            session: AsyncSession = Depends(get_session),
+            identity: IdentityContext = Depends(get_identity_context)
+    ) -> WhatsappInstanceController:
+        return WhatsappInstanceController(session, identity)
 
     def get_whatsapp_webhook_controller(
             session: AsyncSession = Depends(get_session)
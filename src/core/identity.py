@@ -0,0 +1,82 @@
+from datetime import datetime, timedelta
+from typing import Dict, NamedTuple, Optional
+
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm.attributes import set_committed_value
+
+from src.models.balance import Balance
+from src.models.organization import Organization
+from src.models.organization_member import OrganizationMember
+from src.models.organization_subscription import OrganizationSubscription
+from src.models.role import Role
+from src.models.subscription_plan import SubscriptionPlan
+from src.models.user import User
+
+
+class Identity(NamedTuple):
+    """Пользователь и всё, что обычно нужно о нём контроллеру; объекты привязаны к сессии запроса"""
+    user: User
+    role: Role
+    member: Optional[OrganizationMember]
+    organization: Optional[Organization]
+    balance: Optional[Balance]
+    subscription: Optional[OrganizationSubscription]
+    subscription_plan: Optional[SubscriptionPlan]
+
+    @property
+    def subscription_expires_at(self) -> Optional[datetime]:
+        if self.subscription is None or self.subscription_plan is None:
+            return None
+        return self.subscription.bought_date + timedelta(days=self.subscription_plan.active_days)
+
+    @property
+    def active_subscription(self) -> Optional[OrganizationSubscription]:
+        """Подписка организации, если срок её действия ещё не истёк"""
+        expires_at = self.subscription_expires_at
+        if expires_at is None or expires_at < datetime.utcnow():
+            return None
+        return self.subscription
+
+
+class IdentityContext:
+    """
+    Контекст пользователя в рамках одного запроса.
+
+    get() загружает пользователя, роль, организацию, баланс и последнюю подписку
+    одним запросом и запоминает результат до конца запроса.
+    """
+
+    def __init__(self, session: AsyncSession):
+        self.session = session
+        self._identities: Dict[int, Optional[Identity]] = {}
+
+    async def get(self, user_id: int) -> Optional[Identity]:
+        if user_id in self._identities:
+            return self._identities[user_id]
+
+        stmt = (
+            select(User, Role, OrganizationMember, Organization, Balance, OrganizationSubscription, SubscriptionPlan)
+            .join(Role, Role.id == User.role_id)
+            .outerjoin(OrganizationMember, OrganizationMember.user_id == User.id)
+            .outerjoin(Organization, Organization.id == OrganizationMember.organization_id)
+            .outerjoin(Balance, Balance.organization_id == Organization.id)
+            .outerjoin(OrganizationSubscription, OrganizationSubscription.organization_id == Organization.id)
+            .outerjoin(SubscriptionPlan, SubscriptionPlan.id == OrganizationSubscription.subscription_id)
+            .where(User.id == user_id)
+            .order_by(OrganizationSubscription.bought_date.desc().nulls_last())
+            .limit(1)
+        )
+        row = (await self.session.execute(stmt)).first()
+        identity = Identity(*row) if row is not None else None
+        if identity is not None:
+            # Связи уже загружены этим запросом — обращение к ним не должно идти в БД
+            set_committed_value(identity.user, 'role', identity.role)
+            if identity.subscription is not None:
+                set_committed_value(identity.subscription, 'subscription_plan', identity.subscription_plan)
+        self._identities[user_id] = identity
+        return identity
+
+    async def get_organization(self, user_id: int) -> Optional[Organization]:
+        identity = await self.get(user_id)
+        return identity.organization if identity else None
@@ -0,0 +1,55 @@
+import bisect
+from typing import Dict, Sequence
+
+# Границы корзин гистограммы задержек (секунды)
+DEFAULT_LATENCY_BUCKETS = (0.1, 0.25, 0.5, 1, 2.5, 5, 10, 20, 30, 60, 120)
+
+
+class LatencyHistogram:
+    """Простая гистограмма задержек в памяти процесса (в духе Prometheus)"""
+
+    def __init__(self, buckets: Sequence[float] = DEFAULT_LATENCY_BUCKETS):
+        self.buckets = tuple(sorted(buckets))
+        self.counts = [0] * (len(self.buckets) + 1)
+        self.count = 0
+        self.sum = 0.0
+        self.errors = 0
+
+    def observe(self, seconds: float, error: bool = False):
+        self.counts[bisect.bisect_left(self.buckets, seconds)] += 1
+        self.count += 1
+        self.sum += seconds
+        if error:
+            self.errors += 1
+
+    def stats(self) -> dict:
+        cumulative = 0
+        buckets = {}
+        for bound, count in zip(self.buckets, self.counts):
+            cumulative += count
+            buckets[f"le_{bound}"] = cumulative
+        buckets["le_inf"] = self.count
+        return {
+            "count": self.count,
+            "errors": self.errors,
+            "sum_seconds": round(self.sum, 3),
+            "avg_seconds": round(self.sum / self.count, 3) if self.count else 0.0,
+            "buckets": buckets,
+        }
+
+
+class HistogramRegistry:
+    """Набор гистограмм по метке (например, по маршруту LLM-сервиса)"""
+
+    def __init__(self, buckets: Sequence[float] = DEFAULT_LATENCY_BUCKETS):
+        self._buckets = buckets
+        self._histograms: Dict[str, LatencyHistogram] = {}
+
+    def observe(self, label: str, seconds: float, error: bool = False):
+        histogram = self._histograms.get(label)
+        if histogram is None:
+            histogram = self._histograms[label] = LatencyHistogram(self._buckets)
+        histogram.observe(seconds, error)
+
+    def stats(self) -> dict:
+        return {label: histogram.stats() for label, histogram in self._histograms.items()}
@@ -0,0 +1,157 @@
+import argparse
+import asyncio
+import logging
+import signal
+import time
+from datetime import datetime, timedelta
+
+from src.core.databases import session_manager
+from src.core.dramatiq_worker import redis_broker
+from src.core.settings import settings
+from src.repositories.outbox import OutboxRepository
+
+logger = logging.getLogger(__name__)
+
+
+class OutboxPublishError(Exception):
+    """Брокер недоступен; пачка остаётся в pending без учёта попытки"""
+
+
+class OutboxRelay:
+    """
+    Переносит сообщения из outbox_messages в Dramatiq.
+
+    Каждая пачка — одна транзакция: строки забираются с SKIP LOCKED,
+    публикуются через pipeline и помечаются отправленными. Если коммит после
+    публикации не прошёл, пачка уйдёт повторно, поэтому доставка «не менее
+    одного раза»; несколько relay можно запускать параллельно.
+
+    Попыткой (и в итоге статусом dead) считаются только ошибки конкретного
+    сообщения: неизвестный актор или сообщение, которое не кодируется. Ошибка
+    брокера (Redis недоступен, обрыв соединения) оставляет пачку в pending, а
+    пауза между опросами удваивается до OUTBOX_MAX_BACKOFF.
+    """
+
+    def __init__(
+        self,
+        batch_size: int = settings.OUTBOX_BATCH_SIZE,
+        poll_interval: float = settings.OUTBOX_POLL_INTERVAL,
+    ):
+        self.batch_size = batch_size
+        self.poll_interval = poll_interval
+        self._stopping = asyncio.Event()
+        self._last_purge = 0.0
+        self._publish_failures = 0
+
+    async def relay_once(self) -> int:
+        """Отправляет одну пачку; возвращает число отправленных сообщений"""
+        async with session_manager.session() as session:
+            async with session.begin():
+                repo = OutboxRepository(session)
+                rows = await repo.claim_batch(self.batch_size)
+                if not rows:
+                    return 0
+                ids, messages = [], []
+                for row in rows:
+                    try:
+                        message = repo.to_message(row)
+                        redis_broker.get_actor(message.actor_name)
+                        message.encode()
+                    except Exception as e:
+                        logger.error(f"Outbox message {row.id} cannot be published: {e}")
+                        await self._mark_failed(repo, [row.id], str(e))
+                        continue
+                    ids.append(row.id)
+                    messages.append(message)
+                if not messages:
+                    return 0
+                try:
+                    await asyncio.to_thread(redis_broker.enqueue_many, messages)
+                except Exception as e:
+                    # Транзакция коммитится ради отметок выше; пачка остаётся в pending
+                    publish_error = e
+                else:
+                    publish_error = None
+                    await repo.mark_published(ids)
+        if publish_error is not None:
+            raise OutboxPublishError(f"failed to publish {len(ids)} messages: {publish_error}") from publish_error
+        return len(ids)
+
+    @staticmethod
+    async def _mark_failed(repo: OutboxRepository, ids, error: str):
+        dead = await repo.mark_failed(ids, error, settings.OUTBOX_MAX_ATTEMPTS)
+        if dead:
+            logger.error(f"Outbox relay gave up on {len(dead)} messages after "
+                         f"{settings.OUTBOX_MAX_ATTEMPTS} attempts: {dead}")
+
+    def _poll_delay(self) -> float:
+        if not self._publish_failures:
+            return self.poll_interval
+        return min(self.poll_interval * 2 ** self._publish_failures, settings.OUTBOX_MAX_BACKOFF)
+
+    async def purge(self) -> int:
+        async with session_manager.session() as session:
+            async with session.begin():
+                return await OutboxRepository(session).purge_published(
+                    datetime.utcnow() - timedelta(hours=settings.OUTBOX_RETENTION_HOURS)
+                )
+
+    async def run(self):
+        logger.info("Outbox relay started")
+        while not self._stopping.is_set():
+            try:
+                published = await self.relay_once()
+                self._publish_failures = 0
+                if time.monotonic() - self._last_purge > settings.OUTBOX_PURGE_INTERVAL:
+                    self._last_purge = time.monotonic()
+                    purged = await self.purge()
+                    if purged:
+                        logger.info(f"Outbox relay purged {purged} published messages")
+            except OutboxPublishError as e:
+                self._publish_failures += 1
+                logger.error(f"Outbox relay {e}; retrying in {self._poll_delay():.1f}s")
+                published = 0
+            except Exception as e:
+                logger.error(f"Outbox relay iteration failed: {e}")
+                published = 0
+            # Полная пачка — в outbox, скорее всего, есть ещё сообщения
+            if published < self.batch_size:
+                try:
+                    await asyncio.wait_for(self._stopping.wait(), timeout=self._poll_delay())
+                except asyncio.TimeoutError:
+                    pass
+        logger.info("Outbox relay stopped")
+
+    def stop(self):
+        self._stopping.set()
+
+
+async def redrive(ids):
+    async with session_manager.session() as session:
+        async with session.begin():
+            count = await OutboxRepository(session).redrive_dead(ids)
+    await session_manager.close()
+    logger.info(f"Outbox relay returned {count} dead messages to the queue")
+
+
+async def main():
+    relay = OutboxRelay()
+    loop = asyncio.get_running_loop()
+    for sig in (signal.SIGINT, signal.SIGTERM):
+        loop.add_signal_handler(sig, relay.stop)
+    try:
+        await relay.run()
+    finally:
+        await session_manager.close()
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+    parser = argparse.ArgumentParser(description="Outbox relay")
+    parser.add_argument("--redrive", nargs="*", type=int, metavar="ID",
+                        help="вернуть dead-сообщения (все или с указанными id) в очередь и выйти")
+    args = parser.parse_args()
+    if args.redrive is not None:
+        asyncio.run(redrive(args.redrive))
+    else:
+        asyncio.run(main())
@@ -0,0 +1,80 @@
+import asyncio
+import logging
+
+from src.core.redis_cli import get_redis
+
+logger = logging.getLogger(__name__)
+
+# Атомарно: проверяет глобальную паузу, пополняет корзину по времени Redis
+# и забирает один токен. Возвращает 0, если токен получен, иначе — сколько
+# миллисекунд подождать перед следующей попыткой.
+_TOKEN_BUCKET_LUA = """
+local pause = redis.call('PTTL', KEYS[2])
+if pause > 0 then
+    return pause
+end
+
+local rate = tonumber(ARGV[1])
+local capacity = tonumber(ARGV[2])
+local time = redis.call('TIME')
+local now = tonumber(time[1]) * 1000 + math.floor(tonumber(time[2]) / 1000)
+
+local data = redis.call('HMGET', KEYS[1], 'tokens', 'ts')
+local tokens = tonumber(data[1]) or capacity
+local ts = tonumber(data[2]) or now
+tokens = math.min(capacity, tokens + (now - ts) * rate / 1000)
+
+local wait = 0
+if tokens >= 1 then
+    tokens = tokens - 1
+else
+    wait = math.ceil((1 - tokens) * 1000 / rate)
+end
+
+redis.call('HSET', KEYS[1], 'tokens', tokens, 'ts', now)
+redis.call('PEXPIRE', KEYS[1], math.ceil(capacity * 1000 / rate) + 1000)
+return wait
+"""
+
+
+class RedisTokenBucket:
+    """
+    Распределённый token bucket: лимит общий для всех процессов и реплик.
+
+    rate — токенов в секунду, capacity — максимальный всплеск. pause()
+    блокирует выдачу токенов по ключу на заданное время (например, по
+    Retry-After от внешнего API) сразу во всех процессах.
+    """
+
+    def __init__(self, prefix: str, rate: float, capacity: int):
+        self.prefix = prefix
+        self.rate = rate
+        self.capacity = capacity
+        self._script = None
+
+    def _keys(self, key: str):
+        return [f"{self.prefix}:bucket:{key}", f"{self.prefix}:pause:{key}"]
+
+    async def acquire(self, key: str, timeout: float = 60.0) -> None:
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + timeout
+        while True:
+            try:
+                if self._script is None:
+                    self._script = get_redis().register_script(_TOKEN_BUCKET_LUA)
+                wait_ms = await self._script(keys=self._keys(key), args=[self.rate, self.capacity])
+            except Exception as e:
+                # Недоступность Redis не должна останавливать работу — пропускаем запрос
+                logger.error(f"Rate limiter {self.prefix} unavailable: {e}")
+                return
+            if not wait_ms:
+                return
+            if loop.time() + wait_ms / 1000 > deadline:
+                raise TimeoutError(f"Rate limit wait for {self.prefix}:{key} exceeded {timeout}s")
+            await asyncio.sleep(wait_ms / 1000)
+
+    async def pause(self, key: str, seconds: float) -> None:
+        try:
+            await get_redis().set(self._keys(key)[1], 1, px=max(int(seconds * 1000), 1))
+        except Exception as e:
+            logger.error(f"Failed to pause rate limiter {self.prefix}:{key}: {e}")
@@ -0,0 +1,22 @@
+import redis.asyncio as aioredis
+
+from src.core.settings import settings
+
+_redis: aioredis.Redis | None = None
+
+
+def get_redis() -> aioredis.Redis:
+    """Общий асинхронный клиент Redis (пул соединений создаётся лениво)"""
+    global _redis
+
+    if _redis is None:
+        _redis = aioredis.from_url(settings.REDIS_URL)
+    return _redis
+
+
+async def close_redis() -> None:
+    global _redis
+
+    if _redis is not None:
+        await _redis.aclose()
+        _redis = None
@@ -15,6 +15,125 @@ class Settings:
     JWT_REFRESH_EXPIRE_MINUTES: int = 60 * 24 * 7
     LLM_SERVICE_URL: str = os.getenv('LLM_SERVICE_URL')
     PLATFORM_BACKEND_URL: str = os.getenv('PLATFORM_BACKEND_URL')
+    REDIS_URL: str = os.getenv('REDIS_URL', 'redis://redis:6379/0')
+    LLM_TIMEOUT: float = float(os.getenv('LLM_TIMEOUT', 120))
+    LLM_MAX_CONNECTIONS: int = int(os.getenv('LLM_MAX_CONNECTIONS', 100))
+    LLM_MAX_KEEPALIVE_CONNECTIONS: int = int(os.getenv('LLM_MAX_KEEPALIVE_CONNECTIONS', 20))
+    LLM_ENDPOINT_CONCURRENCY: int = int(os.getenv('LLM_ENDPOINT_CONCURRENCY', 16))
+    LLM_ANALYZE_CONCURRENCY: int = int(os.getenv('LLM_ANALYZE_CONCURRENCY', 32))
+    # Сколько резюме одной сессии отправлять в LLM одним запросом (1 — пакетный режим выключен)
+    LLM_BATCH_SIZE: int = int(os.getenv('LLM_BATCH_SIZE', 10))
+    HH_API_URL: str = os.getenv('HH_API_URL', 'https://api.hh.ru')
+    HH_USER_AGENT: str = os.getenv('HH_USER_AGENT', 'AtlantysHR/1.0 (support@atlantys.kz)')
+    HH_MAX_CONNECTIONS: int = int(os.getenv('HH_MAX_CONNECTIONS', 50))
+    # Лимит запросов к HH на один аккаунт, общий для всех реплик (см. RedisTokenBucket)
+    HH_RATE_LIMIT_PER_SECOND: float = float(os.getenv('HH_RATE_LIMIT_PER_SECOND', 7))
+    HH_RATE_LIMIT_BURST: int = int(os.getenv('HH_RATE_LIMIT_BURST', 10))
+    HH_PAGE_CONCURRENCY: int = int(os.getenv('HH_PAGE_CONCURRENCY', 5))
+    # Размер страницы откликов в фоновом анализе вакансии (одна страница — одна контрольная точка)
+    HH_ANALYSIS_PAGE_SIZE: int = int(os.getenv('HH_ANALYSIS_PAGE_SIZE', 50))
+    # Периодическая инкрементальная синхронизация больших вакансий HH
+    HH_SYNC_INTERVAL_MINUTES: int = int(os.getenv('HH_SYNC_INTERVAL_MINUTES', 60))
+    HH_SYNC_MAX_AGE_DAYS: int = int(os.getenv('HH_SYNC_MAX_AGE_DAYS', 30))
+    HH_SYNC_MIN_TASKS: int = int(os.getenv('HH_SYNC_MIN_TASKS', 50))
+    HH_SYNC_BATCH_SIZE: int = int(os.getenv('HH_SYNC_BATCH_SIZE', 100))
+    # Массовая рассылка WhatsApp: лимит sendMessage на один инстанс Green API, общий для всех воркеров
+    GREEN_API_RATE_LIMIT_PER_SECOND: float = float(os.getenv('GREEN_API_RATE_LIMIT_PER_SECOND', 1))
+    GREEN_API_RATE_LIMIT_BURST: int = int(os.getenv('GREEN_API_RATE_LIMIT_BURST', 5))
+    WHATSAPP_BULK_CONCURRENCY: int = int(os.getenv('WHATSAPP_BULK_CONCURRENCY', 10))
+    # Сколько отправок записывать в БД одной транзакцией
+    WHATSAPP_BULK_CHUNK_SIZE: int = int(os.getenv('WHATSAPP_BULK_CHUNK_SIZE', 100))
+    LLM_ANALYSIS_PROMPT_VERSION: str = os.getenv('LLM_ANALYSIS_PROMPT_VERSION', 'v1')
+    LLM_ANALYSIS_MODEL: str = os.getenv('LLM_ANALYSIS_MODEL', 'default')
+    ANALYSIS_CACHE_TTL_HOURS: int = int(os.getenv('ANALYSIS_CACHE_TTL_HOURS', 24 * 30))
+    # Доля стоимости исходного анализа, списываемая при попадании в кэш (1.0 — полная цена, 0 — бесплатно)
+    ANALYSIS_CACHE_BILLING_RATE: float = float(os.getenv('ANALYSIS_CACHE_BILLING_RATE', 1.0))
+    # Сколько ATL токенов резервируется на анализ одного резюме до ответа LLM
+    ANALYSIS_RESERVE_ATL_TOKENS: float = float(os.getenv('ANALYSIS_RESERVE_ATL_TOKENS', 5))
+    BALANCE_RESERVATION_TTL_MINUTES: int = int(os.getenv('BALANCE_RESERVATION_TTL_MINUTES', 60))
+    # Резерв задачи, которая всё ещё в статусе pending, снимается только после
+    # стольких часов (воркер упал, не завершив задачу)
+    BALANCE_RESERVATION_MAX_HOURS: int = int(os.getenv('BALANCE_RESERVATION_MAX_HOURS', 24))
+    BALANCE_LEDGER_RETENTION_DAYS: int = int(os.getenv('BALANCE_LEDGER_RETENTION_DAYS', 7))
+    # Пул процессов для извлечения текста из PDF/DOCX (ExtractionEngine)
+    EXTRACTION_WORKERS: int = int(os.getenv('EXTRACTION_WORKERS', os.cpu_count() or 2))
+    EXTRACTION_TIMEOUT: float = float(os.getenv('EXTRACTION_TIMEOUT', 30))
+    EXTRACTION_MAX_PAGES: int = int(os.getenv('EXTRACTION_MAX_PAGES', 30))
+    # Кэш извлечённого текста резюме по SHA-256 файла (ExtractionCache)
+    EXTRACTION_CACHE_LOCAL_BYTES: int = int(os.getenv('EXTRACTION_CACHE_LOCAL_BYTES', 64 * 1024 * 1024))
+    EXTRACTION_CACHE_TTL: int = int(os.getenv('EXTRACTION_CACHE_TTL', 60 * 60 * 24 * 14))
+    EXTRACTION_CACHE_MAX_ENTRY_BYTES: int = int(os.getenv('EXTRACTION_CACHE_MAX_ENTRY_BYTES', 1024 * 1024))
+    # Сколько обычных (не progress) сообщений может ждать отправки одному WebSocket.
+    # Если клиент не успевает их забирать, соединение закрывается.
+    WS_SEND_QUEUE_SIZE: int = int(os.getenv('WS_SEND_QUEUE_SIZE', 256))
+    # Окно, в течение которого события прогресса одного канала схлопываются в одно
+    WS_COALESCE_INTERVAL: float = float(os.getenv('WS_COALESCE_INTERVAL', 0.2))
+    WS_SEND_TIMEOUT: float = float(os.getenv('WS_SEND_TIMEOUT', 10))
+    # Кэш полных резюме HH (HHResumeCache)
+    HH_RESUME_CACHE_LOCAL_BYTES: int = int(os.getenv('HH_RESUME_CACHE_LOCAL_BYTES', 32 * 1024 * 1024))
+    # Сколько хранить резюме в Redis (в том числе для условной ревалидации)
+    HH_RESUME_CACHE_TTL: int = int(os.getenv('HH_RESUME_CACHE_TTL', 60 * 60 * 24 * 7))
+    # В течение этого времени резюме отдаётся без обращения к HH
+    HH_RESUME_CACHE_FRESH_SECONDS: int = int(os.getenv('HH_RESUME_CACHE_FRESH_SECONDS', 15 * 60))
+    # Учётные данные HH в памяти процесса (HHCredentialProvider)
+    HH_CREDENTIALS_CACHE_TTL: int = int(os.getenv('HH_CREDENTIALS_CACHE_TTL', 60))
+    # За сколько до expires_at запускать фоновое обновление токена HH
+    HH_TOKEN_REFRESH_AHEAD: int = int(os.getenv('HH_TOKEN_REFRESH_AHEAD', 30 * 60))
+    # Токен, истекающий раньше этого, обновляется синхронно перед запросом
+    HH_TOKEN_MIN_VALIDITY: int = int(os.getenv('HH_TOKEN_MIN_VALIDITY', 5 * 60))
+    HH_TOKEN_REFRESH_LOCK_TTL: int = int(os.getenv('HH_TOKEN_REFRESH_LOCK_TTL', 30))
+    # Пауза перед новой фоновой попыткой обновления после неудачной
+    HH_TOKEN_REFRESH_RETRY_AFTER: int = int(os.getenv('HH_TOKEN_REFRESH_RETRY_AFTER', 60))
+    # Загрузки не больше стольких резюме анализируются в интерактивной полосе (analysis_interactive)
+    ANALYSIS_INTERACTIVE_MAX_RESUMES: int = int(os.getenv('ANALYSIS_INTERACTIVE_MAX_RESUMES', 10))
+    # Outbox relay: размер пачки, пауза между опросами (сек), срок хранения
+    # отправленных сообщений (ч), период очистки (сек) и число попыток до dead.
+    # Пока Redis недоступен, пауза между опросами удваивается до OUTBOX_MAX_BACKOFF (сек)
+    OUTBOX_BATCH_SIZE: int = int(os.getenv('OUTBOX_BATCH_SIZE', 500))
+    OUTBOX_POLL_INTERVAL: float = float(os.getenv('OUTBOX_POLL_INTERVAL', 0.5))
+    OUTBOX_MAX_BACKOFF: float = float(os.getenv('OUTBOX_MAX_BACKOFF', 30))
+    OUTBOX_RETENTION_HOURS: int = int(os.getenv('OUTBOX_RETENTION_HOURS', 24))
+    OUTBOX_PURGE_INTERVAL: int = int(os.getenv('OUTBOX_PURGE_INTERVAL', 600))
+    OUTBOX_MAX_ATTEMPTS: int = int(os.getenv('OUTBOX_MAX_ATTEMPTS', 10))
+    # Сколько сообщений одной организации может обрабатываться одновременно на всех воркерах
+    TENANT_MAX_IN_FLIGHT: int = int(os.getenv('TENANT_MAX_IN_FLIGHT', 4))
+    # Через сколько (мс) вернуть в очередь сообщение организации, исчерпавшей лимит
+    TENANT_DEFER_MS: int = int(os.getenv('TENANT_DEFER_MS', 1000))
+    # Слот освобождается сам, если воркер упал, не дойдя до after_process_message
+    TENANT_LEASE_SECONDS: int = int(os.getenv('TENANT_LEASE_SECONDS', 15 * 60))
+    # Счётчики ожидания организации удаляются, если её сообщений не было столько секунд
+    TENANT_STATS_TTL: int = int(os.getenv('TENANT_STATS_TTL', 7 * 24 * 60 * 60))
+    # Общий пул исходящих HTTP-соединений (HH, Green API и др.): лимиты соединений,
+    # TTL DNS-кэша и keep-alive (сек), таймаут запроса (сек), повторы и базовая пауза между ними (сек)
+    OUTBOUND_HTTP_MAX_CONNECTIONS: int = int(os.getenv('OUTBOUND_HTTP_MAX_CONNECTIONS', 200))
+    OUTBOUND_HTTP_MAX_CONNECTIONS_PER_HOST: int = int(os.getenv('OUTBOUND_HTTP_MAX_CONNECTIONS_PER_HOST', 30))
+    OUTBOUND_HTTP_DNS_CACHE_TTL: int = int(os.getenv('OUTBOUND_HTTP_DNS_CACHE_TTL', 300))
+    OUTBOUND_HTTP_KEEPALIVE_TIMEOUT: float = float(os.getenv('OUTBOUND_HTTP_KEEPALIVE_TIMEOUT', 30))
+    OUTBOUND_HTTP_TIMEOUT: float = float(os.getenv('OUTBOUND_HTTP_TIMEOUT', 30))
+    OUTBOUND_HTTP_RETRIES: int = int(os.getenv('OUTBOUND_HTTP_RETRIES', 2))
+    OUTBOUND_HTTP_BACKOFF: float = float(os.getenv('OUTBOUND_HTTP_BACKOFF', 0.5))
+    # Вебхуки Green API: TTL флага «обработчик запланирован» (сек), задержка перед
+    # обработкой, за которую копится пачка (мс), размер пачки, срок памяти idMessage
+    # для дедупликации (сек) и TTL кэша инстансов WhatsApp (сек)
+    WHATSAPP_WEBHOOK_SCHEDULED_TTL: int = int(os.getenv('WHATSAPP_WEBHOOK_SCHEDULED_TTL', 60))
+    WHATSAPP_WEBHOOK_BATCH_DELAY_MS: int = int(os.getenv('WHATSAPP_WEBHOOK_BATCH_DELAY_MS', 200))
+    # Через сколько (мс) повторить пачку, обработка которой завершилась ошибкой
+    WHATSAPP_WEBHOOK_RETRY_DELAY_MS: int = int(os.getenv('WHATSAPP_WEBHOOK_RETRY_DELAY_MS', 5000))
+    WHATSAPP_WEBHOOK_BATCH_SIZE: int = int(os.getenv('WHATSAPP_WEBHOOK_BATCH_SIZE', 200))
+    WHATSAPP_WEBHOOK_DEDUP_TTL: int = int(os.getenv('WHATSAPP_WEBHOOK_DEDUP_TTL', 24 * 60 * 60))
+    WHATSAPP_INSTANCE_CACHE_TTL: int = int(os.getenv('WHATSAPP_INSTANCE_CACHE_TTL', 60))
+    # Конвейер загрузки резюме: сколько файлов одновременно разбирается и загружается
+    # в MinIO, ёмкость очередей между стадиями, размер порции задач и как часто
+    # (сек) отдавать неполную порцию
+    RESUME_EXTRACT_CONCURRENCY: int = int(os.getenv('RESUME_EXTRACT_CONCURRENCY', 4))
+    RESUME_UPLOAD_CONCURRENCY: int = int(os.getenv('RESUME_UPLOAD_CONCURRENCY', 8))
+    RESUME_INGESTION_QUEUE_SIZE: int = int(os.getenv('RESUME_INGESTION_QUEUE_SIZE', 16))
+    RESUME_INGESTION_BATCH_SIZE: int = int(os.getenv('RESUME_INGESTION_BATCH_SIZE', 25))
+    RESUME_INGESTION_FLUSH_INTERVAL: float = float(os.getenv('RESUME_INGESTION_FLUSH_INTERVAL', 1.0))
+
+    @property
+    def analysis_cache_version(self) -> str:
+        return f"{self.LLM_ANALYSIS_PROMPT_VERSION}:{self.LLM_ANALYSIS_MODEL}"
 
     @property
     def get_db_url(self):
@@ -2,7 +2,13 @@ from contextlib import asynccontextmanager
 from typing import AsyncGenerator
 from fastapi import FastAPI
 from src.core.databases import insert_assistants, session_manager,insert_roles
+from src.core.redis_cli import close_redis
 from src.models import Base
+from src.services.extraction_engine import extraction_engine_lifespan
+from src.services.hh_client import hh_client_lifespan
+from src.services.http_clients import http_clients_lifespan
+from src.services.llm_client import llm_client_lifespan
+from src.services.websocket import manager as ws_manager
 
 
 class StoreManager:
@@ -61,5 +67,12 @@ async def store_lifespan() -> AsyncGenerator[StoreManager, None]:
 
 @asynccontextmanager
 async def lifespan(*_: FastAPI) -> AsyncGenerator[None, None]:
-    async with store_lifespan():
-        yield
\ No newline at end of file
+    # Пул процессов поднимаем до подключения к БД, чтобы форкнутые
+    # воркеры не наследовали открытые соединения.
+    async with extraction_engine_lifespan():
+        async with store_lifespan(), llm_client_lifespan(), hh_client_lifespan(), http_clients_lifespan():
+            try:
+                yield
+            finally:
+                await ws_manager.close()
+                await close_redis()
\ No newline at end of file
@@ -9,8 +9,13 @@ from sqlalchemy.future import select
 
 from src.core.celery_config import celery_app
 from src.core.databases import session_manager
+from src.core.settings import settings
 from src.models.balance import Balance
+from src.repositories.analysis_result_cache import AnalysisResultCacheRepository
 from src.repositories.balance import BalanceRepository
+from src.repositories.balance_ledger import BalanceLedgerRepository
+from src.repositories.hh_analysis_job import HHAnalysisJobRepository
+from src.repositories.outbox import OutboxRepository
 
 # Setup logging
 logging.basicConfig(level=logging.INFO)
@@ -23,6 +28,18 @@ celery_app.conf.beat_schedule = {
         'task': 'tasks.process_expired_free_trials',
         'schedule': crontab(hour=0, minute=0),  # Run daily at midnight
     },
+    'purge-expired-analysis-cache': {
+        'task': 'tasks.purge_expired_analysis_cache',
+        'schedule': crontab(hour=3, minute=0),
+    },
+    'compact-balance-ledger': {
+        'task': 'tasks.compact_balance_ledger',
+        'schedule': crontab(minute=15),  # Every hour
+    },
+    'sync-hh-vacancies': {
+        'task': 'tasks.sync_hh_vacancies',
+        'schedule': crontab(minute='*/15'),
+    },
 }
 
 
@@ -70,6 +87,89 @@ async def _process_expired_free_trials():
         raise
 
 
+@celery_app.task
+def purge_expired_analysis_cache():
+    logger.info("Purging expired LLM analysis cache entries...")
+    loop = asyncio.new_event_loop()
+    asyncio.set_event_loop(loop)
+    return loop.run_until_complete(_purge_expired_analysis_cache())
+
+
+async def _purge_expired_analysis_cache():
+    async with session_manager.session() as session:
+        async with session.begin():
+            deleted = await AnalysisResultCacheRepository(session).delete_expired()
+    logger.info("Deleted %d expired analysis cache entries.", deleted)
+    return {"deleted": deleted}
+
+
+@celery_app.task
+def compact_balance_ledger():
+    logger.info("Releasing stale reservations and compacting balance ledger...")
+    loop = asyncio.new_event_loop()
+    asyncio.set_event_loop(loop)
+    return loop.run_until_complete(_compact_balance_ledger())
+
+
+async def _compact_balance_ledger():
+    now = datetime.utcnow()
+    released = 0
+
+    async with session_manager.session() as session:
+        # Резервы упавших воркеров возвращаем на баланс, каждый в своей транзакции
+        async with session.begin():
+            stale_ids = await BalanceLedgerRepository(session).get_stale_reservation_ids(
+                now - timedelta(minutes=settings.BALANCE_RESERVATION_TTL_MINUTES),
+                abandoned_before=now - timedelta(hours=settings.BALANCE_RESERVATION_MAX_HOURS)
+            )
+        for reservation_id in stale_ids:
+            async with session.begin():
+                if await BalanceLedgerRepository(session).release(reservation_id):
+                    released += 1
+
+        async with session.begin():
+            compacted = await BalanceLedgerRepository(session).compact(
+                now - timedelta(days=settings.BALANCE_LEDGER_RETENTION_DAYS)
+            )
+
+    logger.info("Released %d stale reservations, compacted %d ledger entries.", released, compacted)
+    return {"released": released, "compacted": compacted}
+
+
+@celery_app.task
+def sync_hh_vacancies():
+    logger.info("Starting incremental HH vacancy sync...")
+    loop = asyncio.new_event_loop()
+    asyncio.set_event_loop(loop)
+    return loop.run_until_complete(_sync_hh_vacancies())
+
+
+async def _sync_hh_vacancies():
+    from src.core.dramatiq_worker import DramatiqWorker
+
+    now = datetime.utcnow()
+    started = []
+    async with session_manager.session() as session:
+        async with session.begin():
+            job_ids = await HHAnalysisJobRepository(session).get_due_for_sync(
+                synced_before=now - timedelta(minutes=settings.HH_SYNC_INTERVAL_MINUTES),
+                created_after=now - timedelta(days=settings.HH_SYNC_MAX_AGE_DAYS),
+                min_tasks=settings.HH_SYNC_MIN_TASKS,
+                limit=settings.HH_SYNC_BATCH_SIZE,
+            )
+        # Задача догоняет только отклики новее водяного знака и не переоценивает неизменившиеся резюме
+        for job_id in job_ids:
+            async with session.begin():
+                if await HHAnalysisJobRepository(session).restart(job_id) is not None:
+                    await OutboxRepository(session).add_messages(
+                        [DramatiqWorker.process_hh_analysis_job.message(job_id)]
+                    )
+                    started.append(job_id)
+
+    logger.info("Started incremental sync for %d HH vacancies.", len(started))
+    return {"started": len(started)}
+
+
 @shared_task
 def free_trial_tracker(balance_id):
     logger.info("Starting expired free trial processing for balance_id=%s", balance_id)
@@ -59,6 +59,10 @@ from .user_interaction import UserInteraction
 from .question_generate_session import QuestionGenerateSession
 from .question_generate_session import GenerateStatus
 from .candidate_info import CandidateInfo
+from .analysis_result_cache import AnalysisResultCache
+from .balance_ledger import BalanceLedgerEntry
+from .hh_analysis_job import HHAnalysisJob
+from .outbox import OutboxMessage
 
 sql_admin_models_list = [
     User,
@@ -90,5 +94,9 @@ sql_admin_models_list = [
     CurrentWhatsappInstance,
     UserInteraction,
     QuestionGenerateSession,
-    CandidateInfo
+    CandidateInfo,
+    AnalysisResultCache,
+    BalanceLedgerEntry,
+    HHAnalysisJob,
+    OutboxMessage
 ]
@@ -0,0 +1,32 @@
+from datetime import datetime
+
+import sqlalchemy as sa
+import sqlalchemy.orm as so
+
+from src.models import Base
+
+
+class AnalysisResultCache(Base):
+    """
+    Кэш результатов LLM-анализа резюме по паре (хэш вакансии, хэш резюме).
+    version включает версию промпта и модели, поэтому смена любого из них
+    автоматически делает старые записи неактуальными.
+    """
+    __tablename__ = 'analysis_result_cache'
+
+    id: so.Mapped[int] = so.mapped_column(sa.Integer, primary_key=True, autoincrement=True)
+    vacancy_hash: so.Mapped[str] = so.mapped_column(sa.String(64), nullable=False)
+    resume_hash: so.Mapped[str] = so.mapped_column(sa.String(64), nullable=False)
+    version: so.Mapped[str] = so.mapped_column(sa.String, nullable=False)
+    result_data: so.Mapped[dict] = so.mapped_column(sa.JSON, nullable=False)
+    tokens_spent: so.Mapped[int] = so.mapped_column(sa.Integer, nullable=False, default=0)
+    hits: so.Mapped[int] = so.mapped_column(sa.Integer, nullable=False, default=0)
+    created_at: so.Mapped[datetime] = so.mapped_column(sa.DateTime, default=datetime.utcnow, nullable=False)
+    expires_at: so.Mapped[datetime] = so.mapped_column(sa.DateTime, nullable=False, index=True)
+
+    __table_args__ = (
+        sa.UniqueConstraint('vacancy_hash', 'resume_hash', 'version', name='uq_analysis_result_cache_key'),
+    )
+
+    def __str__(self):
+        return f"{self.id}"
@@ -0,0 +1,49 @@
+from datetime import datetime
+
+import sqlalchemy as sa
+import sqlalchemy.orm as so
+
+from src.models import Base
+
+
+class LedgerEntryType:
+    RESERVE = 'reserve'
+    COMMIT = 'commit'
+    RELEASE = 'release'
+    COMPACTED = 'compacted'
+
+
+class BalanceLedgerEntry(Base):
+    """
+    Журнал движения ATL токенов (только добавление записей).
+
+    amount — изменение balances.atl_tokens, которое внесла запись:
+    reserve списывает резерв, commit возвращает неиспользованный остаток
+    (или доплачивает), release возвращает резерв целиком. Завершённые
+    резервы периодически сворачиваются в записи compacted.
+    """
+    __tablename__ = 'balance_ledger'
+
+    id: so.Mapped[int] = so.mapped_column(sa.BigInteger, primary_key=True, autoincrement=True)
+    organization_id: so.Mapped[int] = so.mapped_column(sa.ForeignKey('organizations.id', ondelete="CASCADE"),
+                                                       nullable=False, index=True)
+    reservation_id: so.Mapped[str] = so.mapped_column(sa.String(36), nullable=True, index=True)
+    entry_type: so.Mapped[str] = so.mapped_column(sa.String(16), nullable=False)
+    amount: so.Mapped[float] = so.mapped_column(sa.Float, nullable=False, default=0.0)
+    spent: so.Mapped[float] = so.mapped_column(sa.Float, nullable=True)
+    reference: so.Mapped[str] = so.mapped_column(sa.String, nullable=True)
+    created_at: so.Mapped[datetime] = so.mapped_column(sa.DateTime, default=datetime.utcnow, nullable=False)
+
+    __table_args__ = (
+        # Резерв можно завершить только один раз (commit или release)
+        sa.Index(
+            'uq_balance_ledger_settlement',
+            'reservation_id',
+            unique=True,
+            postgresql_where=sa.text("entry_type IN ('commit', 'release')")
+        ),
+        sa.Index('ix_balance_ledger_type_created_at', 'entry_type', 'created_at'),
+    )
+
+    def __str__(self):
+        return f"{self.id}"
@@ -24,6 +24,11 @@ class BalanceUsage(Base, TimestampMixin):
     organization = so.relationship('Organization', back_populates='balance_usages')
     balance = so.relationship('Balance', back_populates='balance_usages')
     assistant = so.relationship('Assistant', back_populates='balance_usages')
-    
+
+    __table_args__ = (
+        # История списаний пользователя в организации, новые сверху (get_balance_usage)
+        sa.Index('ix_balance_usage_user_org_created', 'user_id', 'organization_id', 'created_at'),
+    )
+
     def __str__(self):
         return f"{self.id}"
\ No newline at end of file
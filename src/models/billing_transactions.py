@@ -19,7 +19,7 @@ class BillingTransaction(Base, TimestampMixin):
     status: so.Mapped[str] = so.mapped_column(sa.String, default='pending')
     type: so.Mapped[str] = so.mapped_column(sa.String, nullable=True)
     access_token: so.Mapped[str] = so.mapped_column(sa.String, nullable=True)
-    invoice_id: so.Mapped[str] = so.mapped_column(sa.String, nullable=True)
+    invoice_id: so.Mapped[str] = so.mapped_column(sa.String, nullable=True, index=True)
     bank_transaction_id: so.Mapped[str] = so.mapped_column(sa.String, nullable=True)
     payment_type: so.Mapped[str] = so.mapped_column(sa.String, nullable=True,default='card')
 
@@ -18,7 +18,10 @@ class ChatMessageHistory(Base,TimestampMixin):
     role: so.Mapped[str] = so.mapped_column(sa.String,nullable=True)
     message: so.Mapped[dict] = so.mapped_column(sa.JSON,nullable=True)
 
-    
+    __table_args__ = (
+        # История чата сессии в порядке сообщений
+        sa.Index('ix_chat_history_messages_session_created', 'session_id', 'created_at'),
+    )
 
     def __str__(self):
         return f"{self.id}"
\ No newline at end of file
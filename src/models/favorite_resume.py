@@ -24,14 +24,14 @@ class FavoriteResume(Base, TimestampMixin):
     session_id: so.Mapped[uuid.UUID] = so.mapped_column(sa.ForeignKey('assistant_sessions.id', ondelete="CASCADE"),
                                                         nullable=True)
     resume_id: so.Mapped[int] = so.mapped_column(sa.ForeignKey('hr_assistant_tasks.id', ondelete="CASCADE"),
-                                                 nullable=False)
+                                                 nullable=False, index=True)
     question_for_candidate: so.Mapped[dict] = so.mapped_column(sa.JSON(), nullable=True)
     stage: so.Mapped[str] = so.mapped_column(sa.String, nullable=True, default='phone interview')
     phone_number: so.Mapped[str] = so.mapped_column(sa.String, nullable=True, )
 
     recording_file: so.Mapped[str] = so.mapped_column(sa.String, nullable=True)
     is_responded: so.Mapped[bool] = so.mapped_column(sa.Boolean, default=False, nullable=True)
-    call_sid: so.Mapped[str] = so.mapped_column(sa.String, nullable=True, )
+    call_sid: so.Mapped[str] = so.mapped_column(sa.String, nullable=True, index=True)
     call_status: so.Mapped[str] = so.mapped_column(postgresql.ENUM(CallStatus, name='callstatus', create_type=False), nullable=True)
 
     user = so.relationship("User", back_populates="favorite_resumes")
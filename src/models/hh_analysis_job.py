@@ -0,0 +1,59 @@
+import uuid
+from datetime import datetime
+
+import sqlalchemy as sa
+import sqlalchemy.orm as so
+
+from src.models import Base
+
+
+class HHAnalysisJobStatus:
+    PENDING = 'pending'
+    RUNNING = 'running'
+    COMPLETED = 'completed'
+    FAILED = 'failed'
+
+
+class HHAnalysisJob(Base):
+    """
+    Фоновый анализ откликов на вакансию HH в рамках сессии.
+
+    last_page — последняя страница откликов, задачи по которой уже созданы;
+    перезапуск продолжает со следующей. Для пары (сессия, вакансия) существует
+    одна задача, повторный запуск переиспользует её.
+
+    watermark_updated_at — максимальный updated_at отклика на момент последнего
+    завершённого прохода; следующие проходы читают только отклики новее него.
+    pending_watermark копит этот максимум в течение текущего прохода.
+    """
+    __tablename__ = 'hh_analysis_jobs'
+
+    id: so.Mapped[str] = so.mapped_column(sa.String(36), primary_key=True, default=lambda: str(uuid.uuid4()))
+    session_id: so.Mapped[uuid.UUID] = so.mapped_column(sa.ForeignKey('assistant_sessions.id', ondelete="CASCADE"),
+                                                        nullable=False)
+    user_id: so.Mapped[int] = so.mapped_column(sa.ForeignKey('users.id', ondelete="CASCADE"), nullable=False)
+    organization_id: so.Mapped[int] = so.mapped_column(sa.ForeignKey('organizations.id', ondelete="CASCADE"),
+                                                       nullable=False)
+    vacancy_id: so.Mapped[int] = so.mapped_column(sa.Integer, nullable=False)
+    status: so.Mapped[str] = so.mapped_column(sa.String(16), nullable=False, default=HHAnalysisJobStatus.PENDING)
+    pages_total: so.Mapped[int] = so.mapped_column(sa.Integer, nullable=True)
+    last_page: so.Mapped[int] = so.mapped_column(sa.Integer, nullable=False, default=-1)
+    resumes_found: so.Mapped[int] = so.mapped_column(sa.Integer, nullable=False, default=0)
+    tasks_created: so.Mapped[int] = so.mapped_column(sa.Integer, nullable=False, default=0)
+    skipped_resumes: so.Mapped[list] = so.mapped_column(sa.JSON, nullable=False, default=list)
+    error: so.Mapped[str] = so.mapped_column(sa.String, nullable=True)
+    watermark_updated_at: so.Mapped[datetime] = so.mapped_column(sa.DateTime, nullable=True)
+    pending_watermark: so.Mapped[datetime] = so.mapped_column(sa.DateTime, nullable=True)
+    last_synced_at: so.Mapped[datetime] = so.mapped_column(sa.DateTime, nullable=True)
+    # Периодически догонять новые отклики (см. tasks.sync_hh_vacancies)
+    auto_sync: so.Mapped[bool] = so.mapped_column(sa.Boolean, nullable=False, default=True, server_default=sa.true())
+    created_at: so.Mapped[datetime] = so.mapped_column(sa.DateTime, default=datetime.utcnow, nullable=False)
+    updated_at: so.Mapped[datetime] = so.mapped_column(sa.DateTime, default=datetime.utcnow,
+                                                       onupdate=datetime.utcnow, nullable=False)
+
+    __table_args__ = (
+        sa.UniqueConstraint('session_id', 'vacancy_id', name='uq_hh_analysis_jobs_session_vacancy'),
+    )
+
+    def __str__(self):
+        return f"{self.id}"
@@ -11,19 +11,29 @@ class HRTask(Base):
 
     id: so.Mapped[int] = so.mapped_column(sa.Integer, primary_key=True, autoincrement=True)
     session_id: so.Mapped[uuid.UUID] = so.mapped_column(sa.ForeignKey('assistant_sessions.id', ondelete="CASCADE"), nullable=False)
-    task_id: so.Mapped[str] = so.mapped_column(sa.String)
+    task_id: so.Mapped[str] = so.mapped_column(sa.String, index=True)
     resume_id: so.Mapped[str] = so.mapped_column(sa.String,nullable=True)
     vacancy_id: so.Mapped[int] = so.mapped_column(sa.Integer,nullable=True)
     task_status: so.Mapped[str] = so.mapped_column(sa.String, nullable=False)
     text_hash: so.Mapped[str] = so.mapped_column(sa.String, nullable=True,index=True)
     result_data: so.Mapped[dict] = so.mapped_column(sa.JSON, nullable=True)
     tokens_spent: so.Mapped[int] = so.mapped_column(sa.Integer,nullable=True)
+    # matching_percentage завершённой задачи, -1 пока результата нет (см. get_task_score)
+    score: so.Mapped[int] = so.mapped_column(sa.Integer, nullable=False, default=-1, server_default='-1')
     task_type: so.Mapped[str] = so.mapped_column(sa.String, nullable=False)
     file_key: so.Mapped[str] = so.mapped_column(sa.String, nullable=True) 
     created_at: so.Mapped[str] = so.mapped_column(sa.DateTime, default=datetime.utcnow)
     hh_file_url: so.Mapped[str] = so.mapped_column(sa.String, nullable=True)
+    # Карточка кандидата задачи: при повторной синхронизации HH обновляется она, а не создаётся новая
+    candidate_info_id: so.Mapped[int] = so.mapped_column(
+        sa.ForeignKey('candidate_info.id', ondelete="SET NULL"), nullable=True
+    )
     session = so.relationship("AssistantSession", back_populates="tasks")
     favorites = so.relationship("FavoriteResume", back_populates="task", cascade="all, delete-orphan")
 
+    __table_args__ = (
+        sa.Index('ix_hr_assistant_tasks_session_score', 'session_id', sa.text('score DESC'), sa.text('id DESC')),
+    )
+
     def __str__(self):
         return f"{self.id}"
\ No newline at end of file
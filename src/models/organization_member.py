@@ -8,7 +8,7 @@ class OrganizationMember(Base,TimestampMixin):
 
 
     id: so.Mapped[int] = so.mapped_column(sa.Integer,primary_key=True,autoincrement=True,index=True)
-    user_id: so.Mapped[int] = so.mapped_column(sa.ForeignKey('users.id',ondelete="CASCADE"),nullable=False)
+    user_id: so.Mapped[int] = so.mapped_column(sa.ForeignKey('users.id',ondelete="CASCADE"),nullable=False,index=True)
     organization_id:so.Mapped[int] = so.mapped_column(sa.ForeignKey('organizations.id',ondelete="CASCADE"),nullable=False)
     role_alias: so.Mapped[str] = so.mapped_column(sa.String(50),nullable=False)
     
@@ -0,0 +1,47 @@
+from datetime import datetime
+
+import sqlalchemy as sa
+import sqlalchemy.orm as so
+
+from src.models import Base
+
+
+class OutboxMessageStatus:
+    PENDING = 'pending'
+    PUBLISHED = 'published'
+    # Сообщение не удалось подготовить к отправке (неизвестный актор, не
+    # кодируется) max_attempts раз; relay его больше не берёт, вернуть в
+    # очередь можно через OutboxRepository.redrive_dead
+    DEAD = 'dead'
+
+
+class OutboxMessage(Base):
+    """
+    Сообщение Dramatiq, записанное в той же транзакции, что и данные, которые
+    оно обрабатывает. В очередь его переносит relay (src.core.outbox_relay)
+    уже после коммита; published_at проставляется в той же транзакции, где
+    сообщение было отправлено.
+    """
+    __tablename__ = 'outbox_messages'
+
+    id: so.Mapped[int] = so.mapped_column(sa.BigInteger, primary_key=True, autoincrement=True)
+    actor_name: so.Mapped[str] = so.mapped_column(sa.String, nullable=False)
+    queue_name: so.Mapped[str] = so.mapped_column(sa.String, nullable=False)
+    # Message.asdict() без redis_message_id — его назначает брокер при отправке
+    message: so.Mapped[dict] = so.mapped_column(sa.JSON, nullable=False)
+    status: so.Mapped[str] = so.mapped_column(
+        sa.String(16), nullable=False, default=OutboxMessageStatus.PENDING, server_default=OutboxMessageStatus.PENDING
+    )
+    attempts: so.Mapped[int] = so.mapped_column(sa.Integer, nullable=False, default=0, server_default='0')
+    error: so.Mapped[str] = so.mapped_column(sa.String, nullable=True)
+    created_at: so.Mapped[datetime] = so.mapped_column(sa.DateTime, default=datetime.utcnow, nullable=False)
+    published_at: so.Mapped[datetime] = so.mapped_column(sa.DateTime, nullable=True)
+
+    __table_args__ = (
+        # Relay читает только ожидающие отправки сообщения
+        sa.Index('ix_outbox_messages_pending', 'id', postgresql_where=sa.text("status = 'pending'")),
+        sa.Index('ix_outbox_messages_published_at', 'published_at'),
+    )
+
+    def __str__(self):
+        return f"{self.id}"
@@ -39,3 +39,16 @@ class UserInteraction(Base):
     is_ignored = sa.Column(sa.Boolean, default=False, nullable=True)
     is_hh = sa.Column(sa.Boolean, default=False)
     is_whatsapp = sa.Column(sa.Boolean, default=False)
+
+    __table_args__ = (
+        # Последнее взаимодействие с чатом на инстансе — вебхуки и рассылки
+        sa.Index(
+            'ix_user_interactions_chat_instance_last', 'chat_id', 'instance_id',
+            postgresql_where=sa.text('is_last')
+        ),
+        sa.Index('ix_user_interactions_session_chat', 'session_id', 'chat_id'),
+        sa.Index(
+            'ix_user_interactions_session_ignored', 'session_id',
+            postgresql_where=sa.text('is_ignored AND is_last')
+        ),
+    )
@@ -11,7 +11,8 @@ class Vacancy(Base,TimestampMixin):
     id: so.Mapped[uuid.UUID] = so.mapped_column(sa.UUID(as_uuid=True), primary_key=True, default=uuid.uuid4, index=True)
     session_id: so.Mapped[uuid.UUID] = so.mapped_column(
         sa.ForeignKey('assistant_sessions.id', ondelete='CASCADE'),
-        nullable=False
+        nullable=False,
+        index=True
     )
     title:so.Mapped[str] = so.mapped_column(sa.String(50),nullable=False)
     user_id: so.Mapped[int] = so.mapped_column(sa.ForeignKey('users.id',ondelete='CASCADE'),nullable=False)
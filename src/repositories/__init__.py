@@ -40,6 +40,10 @@ from .user_interaction_repository import UserInteractionRepository
 from .question_generate_session import QuestionGenerateSessionRepository
 from .vacancy import VacancyRepository
 from .candidate_info import CandidateInfo
+from .analysis_result_cache import AnalysisResultCacheRepository
+from .balance_ledger import BalanceLedgerRepository
+from .hh_analysis_job import HHAnalysisJobRepository
+from .outbox import OutboxRepository
 
 __all__ = [
     "WhatsappInstanceRepository",
@@ -66,4 +70,8 @@ __all__ = [
     "WhatsappInstanceAssociationRepository",
     "CurrentWhatsappInstanceRepository",
     "UserInteractionRepository",
+    "AnalysisResultCacheRepository",
+    "BalanceLedgerRepository",
+    "HHAnalysisJobRepository",
+    "OutboxRepository",
 ]
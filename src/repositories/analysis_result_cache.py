@@ -0,0 +1,110 @@
+from datetime import datetime, timedelta
+from typing import Dict, List, Optional, Tuple
+
+from sqlalchemy import delete, select, update
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from src.models.analysis_result_cache import AnalysisResultCache
+
+
+class AnalysisResultCacheRepository:
+    def __init__(self, session: AsyncSession):
+        self.session = session
+
+    async def get(self, vacancy_hash: str, resume_hash: str, version: str) -> Optional[AnalysisResultCache]:
+        cached = await self.get_many(vacancy_hash, [resume_hash], version)
+        return cached.get(resume_hash)
+
+    async def get_many(self, vacancy_hash: str, resume_hashes: List[str], version: str) -> Dict[str, AnalysisResultCache]:
+        """Обычный SELECT без блокировок; попадания учитываются отдельно через record_hits"""
+        if not resume_hashes:
+            return {}
+        stmt = (
+            select(AnalysisResultCache)
+            .where(
+                AnalysisResultCache.vacancy_hash == vacancy_hash,
+                AnalysisResultCache.resume_hash.in_(resume_hashes),
+                AnalysisResultCache.version == version,
+                AnalysisResultCache.expires_at > datetime.utcnow()
+            )
+        )
+        result = await self.session.execute(stmt)
+        return {row.resume_hash: row for row in result.scalars().all()}
+
+    async def record_hits(self, cache_ids: List[int]) -> None:
+        if not cache_ids:
+            return
+        await self.session.execute(
+            update(AnalysisResultCache)
+            .where(AnalysisResultCache.id.in_(cache_ids))
+            .values(hits=AnalysisResultCache.hits + 1)
+            .execution_options(synchronize_session=False)
+        )
+
+    async def put(
+            self,
+            vacancy_hash: str,
+            resume_hash: str,
+            version: str,
+            result_data: dict,
+            tokens_spent: int,
+            ttl: timedelta
+    ) -> None:
+        await self.put_many(vacancy_hash, version, [(resume_hash, result_data, tokens_spent)], ttl)
+
+    async def put_many(
+            self,
+            vacancy_hash: str,
+            version: str,
+            entries: List[Tuple[str, dict, int]],
+            ttl: timedelta
+    ) -> None:
+        """entries: [(resume_hash, result_data, tokens_spent), ...]"""
+        # В одном INSERT ... ON CONFLICT ключ не может повторяться
+        entries = list({resume_hash: (resume_hash, data, tokens) for resume_hash, data, tokens in entries}.values())
+        if not entries:
+            return
+        now = datetime.utcnow()
+        stmt = insert(AnalysisResultCache).values([
+            {
+                "vacancy_hash": vacancy_hash,
+                "resume_hash": resume_hash,
+                "version": version,
+                "result_data": result_data,
+                "tokens_spent": tokens_spent,
+                "hits": 0,
+                "created_at": now,
+                "expires_at": now + ttl,
+            }
+            for resume_hash, result_data, tokens_spent in entries
+        ])
+        stmt = stmt.on_conflict_do_update(
+            constraint='uq_analysis_result_cache_key',
+            set_={
+                "result_data": stmt.excluded.result_data,
+                "tokens_spent": stmt.excluded.tokens_spent,
+                "created_at": stmt.excluded.created_at,
+                "expires_at": stmt.excluded.expires_at,
+            }
+        )
+        await self.session.execute(stmt)
+
+    async def invalidate(
+            self,
+            vacancy_hashes: List[str],
+            resume_hashes: Optional[List[str]] = None
+    ) -> int:
+        """Удаляет записи кэша вакансий vacancy_hashes (при resume_hashes — только этих резюме)."""
+        if not vacancy_hashes:
+            return 0
+        stmt = delete(AnalysisResultCache).where(AnalysisResultCache.vacancy_hash.in_(vacancy_hashes))
+        if resume_hashes is not None:
+            stmt = stmt.where(AnalysisResultCache.resume_hash.in_(resume_hashes))
+        result = await self.session.execute(stmt)
+        return result.rowcount
+
+    async def delete_expired(self) -> int:
+        stmt = delete(AnalysisResultCache).where(AnalysisResultCache.expires_at <= datetime.utcnow())
+        result = await self.session.execute(stmt)
+        return result.rowcount
@@ -0,0 +1,251 @@
+import uuid
+from datetime import datetime
+from typing import List, Optional, Tuple
+
+from sqlalchemy import and_, delete, func, literal, select, text, update
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from src.models.balance import Balance
+from src.models.balance_ledger import BalanceLedgerEntry, LedgerEntryType
+from src.models.hr_assistant_task import HRTask
+
+SETTLEMENT_TYPES = (LedgerEntryType.COMMIT, LedgerEntryType.RELEASE)
+# Условие частичного индекса uq_balance_ledger_settlement должно совпадать
+# с ним буквально, иначе Postgres не сопоставит ON CONFLICT с индексом.
+SETTLEMENT_INDEX_WHERE = text("entry_type IN ('commit', 'release')")
+# reference резерва пакетного анализа: batch:<session_id>; у поштучного — task_id
+BATCH_REFERENCE_PREFIX = "batch:"
+
+
+class InsufficientFundsError(Exception):
+    """На балансе организации не хватает ATL токенов для резерва"""
+
+
+class BalanceLedgerRepository:
+    """
+    Резервирование ATL токенов перед вызовом LLM.
+
+    reserve списывает резерв условным UPDATE ... WHERE atl_tokens >= :amount,
+    поэтому баланс не может уйти в минус при любом числе параллельных
+    воркеров. Резерв стоит брать в отдельной короткой транзакции, чтобы
+    блокировка строки balances не удерживалась на время запроса к LLM.
+
+    Строка balances у организации по-прежнему одна, и reserve, commit и
+    release обновляют именно её: воркеры одной организации сериализуются на
+    этой строке. Журнал сокращает время блокировки до одного UPDATE, но не
+    убирает саму точку конкуренции.
+    """
+
+    def __init__(self, session: AsyncSession):
+        self.session = session
+
+    async def _debit(self, organization_id: int, amount: float) -> bool:
+        stmt = (
+            update(Balance)
+            .where(Balance.organization_id == organization_id, Balance.atl_tokens >= amount)
+            .values(atl_tokens=Balance.atl_tokens - amount)
+            .returning(Balance.id)
+        )
+        result = await self.session.execute(stmt)
+        return result.scalar_one_or_none() is not None
+
+    async def _credit(self, organization_id: int, amount: float):
+        await self.session.execute(
+            update(Balance)
+            .where(Balance.organization_id == organization_id)
+            .values(atl_tokens=Balance.atl_tokens + amount)
+        )
+
+    async def _settle(self, reservation_id: str, entry_type: str) -> Optional[Tuple[BalanceLedgerEntry, int]]:
+        """
+        Добавляет запись завершения резерва. Возвращает исходную запись reserve
+        и id новой записи, либо None, если резерв не найден или уже завершён.
+        """
+        reserve = (await self.session.execute(
+            select(BalanceLedgerEntry).where(
+                BalanceLedgerEntry.reservation_id == reservation_id,
+                BalanceLedgerEntry.entry_type == LedgerEntryType.RESERVE
+            )
+        )).scalars().first()
+        if reserve is None:
+            return None
+
+        stmt = (
+            insert(BalanceLedgerEntry)
+            .values(
+                organization_id=reserve.organization_id,
+                reservation_id=reservation_id,
+                entry_type=entry_type,
+                amount=0.0,
+                reference=reserve.reference,
+                created_at=datetime.utcnow(),
+            )
+            .on_conflict_do_nothing(
+                index_elements=['reservation_id'],
+                index_where=SETTLEMENT_INDEX_WHERE
+            )
+            .returning(BalanceLedgerEntry.id)
+        )
+        entry_id = (await self.session.execute(stmt)).scalar_one_or_none()
+        if entry_id is None:
+            return None
+        return reserve, entry_id
+
+    async def reserve(self, organization_id: int, amount: float, reference: str = None) -> Optional[str]:
+        """Резервирует amount токенов. Возвращает id резерва или None, если средств недостаточно."""
+        if not await self._debit(organization_id, amount):
+            return None
+        reservation_id = str(uuid.uuid4())
+        await self.session.execute(
+            insert(BalanceLedgerEntry).values(
+                organization_id=organization_id,
+                reservation_id=reservation_id,
+                entry_type=LedgerEntryType.RESERVE,
+                amount=-amount,
+                reference=reference,
+                created_at=datetime.utcnow(),
+            )
+        )
+        return reservation_id
+
+    async def commit(self, reservation_id: str, spent: float) -> bool:
+        """
+        Фиксирует фактическое списание: неиспользованный остаток резерва
+        возвращается на баланс. Если spent больше резерва, разница
+        списывается только при наличии средств.
+        """
+        settled = await self._settle(reservation_id, LedgerEntryType.COMMIT)
+        if settled is None:
+            return False
+        reserve, entry_id = settled
+
+        reserved = -reserve.amount
+        delta = round(reserved - spent, 2)
+        if delta > 0:
+            await self._credit(reserve.organization_id, delta)
+        elif delta < 0 and not await self._debit(reserve.organization_id, -delta):
+            spent, delta = reserved, 0.0
+
+        await self.session.execute(
+            update(BalanceLedgerEntry)
+            .where(BalanceLedgerEntry.id == entry_id)
+            .values(amount=delta, spent=spent)
+        )
+        return True
+
+    async def release(self, reservation_id: str) -> bool:
+        """Возвращает резерв на баланс целиком (задача не выполнена)."""
+        settled = await self._settle(reservation_id, LedgerEntryType.RELEASE)
+        if settled is None:
+            return False
+        reserve, entry_id = settled
+
+        await self._credit(reserve.organization_id, -reserve.amount)
+        await self.session.execute(
+            update(BalanceLedgerEntry)
+            .where(BalanceLedgerEntry.id == entry_id)
+            .values(amount=-reserve.amount, spent=0.0)
+        )
+        return True
+
+    async def get_stale_reservation_ids(
+            self,
+            older_than: datetime,
+            abandoned_before: datetime,
+            limit: int = 1000
+    ) -> List[str]:
+        """
+        Резервы старше older_than, которые так и не были завершены (например,
+        воркер упал). Резерв задачи, которая ещё в статусе pending (анализ идёт
+        дольше обычного), пропускается, пока он не старше abandoned_before:
+        иначе анализ был бы выполнен, а commit не нашёл бы резерва.
+        """
+        settled = select(BalanceLedgerEntry.reservation_id).where(
+            BalanceLedgerEntry.entry_type.in_(SETTLEMENT_TYPES)
+        )
+        stmt = (
+            select(BalanceLedgerEntry.reservation_id, BalanceLedgerEntry.reference, BalanceLedgerEntry.created_at)
+            .where(
+                BalanceLedgerEntry.entry_type == LedgerEntryType.RESERVE,
+                BalanceLedgerEntry.created_at < older_than,
+                BalanceLedgerEntry.reservation_id.not_in(settled)
+            )
+            .limit(limit)
+        )
+        rows = (await self.session.execute(stmt)).all()
+        running = await self._running_references(reference for _, reference, _ in rows)
+        return [
+            reservation_id
+            for reservation_id, reference, created_at in rows
+            if reference not in running or created_at < abandoned_before
+        ]
+
+    async def _running_references(self, references) -> set:
+        """reference из списка, чьи задачи (или задачи пакета) ещё в статусе pending"""
+        task_ids, session_ids = set(), set()
+        for reference in references:
+            if not reference:
+                continue
+            if reference.startswith(BATCH_REFERENCE_PREFIX):
+                try:
+                    session_ids.add(uuid.UUID(reference[len(BATCH_REFERENCE_PREFIX):]))
+                except ValueError:
+                    continue
+            else:
+                task_ids.add(reference)
+
+        running = set()
+        if task_ids:
+            result = await self.session.execute(
+                select(HRTask.task_id).where(HRTask.task_id.in_(task_ids), HRTask.task_status == 'pending')
+            )
+            running.update(result.scalars().all())
+        if session_ids:
+            result = await self.session.execute(
+                select(HRTask.session_id)
+                .where(HRTask.session_id.in_(session_ids), HRTask.task_status == 'pending')
+                .distinct()
+            )
+            running.update(f"{BATCH_REFERENCE_PREFIX}{session_id}" for session_id in result.scalars().all())
+        return running
+
+    async def compact(self, older_than: datetime) -> int:
+        """
+        Сворачивает завершённые резервы старше older_than в одну запись
+        compacted на организацию. Возвращает число удалённых записей.
+        """
+        settled = (
+            select(BalanceLedgerEntry.reservation_id)
+            .where(
+                BalanceLedgerEntry.entry_type.in_(SETTLEMENT_TYPES),
+                BalanceLedgerEntry.created_at < older_than
+            )
+            .scalar_subquery()
+        )
+        summary = (
+            select(
+                BalanceLedgerEntry.organization_id,
+                literal(LedgerEntryType.COMPACTED),
+                func.sum(BalanceLedgerEntry.amount),
+                func.sum(func.coalesce(BalanceLedgerEntry.spent, 0.0)),
+                literal(datetime.utcnow()),
+            )
+            .where(BalanceLedgerEntry.reservation_id.in_(settled))
+            .group_by(BalanceLedgerEntry.organization_id)
+        )
+        await self.session.execute(
+            insert(BalanceLedgerEntry).from_select(
+                ['organization_id', 'entry_type', 'amount', 'spent', 'created_at'],
+                summary
+            )
+        )
+        result = await self.session.execute(
+            delete(BalanceLedgerEntry).where(
+                and_(
+                    BalanceLedgerEntry.reservation_id.in_(settled),
+                    BalanceLedgerEntry.entry_type != LedgerEntryType.COMPACTED
+                )
+            )
+        )
+        return result.rowcount
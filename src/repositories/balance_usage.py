@@ -15,6 +15,11 @@ class BalanceUsageRepository:
         result = await self.session.execute(stmt)
         # Remove the explicit flush here
         return result.scalars().first()    
+
+    async def bulk_create(self, rows: list[dict]):
+        if rows:
+            await self.session.execute(insert(BalanceUsage), rows)
+
     async def get_all_by_user_id(self, user_id: int):
         stmt = select(BalanceUsage).where(BalanceUsage.user_id == user_id)
         result = await self.session.execute(stmt)
@@ -17,11 +17,24 @@ class CandidateInfoRepository:
         candidate_info = await self.session.execute(stmt)
         return candidate_info.scalars().first()
 
+    async def bulk_create_candidate_info(self, rows: list[dict]) -> list[int]:
+        """Многострочный INSERT ... RETURNING; id возвращаются в порядке rows"""
+        if not rows:
+            return []
+        stmt = insert(CandidateInfo).returning(CandidateInfo.id, sort_by_parameter_order=True)
+        result = await self.session.execute(stmt, rows)
+        return list(result.scalars().all())
+
     async def update_candidate_info(self, candidate_id, data):
         stmt = update(CandidateInfo).values(**data).where(CandidateInfo.id == candidate_id).returning(CandidateInfo)
         candidate_info = await self.session.execute(stmt)
         return candidate_info.scalars().first()
 
+    async def bulk_update_candidate_info(self, rows: list[dict]):
+        """rows: [{"id": ..., <поля>}, ...] — bulk UPDATE по первичному ключу"""
+        if rows:
+            await self.session.execute(update(CandidateInfo), rows)
+
     async def delete_candidate_info(self, candidate_id):
         stmt = delete(CandidateInfo).where(CandidateInfo.id == candidate_id)
         candidate_info = await self.session.execute(stmt)
@@ -0,0 +1,131 @@
+from datetime import datetime
+from typing import Optional, Tuple
+
+from sqlalchemy import case, select, update
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from src.models.hh_analysis_job import HHAnalysisJob, HHAnalysisJobStatus
+
+
+class HHAnalysisJobRepository:
+    def __init__(self, session: AsyncSession):
+        self.session = session
+
+    async def get_by_id(self, job_id: str) -> Optional[HHAnalysisJob]:
+        result = await self.session.execute(select(HHAnalysisJob).where(HHAnalysisJob.id == job_id))
+        return result.scalars().first()
+
+    async def get_or_create(self, attributes: dict) -> Tuple[HHAnalysisJob, bool]:
+        """
+        Возвращает задачу для пары (session_id, vacancy_id), создавая её при
+        отсутствии. Второй элемент — была ли задача создана этим вызовом.
+        """
+        stmt = (
+            insert(HHAnalysisJob)
+            .values(**attributes)
+            .on_conflict_do_nothing(constraint='uq_hh_analysis_jobs_session_vacancy')
+            .returning(HHAnalysisJob)
+        )
+        job = (await self.session.execute(stmt)).scalars().first()
+        if job is not None:
+            return job, True
+
+        result = await self.session.execute(
+            select(HHAnalysisJob).where(
+                HHAnalysisJob.session_id == attributes["session_id"],
+                HHAnalysisJob.vacancy_id == attributes["vacancy_id"]
+            )
+        )
+        return result.scalars().one(), False
+
+    async def restart(self, job_id: str, full_sync: bool = False) -> Optional[HHAnalysisJob]:
+        """
+        Переводит завершённую или упавшую задачу обратно в pending. Условие по
+        статусу не даёт двум параллельным запросам запустить задачу дважды.
+
+        Упавшая задача продолжает с контрольной точки, завершённая начинает новый
+        инкрементальный проход от водяного знака. full_sync=True сбрасывает водяной
+        знак — отклики просматриваются заново (уже созданные задачи пропускаются).
+        """
+        values = {
+            "status": HHAnalysisJobStatus.PENDING,
+            "error": None,
+            "updated_at": datetime.utcnow(),
+            # Новый проход начинается с первой страницы только после завершённого
+            "last_page": case((HHAnalysisJob.status == HHAnalysisJobStatus.COMPLETED, -1), else_=HHAnalysisJob.last_page),
+        }
+        if full_sync:
+            values.update(last_page=-1, watermark_updated_at=None, pending_watermark=None)
+        stmt = (
+            update(HHAnalysisJob)
+            .where(
+                HHAnalysisJob.id == job_id,
+                HHAnalysisJob.status.in_([HHAnalysisJobStatus.COMPLETED, HHAnalysisJobStatus.FAILED])
+            )
+            .values(**values)
+            .returning(HHAnalysisJob)
+        )
+        return (await self.session.execute(stmt)).scalars().first()
+
+    async def get_due_for_sync(self, synced_before: datetime, created_after: datetime, min_tasks: int, limit: int):
+        """Завершённые задачи с автосинхронизацией, которые пора догнать"""
+        result = await self.session.execute(
+            select(HHAnalysisJob.id)
+            .where(
+                HHAnalysisJob.auto_sync.is_(True),
+                HHAnalysisJob.status == HHAnalysisJobStatus.COMPLETED,
+                HHAnalysisJob.last_synced_at < synced_before,
+                HHAnalysisJob.created_at >= created_after,
+                HHAnalysisJob.tasks_created >= min_tasks,
+            )
+            .order_by(HHAnalysisJob.last_synced_at)
+            .limit(limit)
+        )
+        return list(result.scalars().all())
+
+    async def complete(self, job_id: str, watermark: Optional[datetime]):
+        now = datetime.utcnow()
+        await self.session.execute(
+            update(HHAnalysisJob)
+            .where(HHAnalysisJob.id == job_id)
+            .values(
+                status=HHAnalysisJobStatus.COMPLETED,
+                watermark_updated_at=watermark,
+                pending_watermark=None,
+                last_synced_at=now,
+                updated_at=now,
+            )
+        )
+
+    async def update_job(self, job_id: str, attributes: dict):
+        await self.session.execute(
+            update(HHAnalysisJob)
+            .where(HHAnalysisJob.id == job_id)
+            .values(**attributes, updated_at=datetime.utcnow())
+        )
+
+    async def checkpoint(
+            self,
+            job_id: str,
+            page: int,
+            pages_total: int,
+            resumes_found: int,
+            tasks_created: int,
+            skipped_resumes: list,
+            pending_watermark: Optional[datetime] = None,
+    ):
+        """Фиксирует обработанную страницу; вызывается в транзакции, создающей её задачи"""
+        await self.session.execute(
+            update(HHAnalysisJob)
+            .where(HHAnalysisJob.id == job_id)
+            .values(
+                last_page=page,
+                pages_total=pages_total,
+                resumes_found=HHAnalysisJob.resumes_found + resumes_found,
+                tasks_created=HHAnalysisJob.tasks_created + tasks_created,
+                skipped_resumes=skipped_resumes,
+                pending_watermark=pending_watermark,
+                updated_at=datetime.utcnow(),
+            )
+        )
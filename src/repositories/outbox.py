@@ -0,0 +1,97 @@
+from datetime import datetime
+from typing import Iterable, List
+
+from dramatiq import Message
+from sqlalchemy import case, delete, insert, select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from src.models.outbox import OutboxMessage, OutboxMessageStatus
+
+
+class OutboxRepository:
+    """
+    Исходящие сообщения Dramatiq.
+
+    add_messages вызывается в транзакции, которая создаёт задачи: сообщения
+    появятся у relay только если она закоммитится. claim_batch берёт строки с
+    FOR UPDATE SKIP LOCKED, поэтому несколько relay не отправят одно сообщение
+    дважды, а блокировка держится до коммита вместе с отметкой mark_published.
+    Сообщение, которое не удалось подготовить к отправке max_attempts раз,
+    получает статус dead и больше не выбирается; redrive_dead возвращает
+    такие сообщения в очередь. Недоступность брокера попыткой не считается.
+    """
+
+    def __init__(self, session: AsyncSession):
+        self.session = session
+
+    async def add_messages(self, messages: Iterable[Message]):
+        rows = [
+            {
+                "actor_name": message.actor_name,
+                "queue_name": message.queue_name,
+                "message": message.asdict(),
+            }
+            for message in messages
+        ]
+        if rows:
+            await self.session.execute(insert(OutboxMessage), rows)
+
+    async def claim_batch(self, limit: int) -> List[OutboxMessage]:
+        stmt = (
+            select(OutboxMessage)
+            .where(OutboxMessage.status == OutboxMessageStatus.PENDING)
+            .order_by(OutboxMessage.id)
+            .limit(limit)
+            .with_for_update(skip_locked=True)
+        )
+        result = await self.session.execute(stmt)
+        return list(result.scalars().all())
+
+    async def mark_published(self, ids: List[int]):
+        if ids:
+            await self.session.execute(
+                update(OutboxMessage)
+                .where(OutboxMessage.id.in_(ids))
+                .values(status=OutboxMessageStatus.PUBLISHED, published_at=datetime.utcnow(), error=None)
+            )
+
+    async def mark_failed(self, ids: List[int], error: str, max_attempts: int) -> List[int]:
+        """Учитывает неудачную попытку; возвращает id сообщений, переведённых в dead"""
+        if not ids:
+            return []
+        result = await self.session.execute(
+            update(OutboxMessage)
+            .where(OutboxMessage.id.in_(ids))
+            .values(
+                attempts=OutboxMessage.attempts + 1,
+                error=error,
+                status=case(
+                    (OutboxMessage.attempts + 1 >= max_attempts, OutboxMessageStatus.DEAD),
+                    else_=OutboxMessageStatus.PENDING
+                ),
+            )
+            .returning(OutboxMessage.id, OutboxMessage.status)
+        )
+        return [message_id for message_id, status in result.all() if status == OutboxMessageStatus.DEAD]
+
+    async def redrive_dead(self, ids: List[int] = None) -> int:
+        """Возвращает dead-сообщения (все или с указанными id) в pending со сброшенным счётчиком попыток"""
+        stmt = (
+            update(OutboxMessage)
+            .where(OutboxMessage.status == OutboxMessageStatus.DEAD)
+            .values(status=OutboxMessageStatus.PENDING, attempts=0, error=None)
+        )
+        if ids:
+            stmt = stmt.where(OutboxMessage.id.in_(ids))
+        result = await self.session.execute(stmt)
+        return result.rowcount
+
+    async def purge_published(self, before: datetime) -> int:
+        result = await self.session.execute(
+            delete(OutboxMessage).where(OutboxMessage.published_at < before)
+        )
+        return result.rowcount
+
+    @staticmethod
+    def to_message(row: OutboxMessage) -> Message:
+        return Message(**row.message)
@@ -1,3 +1,5 @@
+from typing import Dict, List, Set
+
 from sqlalchemy import select, update, insert
 from sqlalchemy.ext.asyncio import AsyncSession
 
@@ -127,3 +129,60 @@ class UserInteractionRepository:
         )
         result = await self.session.execute(stmt)
         return result.scalars().all()
+
+    async def get_session_chat_ids(
+            self,
+            session_id: str,
+            chat_ids: List[str]
+    ) -> Set[str]:
+        """chat_id из списка, с которыми в этой сессии уже есть взаимодействие"""
+        if not chat_ids:
+            return set()
+        stmt = (
+            select(UserInteraction.chat_id)
+            .where(
+                UserInteraction.session_id == session_id,
+                UserInteraction.chat_id.in_(chat_ids)
+            )
+            .distinct()
+        )
+        result = await self.session.execute(stmt)
+        return set(result.scalars().all())
+
+    async def get_last_interactions(
+            self,
+            chat_ids: List[str],
+            instance_id: int
+    ) -> Dict[str, UserInteraction]:
+        """Последние взаимодействия (is_last) инстанса по списку chat_id"""
+        if not chat_ids:
+            return {}
+        stmt = (
+            select(UserInteraction)
+            .where(
+                UserInteraction.chat_id.in_(chat_ids),
+                UserInteraction.instance_id == instance_id,
+                UserInteraction.is_last == True
+            )
+        )
+        result = await self.session.execute(stmt)
+        return {interaction.chat_id: interaction for interaction in result.scalars().all()}
+
+    async def bulk_update_interactions(
+            self,
+            interaction_ids: List[int],
+            data: dict
+    ):
+        if interaction_ids:
+            await self.session.execute(
+                update(UserInteraction)
+                .where(UserInteraction.id.in_(interaction_ids))
+                .values(data)
+            )
+
+    async def bulk_create_interactions(
+            self,
+            rows: List[dict]
+    ):
+        if rows:
+            await self.session.execute(insert(UserInteraction), rows)
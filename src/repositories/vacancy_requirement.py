@@ -25,6 +25,30 @@ class VacancyRequirementRepository(BaseRepository):
         requirement = await self.session.execute(
             select(VacancyRequirement)
             .where(VacancyRequirement.requirement_hash == text_hash)
+            .limit(1)
         )
-        return requirement.scalar_one_or_none()
+        return requirement.scalars().first()
+
+    async def ensure_for_session(self, session_id: str, requirement_hash: str, requirement_text: str) -> VacancyRequirement:
+        """
+        Привязывает текст вакансии к сессии. По требованиям сессии
+        invalidate_analysis_cache находит записи кэша анализа, поэтому связь
+        нужна, даже если такой же текст уже сохранён в другой сессии.
+        """
+        requirement = await self.session.execute(
+            select(VacancyRequirement)
+            .where(
+                VacancyRequirement.session_id == session_id,
+                VacancyRequirement.requirement_hash == requirement_hash
+            )
+            .limit(1)
+        )
+        existing = requirement.scalars().first()
+        if existing:
+            return existing
+        return await self.create({
+            "session_id": session_id,
+            "requirement_hash": requirement_hash,
+            "requirement_text": requirement_text
+        })
 
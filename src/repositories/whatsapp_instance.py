@@ -88,3 +88,13 @@ class WhatsappInstanceRepository:
         )
         result = await self.session.execute(stmt)
         return result.scalar_one_or_none()
+
+    async def get_by_instance_ids(self, instance_ids: list[str]) -> list[models.WhatsappInstance]:
+        if not instance_ids:
+            return []
+        stmt = (
+            select(models.WhatsappInstance)
+            .where(models.WhatsappInstance.instance_id.in_(instance_ids))
+        )
+        result = await self.session.execute(stmt)
+        return list(result.scalars().all())
@@ -25,7 +25,8 @@ async def refresh_token(
     current_user: dict = Depends(get_current_user),
     hh_controller:HHController = Depends(Factory.get_hh_controller)
 ):
-    return await hh_controller.refresh_token(current_user.get('sub'))
+    await hh_controller.refresh_token(current_user.get('sub'))
+    return {"message": "Token refreshed"}
 
 @hh_router.get("/hh_account_info")
 async def hh_account_info(
@@ -66,10 +67,11 @@ async def get_vacancy_applications(
 async def analyze_vacancy(
     vacancy_id:int,
     session_id: str = Form(...),
+    full_sync: bool = Form(False),
     current_user: dict = Depends(get_current_user),
     hh_controller:HHController = Depends(Factory.get_hh_controller)
 ):
-    return await hh_controller.analyze_vacancy_applicants(session_id,current_user.get('sub'),vacancy_id)
+    return await hh_controller.analyze_vacancy_applicants(session_id,current_user.get('sub'),vacancy_id,full_sync)
 
 @hh_router.post("/logout")
 async def logout(
@@ -79,6 +81,15 @@ async def logout(
     return await hh_controller.logout(current_user.get('sub'))
 
 
+@hh_router.get("/analysis_jobs/{job_id}")
+async def analysis_job_status(
+    job_id: str,
+    current_user: dict = Depends(get_current_user),
+    hh_controller:HHController = Depends(Factory.get_hh_controller)
+):
+    return await hh_controller.get_analysis_job(current_user.get('sub'), job_id)
+
+
 @hh_router.websocket("/ws/{vacancy_id}/progress")
 async def websocket_endpoint(
     vacancy_id:str,
@@ -86,4 +97,5 @@ async def websocket_endpoint(
     current_user: dict = Depends(get_current_user),
     hh_controller:HHController = Depends(Factory.get_hh_controller)
 ):
-    await hh_controller.websocket_endpoint(vacancy_id,websocket,current_user.get('sub'))
\ No newline at end of file
+    # События приходят по всем задачам пользователя, vacancy_id есть в каждом сообщении
+    await hh_controller.websocket_endpoint(websocket, current_user.get('sub'))
@@ -157,6 +157,15 @@ async def delete_user_sessions(
     return await hr_agent_controller.delete_session(session_id)
 
 
+@hr_agent_router.delete('/resume_analyze/analysis_cache/{session_id}', tags=["HR SESSIONS"])
+async def invalidate_analysis_cache(
+        session_id: str,
+        current_user: dict = Depends(get_current_user),
+        hr_agent_controller: HRAgentController = Depends(Factory.get_hr_agent_controller)
+):
+    return await hr_agent_controller.invalidate_analysis_cache(current_user.get('sub'), session_id)
+
+
 connections = {}
 
 
@@ -220,7 +229,7 @@ async def cv_analyzer(
 
     for index, file in enumerate(cv_files, start=1):
         if manager:
-            await manager.send_json(user_id, {
+            await manager.send_progress(user_id, {
                 "type": "progress",
                 "processed_files": index,
                 "total_files": total_files,
@@ -259,6 +268,7 @@ async def get_session_results(
         session_id: str,
         offset: int = Query(0, ge=0, description="Offset for pagination"),
         limit: int = Query(10, gt=0, le=100, description="Limit for pagination (max 100)"),
+        cursor: Optional[str] = Query(None, description="Cursor from meta.next_cursor of the previous page"),
         hr_agent_controller: HRAgentController = Depends(Factory.get_hr_agent_controller),
         current_user: dict = Depends(get_current_user),
 ):
@@ -266,18 +276,23 @@ async def get_session_results(
         session_id,
         current_user.get('sub'),
         offset,
-        limit
+        limit,
+        cursor
     )
 
 
 @hr_agent_router.get('/resume_analyze/export_to_csv/{session_id}', tags=["HR RESUME ANALYZER"])
 async def export_session_results(
         session_id: str,
+        export_format: str = Query("csv", alias="format", pattern="^(csv|xlsx)$"),
+        columns: Optional[str] = Query(None, description="Comma-separated list of columns to export"),
         hr_agent_controller: HRAgentController = Depends(Factory.get_hr_agent_controller),
         current_user: dict = Depends(get_current_user),
 ):
     return await hr_agent_controller.export_to_csv(
-        session_id
+        session_id,
+        export_format,
+        columns
     )
 
 
@@ -93,10 +93,11 @@ async def get_progress_from_db(
 
 @interview_individual_question_router.websocket("/ws/progress/{session_id}")
 async def websocket_progress(websocket: WebSocket, session_id: str):
-    await websocket.accept()
-    manager.session_connect(session_id, websocket)
+    await manager.session_connect(session_id, websocket)
     try:
         while True:
             await websocket.receive_text()
     except WebSocketDisconnect:
-        del manager[session_id]
+        pass
+    finally:
+        await manager.disconnect(session_id, websocket)
@@ -0,0 +1,74 @@
+import asyncio
+
+from fastapi import APIRouter, Depends
+
+from src.core.dramatiq_middlewares import get_tenant_queue_stats
+from src.core.dramatiq_worker import redis_broker
+from src.core.middlewares.auth_middleware import get_current_user, require_roles
+from src.models.role import RoleEnum
+from src.services.extraction_cache import extraction_cache
+from src.services.extraction_engine import get_extraction_engine
+from src.services.hh_client import get_hh_client
+from src.services.hh_credentials import hh_credentials
+from src.services.hh_resume_cache import hh_resume_cache
+from src.services.http_clients import get_http_clients
+from src.services.llm_client import get_llm_client
+from src.services.websocket import manager as ws_manager
+
+# Метрики процессов и очередей общие для всех организаций — только для super_admin
+metrics_router = APIRouter(prefix='/api/v1/metrics', tags=['METRICS'])
+
+
+@metrics_router.get('/extraction')
+@require_roles([RoleEnum.SUPER_ADMIN.value])
+async def extraction_metrics(
+        current_user: dict = Depends(get_current_user),
+):
+    return {
+        "engine": get_extraction_engine().stats(),
+        "cache": extraction_cache.stats(),
+    }
+
+
+@metrics_router.get('/llm')
+@require_roles([RoleEnum.SUPER_ADMIN.value])
+async def llm_metrics(
+        current_user: dict = Depends(get_current_user),
+):
+    return get_llm_client().stats()
+
+
+@metrics_router.get('/hh')
+@require_roles([RoleEnum.SUPER_ADMIN.value])
+async def hh_metrics(
+        current_user: dict = Depends(get_current_user),
+):
+    return {
+        "client": get_hh_client().stats(),
+        "resume_cache": hh_resume_cache.stats(),
+        "credentials": hh_credentials.stats(),
+    }
+
+
+@metrics_router.get('/http')
+@require_roles([RoleEnum.SUPER_ADMIN.value])
+async def outbound_http_metrics(
+        current_user: dict = Depends(get_current_user),
+):
+    return get_http_clients().stats()
+
+
+@metrics_router.get('/websocket')
+@require_roles([RoleEnum.SUPER_ADMIN.value])
+async def websocket_metrics(
+        current_user: dict = Depends(get_current_user),
+):
+    return ws_manager.stats()
+
+
+@metrics_router.get('/tenants')
+@require_roles([RoleEnum.SUPER_ADMIN.value])
+async def tenant_queue_metrics(
+        current_user: dict = Depends(get_current_user),
+):
+    return await asyncio.to_thread(get_tenant_queue_stats, redis_broker.client)
@@ -74,5 +74,5 @@ async def whatsapp_webhook(
     webhook_controller: WhatsappWebhookController = Depends(Factory.get_whatsapp_webhook_controller),
 ):
     data = await request.json()
-    result = await webhook_controller.handle_incoming_webhook(data)
+    result = await webhook_controller.accept_webhook(data)
     return JSONResponse(result, status_code=200 if "error" not in result else 400)
@@ -0,0 +1,61 @@
+from collections import OrderedDict
+from typing import Any, Callable, Hashable, Optional
+
+
+class BoundedLRUCache:
+    """
+    In-process LRU кэш с ограничением по суммарному размеру значений в байтах.
+    Не потокобезопасен — рассчитан на использование из одного event loop.
+    """
+
+    def __init__(self, max_bytes: int, sizeof: Callable[[Any], int] = len):
+        self.max_bytes = max_bytes
+        self.sizeof = sizeof
+        self._data: "OrderedDict[Hashable, tuple[Any, int]]" = OrderedDict()
+        self.size_bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, key: Hashable) -> Optional[Any]:
+        entry = self._data.get(key)
+        if entry is None:
+            self.misses += 1
+            return None
+        self._data.move_to_end(key)
+        self.hits += 1
+        return entry[0]
+
+    def set(self, key: Hashable, value: Any) -> None:
+        size = self.sizeof(value)
+        if size > self.max_bytes:
+            return
+        self.pop(key)
+        self._data[key] = (value, size)
+        self.size_bytes += size
+        while self.size_bytes > self.max_bytes:
+            _, (_, evicted_size) = self._data.popitem(last=False)
+            self.size_bytes -= evicted_size
+            self.evictions += 1
+
+    def pop(self, key: Hashable) -> Optional[Any]:
+        entry = self._data.pop(key, None)
+        if entry is None:
+            return None
+        self.size_bytes -= entry[1]
+        return entry[0]
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+    def stats(self) -> dict:
+        lookups = self.hits + self.misses
+        return {
+            "items": len(self._data),
+            "size_bytes": self.size_bytes,
+            "max_bytes": self.max_bytes,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+        }
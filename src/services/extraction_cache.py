@@ -0,0 +1,89 @@
+import hashlib
+import logging
+from typing import Optional
+
+from src.core.redis_cli import get_redis
+from src.core.settings import settings
+from src.services.cache import BoundedLRUCache
+
+logger = logging.getLogger(__name__)
+
+
+class ExtractionCache:
+    """
+    Content-addressed кэш извлечённого текста: sha256(байты файла) -> текст.
+
+    Два уровня: in-process LRU с лимитом по байтам и Redis с TTL.
+    Ошибки Redis не ломают извлечение — кэш просто пропускается.
+    """
+
+    def __init__(
+            self,
+            max_local_bytes: int = settings.EXTRACTION_CACHE_LOCAL_BYTES,
+            ttl: int = settings.EXTRACTION_CACHE_TTL,
+            max_entry_bytes: int = settings.EXTRACTION_CACHE_MAX_ENTRY_BYTES,
+    ):
+        self.local = BoundedLRUCache(max_local_bytes, sizeof=lambda text: len(text.encode('utf-8')))
+        self.ttl = ttl
+        self.max_entry_bytes = max_entry_bytes
+        self.redis_hits = 0
+        self.misses = 0
+        self.redis_errors = 0
+
+    @staticmethod
+    def content_hash(content: bytes) -> str:
+        return hashlib.sha256(content).hexdigest()
+
+    @staticmethod
+    def _redis_key(variant: str, digest: str) -> str:
+        return f"extract:{variant}:{digest}"
+
+    async def get(self, digest: str, variant: str = "v1") -> Optional[str]:
+        key = self._redis_key(variant, digest)
+        text = self.local.get(key)
+        if text is not None:
+            return text
+
+        try:
+            raw = await get_redis().get(key)
+        except Exception as e:
+            self.redis_errors += 1
+            logger.warning(f"Extraction cache redis get failed: {e}")
+            raw = None
+
+        if raw is None:
+            self.misses += 1
+            return None
+
+        self.redis_hits += 1
+        text = raw.decode('utf-8')
+        self.local.set(key, text)
+        return text
+
+    async def set(self, digest: str, text: str, variant: str = "v1") -> None:
+        key = self._redis_key(variant, digest)
+        self.local.set(key, text)
+        encoded = text.encode('utf-8')
+        if len(encoded) > self.max_entry_bytes:
+            return
+        try:
+            await get_redis().set(key, encoded, ex=self.ttl)
+        except Exception as e:
+            self.redis_errors += 1
+            logger.warning(f"Extraction cache redis set failed: {e}")
+
+    def stats(self) -> dict:
+        hits = self.local.hits + self.redis_hits
+        lookups = hits + self.misses
+        return {
+            "hits": hits,
+            "local_hits": self.local.hits,
+            "redis_hits": self.redis_hits,
+            "misses": self.misses,
+            "redis_errors": self.redis_errors,
+            "hit_rate": round(hits / lookups, 4) if lookups else 0.0,
+            "local": self.local.stats(),
+        }
+
+
+extraction_cache = ExtractionCache()
@@ -0,0 +1,250 @@
+import asyncio
+import io
+import logging
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from contextlib import asynccontextmanager
+from typing import AsyncGenerator, Optional, Tuple
+
+from src.core.settings import settings
+
+logger = logging.getLogger(__name__)
+
+PDF_CONTENT_TYPE = 'application/pdf'
+DOCX_CONTENT_TYPES = (
+    'application/vnd.openxmlformats-officedocument.wordprocessingml.document',
+    'application/msword',
+)
+TXT_CONTENT_TYPE = 'text/plain'
+
+
+# Функции ниже выполняются внутри процессов пула, поэтому должны быть
+# объявлены на уровне модуля (pickle) и не трогать состояние приложения.
+
+def _warmup() -> int:
+    import docx  # noqa: F401
+    import pdfplumber  # noqa: F401
+    import pypdfium2  # noqa: F401
+    return os.getpid()
+
+
+def _extract_pdf(content: bytes, max_pages: int) -> Tuple[str, int, str]:
+    import pypdfium2 as pdfium
+
+    try:
+        pdf = pdfium.PdfDocument(content)
+        try:
+            parts = []
+            pages = min(len(pdf), max_pages)
+            for index in range(pages):
+                page = pdf[index]
+                textpage = page.get_textpage()
+                parts.append(textpage.get_text_bounded())
+                textpage.close()
+                page.close()
+        finally:
+            pdf.close()
+        text = "\n".join(parts)
+        if text.strip():
+            return text, pages, "pdfium"
+    except Exception as e:
+        logger.warning(f"pdfium extraction failed, falling back to pdfplumber: {e}")
+
+    import pdfplumber
+
+    with pdfplumber.open(io.BytesIO(content)) as pdf:
+        pages = pdf.pages[:max_pages]
+        text = "\n".join(page.extract_text() or "" for page in pages)
+        return text, len(pages), "pdfplumber"
+
+
+def _extract_docx(content: bytes, max_pages: int) -> Tuple[str, int, str]:
+    import docx
+
+    doc = docx.Document(io.BytesIO(content))
+    return "\n".join(paragraph.text for paragraph in doc.paragraphs), 1, "docx"
+
+
+def _extract_txt(content: bytes, max_pages: int) -> Tuple[str, int, str]:
+    try:
+        return content.decode('utf-8'), 1, "txt"
+    except UnicodeDecodeError:
+        return content.decode('cp1251'), 1, "txt"
+
+
+def _run_extraction(content_type: str, content: bytes, max_pages: int) -> Tuple[str, int, str]:
+    if content_type == PDF_CONTENT_TYPE:
+        return _extract_pdf(content, max_pages)
+    if content_type in DOCX_CONTENT_TYPES:
+        return _extract_docx(content, max_pages)
+    if content_type == TXT_CONTENT_TYPE:
+        return _extract_txt(content, max_pages)
+    raise ValueError(f"Unsupported file format: {content_type}")
+
+
+class ExtractionTimeoutError(Exception):
+    """Извлечение текста не уложилось в отведённое время"""
+    pass
+
+
+class ExtractionEngine:
+    """
+    Общий пул процессов для разбора PDF/DOCX.
+
+    Пул создаётся один раз на процесс приложения (см. extraction_engine_lifespan),
+    воркеры прогреваются при старте, поэтому разбор большой пачки резюме
+    использует все ядра, а не один поток под GIL.
+    """
+
+    def __init__(
+            self,
+            max_workers: int = settings.EXTRACTION_WORKERS,
+            timeout: float = settings.EXTRACTION_TIMEOUT,
+            max_pages: int = settings.EXTRACTION_MAX_PAGES,
+    ):
+        self.max_workers = max_workers
+        self.timeout = timeout
+        self.max_pages = max_pages
+        self._executor: Optional[ProcessPoolExecutor] = None
+        # Файлов в пуле не больше, чем воркеров: таймаут считается от начала
+        # разбора, а не от постановки в очередь пула
+        self._slots = asyncio.Semaphore(max_workers)
+        self._started_at = time.monotonic()
+        self._in_flight = 0
+        self._metrics = {
+            "files_total": 0,
+            "failed_total": 0,
+            "timeouts_total": 0,
+            "bytes_total": 0,
+            "pages_total": 0,
+            "busy_seconds": 0.0,
+            "by_backend": {},
+        }
+
+    async def start(self):
+        self._executor = ProcessPoolExecutor(max_workers=self.max_workers)
+        loop = asyncio.get_running_loop()
+        pids = await asyncio.gather(
+            *[loop.run_in_executor(self._executor, _warmup) for _ in range(self.max_workers)]
+        )
+        self._started_at = time.monotonic()
+        logger.info(f"Extraction engine started with {len(set(pids))} warm workers")
+
+    async def shutdown(self):
+        if self._executor:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+
+    def _restart_pool(self, failed: ProcessPoolExecutor, kill: bool = False):
+        """
+        Заменяет пул новым. kill=True завершает процессы старого пула: shutdown()
+        не останавливает уже запущенный разбор, и зависший файл занимал бы воркер.
+        """
+        if self._executor is not failed:
+            # Пул уже перезапущен другим вызовом
+            return
+        logger.warning(f"Extraction pool is {'stuck' if kill else 'broken'}, restarting workers")
+        if kill:
+            for process in list((failed._processes or {}).values()):
+                process.kill()
+        # Ожидающие задачи старого пула завершатся с BrokenProcessPool и будут
+        # повторены на новом; отмена (cancel_futures) отменила бы вызывающие корутины
+        failed.shutdown(wait=False, cancel_futures=not kill)
+        self._executor = ProcessPoolExecutor(max_workers=self.max_workers)
+
+    async def extract(self, content_type: str, content: bytes) -> str:
+        if self._executor is None:
+            raise RuntimeError("ExtractionEngine is not started")
+
+        loop = asyncio.get_running_loop()
+        started = time.monotonic()
+        self._in_flight += 1
+        try:
+            for attempt in range(2):
+                try:
+                    async with self._slots:
+                        executor = self._executor
+                        future = loop.run_in_executor(
+                            executor,
+                            _run_extraction,
+                            content_type,
+                            content,
+                            self.max_pages
+                        )
+                        text, pages, backend = await asyncio.wait_for(future, timeout=self.timeout)
+                    break
+                except asyncio.TimeoutError:
+                    self._metrics["timeouts_total"] += 1
+                    self._metrics["failed_total"] += 1
+                    self._restart_pool(executor, kill=True)
+                    raise ExtractionTimeoutError(f"Extraction took longer than {self.timeout} seconds")
+                except BrokenProcessPool:
+                    if attempt == 0 and self._executor is not executor:
+                        # Пул убит из-за чужого зависшего файла — повторяем на новом
+                        continue
+                    self._metrics["failed_total"] += 1
+                    self._restart_pool(executor)
+                    raise
+                except Exception:
+                    self._metrics["failed_total"] += 1
+                    raise
+        finally:
+            self._in_flight -= 1
+            self._metrics["busy_seconds"] += time.monotonic() - started
+
+        self._metrics["files_total"] += 1
+        self._metrics["bytes_total"] += len(content)
+        self._metrics["pages_total"] += pages
+        self._metrics["by_backend"][backend] = self._metrics["by_backend"].get(backend, 0) + 1
+        return text
+
+    def stats(self) -> dict:
+        uptime = max(time.monotonic() - self._started_at, 1e-6)
+        files = self._metrics["files_total"]
+        return {
+            **self._metrics,
+            "by_backend": dict(self._metrics["by_backend"]),
+            "workers": self.max_workers,
+            "in_flight": self._in_flight,
+            "files_per_second": round(files / uptime, 3),
+            "pages_per_second": round(self._metrics["pages_total"] / uptime, 3),
+            "avg_seconds_per_file": round(self._metrics["busy_seconds"] / files, 3) if files else 0.0,
+        }
+
+
+_engine: ExtractionEngine | None = None
+
+
+def get_extraction_engine() -> ExtractionEngine:
+    if not _engine:
+        raise Exception("ExtractionEngine is not initialized")
+    return _engine
+
+
+async def start_extraction_engine() -> ExtractionEngine:
+    global _engine
+
+    if not _engine:
+        _engine = ExtractionEngine()
+        await _engine.start()
+
+    return _engine
+
+
+async def stop_extraction_engine() -> None:
+    global _engine
+
+    if _engine:
+        await _engine.shutdown()
+        _engine = None
+
+
+@asynccontextmanager
+async def extraction_engine_lifespan() -> AsyncGenerator[ExtractionEngine, None]:
+    await start_extraction_engine()
+    try:
+        yield get_extraction_engine()
+    finally:
+        await stop_extraction_engine()
@@ -1,19 +1,23 @@
-import io
-import docx
-import asyncio
 import logging
-import pdfplumber
-from functools import partial
 from abc import ABC, abstractmethod
-from fastapi import Depends, UploadFile
-from concurrent.futures import ThreadPoolExecutor
+
+from fastapi import UploadFile
+
+from src.services.extraction_engine import (
+    DOCX_CONTENT_TYPES,
+    PDF_CONTENT_TYPE,
+    TXT_CONTENT_TYPE,
+    ExtractionEngine,
+    get_extraction_engine,
+)
+from src.services.extraction_cache import ExtractionCache, extraction_cache
 
 # Логирование
 logger = logging.getLogger(__name__)
 
 class ITextExtractor(ABC):
     """Протокол для интерфейса извлечения текста"""
-    
+
     @abstractmethod
     async def extract_text(self, file: UploadFile) -> str:
         pass
@@ -27,32 +31,42 @@ class TextExtractionError(Exception):
     pass
 
 class AsyncTextExtractor:
-    def __init__(self, thread_pool: ThreadPoolExecutor):
-        self.thread_pool = thread_pool
-        self.supported_formats = {
-            'application/pdf': self._extract_from_pdf,
-            'application/vnd.openxmlformats-officedocument.wordprocessingml.document': self._extract_from_docx,
-            'application/msword':self._extract_from_docx,
-            'text/plain': self._extract_from_txt,
-        }
+    def __init__(self, engine: ExtractionEngine, cache: ExtractionCache = None):
+        self.engine = engine
+        self.cache = cache
+        self.supported_formats = {PDF_CONTENT_TYPE, TXT_CONTENT_TYPE, *DOCX_CONTENT_TYPES}
 
     async def extract_text(self, file: UploadFile) -> str:
+        if file.content_type not in self.supported_formats:
+            raise FileFormatError(f"Unsupported file format: {file.content_type}")
+        content = await self._read_file(file)
+        return await self.extract_text_from_bytes(content, file.content_type, file.filename)
+
+    async def extract_text_from_bytes(self, content: bytes, content_type: str, filename: str) -> str:
+        """Извлечение текста из уже прочитанного содержимого файла"""
         try:
-            if file.content_type not in self.supported_formats:
-                raise FileFormatError(f"Unsupported file format: {file.content_type}")
-            content = await self._read_file(file)
-            extractor = self.supported_formats[file.content_type]
-            loop = asyncio.get_event_loop()
-            text = await loop.run_in_executor(
-                self.thread_pool,
-                partial(extractor, content)
-            )
-            return text.strip()
+            if content_type not in self.supported_formats:
+                raise FileFormatError(f"Unsupported file format: {content_type}")
+            if self.cache is None:
+                text = await self.engine.extract(content_type, content)
+                return text.strip()
+
+            # Ключ учитывает лимит страниц движка, иначе при его изменении
+            # из кэша вернулся бы текст, извлечённый с другими настройками.
+            digest = self.cache.content_hash(content)
+            variant = f"p{self.engine.max_pages}"
+            cached = await self.cache.get(digest, variant)
+            if cached is not None:
+                return cached
+
+            text = (await self.engine.extract(content_type, content)).strip()
+            await self.cache.set(digest, text, variant)
+            return text
         except FileFormatError:
             raise
         except Exception as e:
-            logger.error(f"Failed to extract text from {file.filename}: {str(e)}")
-            raise TextExtractionError(f"Failed to extract text from {file.filename} - {str(e)}")
+            logger.error(f"Failed to extract text from {filename}: {str(e)}")
+            raise TextExtractionError(f"Failed to extract text from {filename} - {str(e)}")
 
     async def _read_file(self, file: UploadFile) -> bytes:
         try:
@@ -61,41 +75,5 @@ class AsyncTextExtractor:
             logger.error(f"Failed to read file {file.filename}: {str(e)}")
             raise TextExtractionError(f"Failed to read file {file.filename}")
 
-    def _extract_from_pdf(self, content: bytes) -> str:
-        try:
-            with pdfplumber.open(io.BytesIO(content)) as pdf:
-                text = ""
-                for page in pdf.pages:
-                    text += page.extract_text()
-                return text
-        except Exception as e:
-            logger.error(f"PDF extraction failed: {str(e)}")
-            raise TextExtractionError("Failed to extract text from PDF")
-
-    def _extract_from_docx(self, content: bytes) -> str:
-        try:
-            docx_file = io.BytesIO(content)
-            doc = docx.Document(docx_file)
-            return "\n".join([paragraph.text for paragraph in doc.paragraphs])
-        except Exception as e:
-            logger.error(f"DOCX extraction failed: {str(e)}")
-            raise TextExtractionError("Failed to extract text from DOCX")
-
-    def _extract_from_txt(self, content: bytes) -> str:
-        try:
-            return content.decode('utf-8')
-        except UnicodeDecodeError:
-            try:
-                return content.decode('cp1251')
-            except Exception as e:
-                logger.error(f"Text file decoding failed: {str(e)}")
-                raise TextExtractionError("Failed to decode text file")
-
-async def get_thread_pool() -> ThreadPoolExecutor:
-    """Создать пул потоков для операций, которые могут быть сериализованы"""
-    return ThreadPoolExecutor()
-
-async def get_text_extractor(
-    thread_pool: ThreadPoolExecutor = Depends(get_thread_pool)
-) -> ITextExtractor:
-    return AsyncTextExtractor(thread_pool)
+async def get_text_extractor() -> ITextExtractor:
+    return AsyncTextExtractor(get_extraction_engine(), extraction_cache)
@@ -5,6 +5,8 @@ import aiohttp
 from dotenv import load_dotenv
 from websockets import connect
 
+from src.services.http_clients import provider_session
+
 load_dotenv()
 
 
@@ -38,7 +40,7 @@ class GreenApiCli:
         }
 
         try:
-            async with aiohttp.ClientSession() as session:
+            async with provider_session("green_api") as session:
                 async with session.post(
                     url,
                     json=payload,
@@ -86,7 +88,7 @@ class GreenApiCli:
     async def get_instance_state(self, instance_id: str, instance_token: str) -> dict:
         url = f"{self.__api_url}/waInstance{instance_id}/getStateInstance/{instance_token}"
         try:
-            async with aiohttp.ClientSession() as session:
+            async with provider_session("green_api") as session:
                 async with session.get(url, headers={}) as response:
                     response.raise_for_status()
                     resp_data = await response.json()
@@ -113,7 +115,7 @@ class GreenApiCli:
     async def get_qr_code(self, instance_id: str, instance_token: str) -> dict:
         url = f"{self.__api_url}/waInstance{instance_id}/qr/{instance_token}"
         try:
-            async with aiohttp.ClientSession() as client:
+            async with provider_session("green_api") as client:
                 async with client.get(url) as response:
                     response.raise_for_status()
                     data = await response.json()
@@ -138,7 +140,7 @@ class GreenApiCli:
     async def reboot_instance(self, instance_id: str, instance_token: str) -> dict:
         url = f"{self.__api_url}/waInstance{instance_id}/reboot/{instance_token}"
         try:
-            async with aiohttp.ClientSession() as session:
+            async with provider_session("green_api") as session:
                 async with session.post(url) as response:
                     response.raise_for_status()
                     data = await response.json()
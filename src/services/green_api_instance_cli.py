@@ -1,14 +1,26 @@
 import os
+from contextlib import asynccontextmanager
 
-import aiohttp
 from dotenv import load_dotenv
 
+from src.services.http_clients import provider_session
+
 load_dotenv()
 
 
 class GreenApiInstanceCli:
-    def __init__(self):
+    def __init__(self, session=None):
+        """session — сессия для серии запросов (ProviderSession или aiohttp.ClientSession); по умолчанию общий пул"""
         self.__api_url = os.getenv("GREEN_API_URL")
+        self._session = session
+
+    @asynccontextmanager
+    async def _client_session(self):
+        if self._session is not None:
+            yield self._session
+        else:
+            async with provider_session("green_api") as session:
+                yield session
 
     async def send_message(self, data: dict, instance_id: str, instance_token: str) -> dict:
         url = f"{self.__api_url}/waInstance{instance_id}/sendMessage/{instance_token}"
@@ -16,7 +28,7 @@ class GreenApiInstanceCli:
         message = data.get("message")
 
         try:
-            async with aiohttp.ClientSession() as session:
+            async with self._client_session() as session:
                 async with session.post(
                         url,
                         json={"chatId": chat_id, "message": message},
@@ -25,7 +37,7 @@ class GreenApiInstanceCli:
                     response.raise_for_status()
                     return await response.json()
         except Exception as e:
-            return {"success": False, "error": str(e)}
+            return {"success": False, "error": str(e), "status": getattr(e, "status", None)}
 
     async def send_poll(self, data: dict, instance_id: str, instance_token: str) -> dict:
         url = f"{self.__api_url}/waInstance{instance_id}/sendPoll/{instance_token}"
@@ -39,7 +51,7 @@ class GreenApiInstanceCli:
         print(f"🔗 URL: {url}")
 
         try:
-            async with aiohttp.ClientSession() as session:
+            async with self._client_session() as session:
                 async with session.post(url, json=payload) as response:
                     text = await response.text()
                     print(f"📬 Green API response ({response.status}): {text}")
@@ -53,7 +65,7 @@ class GreenApiInstanceCli:
     async def get_poll_answer(self, instance_id: str, instance_token: str, message_id: str) -> dict:
         url = f"{self.__api_url}/waInstance{instance_id}/getPollAnswer/{instance_token}"
         try:
-            async with aiohttp.ClientSession() as session:
+            async with self._client_session() as session:
                 async with session.post(
                         url,
                         json={"idMessage": message_id},
@@ -75,7 +87,7 @@ class GreenApiInstanceCli:
         }
 
         try:
-            async with aiohttp.ClientSession() as session:
+            async with self._client_session() as session:
                 async with session.post(
                         url,
                         json=payload,
@@ -92,7 +104,7 @@ class GreenApiInstanceCli:
     async def get_chat_history(self, chat_id: str, instance_id: str, instance_token: str) -> dict:
         url = f"{self.__api_url}/waInstance{instance_id}/getChatHistory{instance_token}?chatId={chat_id}"
         try:
-            async with aiohttp.ClientSession() as session:
+            async with self._client_session() as session:
                 async with session.get(url, headers={"Content-Type": "application/json"}) as response:
                     response.raise_for_status()
                     return await response.json()
@@ -1,13 +1,14 @@
 import aiohttp
 
 from src.core.exceptions import BadRequestException
+from src.services.http_clients import provider_session
 
 
 class HeadHunterCLI:
     async def send_hh_message(self, nid, message, api_token):
         url = f"https://api.hh.kz/negotiations/{nid}/messages"
         try:
-            async with aiohttp.ClientSession() as session:
+            async with provider_session("hh") as session:
                 async with session.post(url, json={"message": message}, headers={
                     "HH-User-Agent": "Atlantys 1.0 / (main@atlantys.kz)",
                     "Authorization": f"Bearer {api_token}"
@@ -24,7 +25,7 @@ class HeadHunterCLI:
     async def get_vacancy_applicants(self, vacancy_id, page, per_page, api_token):
         url = f"https://api.hh.ru/negotiations/response?vacancy_id={vacancy_id}?page={page}&per_page={per_page}"
         try:
-            async with aiohttp.ClientSession() as session:
+            async with provider_session("hh") as session:
                 async with session.get(url, headers={
                     "HH-User-Agent": "Atlantys 1.0 / (main@atlantys.kz)",
                     "Authorization": f"Bearer {api_token}"
@@ -1,4 +1,5 @@
 # src/helpers.py
+import hashlib
 import uuid
 import os
 
@@ -20,3 +21,20 @@ def generate_clone_filekey(session_id: str, original_filename: str) -> str:
     # Формируем file key
     file_key = f"clone/sessions/{session_id}/{unique_id}{ext}"
     return file_key
+
+
+def get_text_hash(text: str) -> str:
+    return hashlib.sha256(text.encode('utf-8')).hexdigest()
+
+
+def parse_matching_percentage(value) -> int:
+    """
+    matching_percentage из ответа LLM как целое: «85», 85.5 и «85%» дают 85,
+    нераспознанное значение — 0. Миграция c41e8a7f5d29 заполняет score
+    копией этого разбора; при изменении правил старые задачи нужно
+    пересчитать отдельной миграцией.
+    """
+    try:
+        return int(float(str(value).replace("%", "").strip()))
+    except (TypeError, ValueError, OverflowError):
+        return 0
@@ -0,0 +1,230 @@
+import asyncio
+import logging
+from contextlib import asynccontextmanager
+from datetime import datetime, timezone
+from typing import Any, AsyncGenerator, Dict, List, Optional
+
+import httpx
+
+from src.core.rate_limit import RedisTokenBucket
+from src.core.settings import settings
+from src.services.hh_resume_cache import hh_resume_cache
+
+logger = logging.getLogger(__name__)
+
+MAX_RETRIES = 5
+DEFAULT_RETRY_AFTER = 1.0
+
+
+class HHApiError(Exception):
+    """Ответ HH API с кодом ошибки"""
+
+    def __init__(self, status_code: int, text: str):
+        super().__init__(f"HH API error {status_code}: {text}")
+        self.status_code = status_code
+        self.text = text
+
+
+def _retry_after(response: httpx.Response, attempt: int) -> float:
+    value = response.headers.get("Retry-After")
+    try:
+        return max(float(value), 0.0)
+    except (TypeError, ValueError):
+        return DEFAULT_RETRY_AFTER * (2 ** attempt)
+
+
+def parse_hh_datetime(value: Optional[str]) -> Optional[datetime]:
+    """Дата HH (2024-01-31T12:00:00+0300) в naive UTC, как хранятся даты в БД"""
+    if not value:
+        return None
+    try:
+        parsed = datetime.strptime(value, "%Y-%m-%dT%H:%M:%S%z")
+    except ValueError:
+        return None
+    return parsed.astimezone(timezone.utc).replace(tzinfo=None)
+
+
+class HHApiClient:
+    """
+    Клиент HH API с общим пулом соединений.
+
+    Каждый запрос от имени аккаунта берёт токен из распределённого
+    token bucket этого аккаунта; при 429 пауза из Retry-After применяется
+    к аккаунту сразу во всех процессах, после чего запрос повторяется.
+    """
+
+    def __init__(
+            self,
+            base_url: str = settings.HH_API_URL,
+            max_connections: int = settings.HH_MAX_CONNECTIONS,
+            page_concurrency: int = settings.HH_PAGE_CONCURRENCY,
+    ):
+        self.page_concurrency = page_concurrency
+        self.rate_limiter = RedisTokenBucket(
+            "hh",
+            rate=settings.HH_RATE_LIMIT_PER_SECOND,
+            capacity=settings.HH_RATE_LIMIT_BURST
+        )
+        self._client = httpx.AsyncClient(
+            base_url=base_url,
+            timeout=httpx.Timeout(10.0),
+            limits=httpx.Limits(max_connections=max_connections, max_keepalive_connections=max_connections),
+            headers={"HH-User-Agent": settings.HH_USER_AGENT, "User-Agent": settings.HH_USER_AGENT},
+        )
+        self._metrics = {"requests": 0, "throttled": 0, "errors": 0}
+
+    async def request(
+            self,
+            method: str,
+            url: str,
+            access_token: Optional[str] = None,
+            account_key: Optional[str] = None,
+            **kwargs
+    ) -> httpx.Response:
+        """
+        Выполняет запрос с учётом лимитов аккаунта. account_key=None — запрос
+        не расходует лимит (например, обмен OAuth-кода).
+        """
+        headers = dict(kwargs.pop("headers", None) or {})
+        if access_token:
+            headers["Authorization"] = f"Bearer {access_token}"
+
+        for attempt in range(MAX_RETRIES):
+            if account_key is not None:
+                await self.rate_limiter.acquire(account_key)
+            self._metrics["requests"] += 1
+            response = await self._client.request(method, url, headers=headers, **kwargs)
+
+            if response.status_code == 429:
+                self._metrics["throttled"] += 1
+                delay = _retry_after(response, attempt)
+                logger.warning(f"HH 429 for {url}, pausing account {account_key} for {delay}s "
+                               f"(attempt {attempt + 1}/{MAX_RETRIES})")
+                if account_key is not None:
+                    await self.rate_limiter.pause(account_key, delay)
+                else:
+                    await asyncio.sleep(delay)
+                continue
+            if response.status_code >= 500 and attempt < MAX_RETRIES - 1:
+                await asyncio.sleep(DEFAULT_RETRY_AFTER * (2 ** attempt))
+                continue
+            return response
+
+        self._metrics["errors"] += 1
+        raise HHApiError(429, f"Retry limit exceeded for {url}")
+
+    async def get_json(
+            self,
+            url: str,
+            access_token: str,
+            account_key: str,
+            params: Optional[Dict[str, Any]] = None
+    ) -> dict:
+        response = await self.request("GET", url, access_token, account_key, params=params)
+        if response.status_code != 200:
+            self._metrics["errors"] += 1
+            raise HHApiError(response.status_code, response.text)
+        return response.json()
+
+    async def fetch_all_pages(
+            self,
+            url: str,
+            access_token: str,
+            account_key: str,
+            params: Optional[Dict[str, Any]] = None,
+    ) -> List[dict]:
+        """
+        Собирает items со всех страниц: первая страница сообщает число
+        страниц (pages), остальные запрашиваются параллельно.
+        """
+        params = dict(params or {})
+        first_page = await self.get_json(url, access_token, account_key, {**params, "page": 0})
+        items = list(first_page.get("items", []))
+        pages = int(first_page.get("pages") or 1)
+        if pages <= 1:
+            return items
+
+        semaphore = asyncio.Semaphore(self.page_concurrency)
+
+        async def fetch_page(page: int) -> List[dict]:
+            async with semaphore:
+                data = await self.get_json(url, access_token, account_key, {**params, "page": page})
+                return data.get("items", [])
+
+        for page_items in await asyncio.gather(*[fetch_page(page) for page in range(1, pages)]):
+            items.extend(page_items)
+        return items
+
+    async def get_resume(self, resume_id: str, access_token: str, account_key: str) -> dict:
+        """
+        Полное резюме через hh_resume_cache: свежая запись отдаётся сразу,
+        устаревшая проверяется условным запросом.
+        """
+        entry = await hh_resume_cache.get(account_key, resume_id)
+        if entry is not None and hh_resume_cache.is_fresh(entry):
+            return entry["data"]
+
+        response = await self.request(
+            "GET",
+            f"/resumes/{resume_id}",
+            access_token,
+            account_key,
+            headers=hh_resume_cache.conditional_headers(entry),
+        )
+        if response.status_code == 304 and entry is not None:
+            await hh_resume_cache.touch(account_key, resume_id, entry)
+            return entry["data"]
+        if response.status_code != 200:
+            self._metrics["errors"] += 1
+            raise HHApiError(response.status_code, response.text)
+
+        data = response.json()
+        await hh_resume_cache.set(
+            account_key,
+            resume_id,
+            data,
+            etag=response.headers.get("ETag"),
+            last_modified=response.headers.get("Last-Modified"),
+        )
+        return data
+
+    async def close(self):
+        await self._client.aclose()
+
+    def stats(self) -> dict:
+        return dict(self._metrics)
+
+
+_hh_client: HHApiClient | None = None
+
+
+def get_hh_client() -> HHApiClient:
+    if not _hh_client:
+        raise Exception("HHApiClient is not initialized")
+    return _hh_client
+
+
+async def start_hh_client() -> HHApiClient:
+    global _hh_client
+
+    if not _hh_client:
+        _hh_client = HHApiClient()
+
+    return _hh_client
+
+
+async def stop_hh_client() -> None:
+    global _hh_client
+
+    if _hh_client:
+        await _hh_client.close()
+        _hh_client = None
+
+
+@asynccontextmanager
+async def hh_client_lifespan() -> AsyncGenerator[HHApiClient, None]:
+    await start_hh_client()
+    try:
+        yield get_hh_client()
+    finally:
+        await stop_hh_client()
@@ -0,0 +1,234 @@
+import asyncio
+import logging
+import time
+import uuid
+from datetime import datetime, timedelta
+from typing import Dict, NamedTuple, Optional, Set
+
+import httpx
+
+from src.core.databases import session_manager
+from src.core.exceptions import BadRequestException
+from src.core.redis_cli import get_redis
+from src.core.settings import settings
+from src.repositories.hh import HHAccountRepository
+from src.services.hh_client import get_hh_client
+
+logger = logging.getLogger(__name__)
+
+_RELEASE_LOCK_LUA = """
+if redis.call('GET', KEYS[1]) == ARGV[1] then
+    return redis.call('DEL', KEYS[1])
+end
+return 0
+"""
+
+
+class HHCredentials(NamedTuple):
+    id: int
+    user_id: int
+    access_token: str
+    expires_at: datetime
+
+
+class HHCredentialProvider:
+    """
+    Учётные данные HH-аккаунтов пользователей.
+
+    Держит access token в памяти на settings.HH_CREDENTIALS_CACHE_TTL, поэтому частые
+    обращения к HH не ходят в БД. Обновление токена single-flight: в процессе
+    одновременные вызовы ждут одну задачу, между процессами — Redis-блокировку;
+    тот, кто блокировку не получил, дожидается её снятия и перечитывает аккаунт.
+    Refresh token в HH одноразовый, поэтому без блокировки (кроме случая, когда
+    Redis недоступен) токен не обновляется: после таймаута ожидания возвращается
+    перечитанный из БД токен, если он ещё действует, иначе — ошибка.
+    Запрос к HH /token идёт вне транзакции; новый токен сохраняется отдельной
+    короткой транзакцией.
+    После неудачного фонового обновления следующее запускается не раньше чем
+    через settings.HH_TOKEN_REFRESH_RETRY_AFTER, чтобы каждый запрос не порождал новую попытку.
+    """
+
+    def __init__(self, cache_ttl: int = settings.HH_CREDENTIALS_CACHE_TTL):
+        self.cache_ttl = cache_ttl
+        self._cache: Dict[int, tuple[HHCredentials, float]] = {}
+        self._refreshing: Dict[int, asyncio.Task] = {}
+        self._background: Set[asyncio.Task] = set()
+        self._refresh_failed_at: Dict[int, float] = {}
+        self._metrics = {
+            "hits": 0, "loads": 0, "refreshes": 0, "refresh_waits": 0, "refresh_errors": 0, "refresh_lock_timeouts": 0
+        }
+
+    async def get(self, user_id: int) -> Optional[HHCredentials]:
+        """Действующие учётные данные или None, если HH-аккаунт не подключён"""
+        cached = self._cache.get(user_id)
+        if cached is not None and time.monotonic() - cached[1] < self.cache_ttl:
+            self._metrics["hits"] += 1
+            credentials = cached[0]
+        else:
+            credentials = await self._load(user_id)
+            if credentials is None:
+                return None
+
+        remaining = (credentials.expires_at - datetime.utcnow()).total_seconds()
+        if remaining < settings.HH_TOKEN_MIN_VALIDITY:
+            return await self.refresh(user_id)
+        if (
+                remaining < settings.HH_TOKEN_REFRESH_AHEAD
+                and user_id not in self._refreshing
+                and not self._refresh_backing_off(user_id)
+        ):
+            task = asyncio.create_task(self._refresh_in_background(user_id))
+            self._background.add(task)
+            task.add_done_callback(self._background.discard)
+        return credentials
+
+    async def refresh(self, user_id: int, force: bool = False) -> HHCredentials:
+        """Обновляет токен; параллельные вызовы для одного пользователя ждут одно обновление"""
+        task = self._refreshing.get(user_id)
+        if task is None:
+            task = asyncio.create_task(self._refresh(user_id, force))
+            self._refreshing[user_id] = task
+            task.add_done_callback(lambda _: self._refreshing.pop(user_id, None))
+        else:
+            self._metrics["refresh_waits"] += 1
+        return await asyncio.shield(task)
+
+    def invalidate(self, user_id: int) -> None:
+        self._cache.pop(user_id, None)
+
+    def _refresh_backing_off(self, user_id: int) -> bool:
+        failed_at = self._refresh_failed_at.get(user_id)
+        if failed_at is None:
+            return False
+        if time.monotonic() - failed_at < settings.HH_TOKEN_REFRESH_RETRY_AFTER:
+            return True
+        self._refresh_failed_at.pop(user_id, None)
+        return False
+
+    async def _refresh_in_background(self, user_id: int):
+        try:
+            await self.refresh(user_id)
+        except Exception as e:
+            self._refresh_failed_at[user_id] = time.monotonic()
+            logger.warning(f"Background HH token refresh failed for user {user_id}: {e}")
+        else:
+            self._refresh_failed_at.pop(user_id, None)
+
+    async def _load(self, user_id: int) -> Optional[HHCredentials]:
+        self._metrics["loads"] += 1
+        async with session_manager.session() as session:
+            hh_account = await HHAccountRepository(session).get_hh_account_by_user_id(user_id)
+        if hh_account is None:
+            self.invalidate(user_id)
+            return None
+        return self._remember(hh_account)
+
+    def _remember(self, hh_account) -> HHCredentials:
+        credentials = HHCredentials(
+            id=hh_account.id,
+            user_id=hh_account.user_id,
+            access_token=hh_account.access_token,
+            expires_at=hh_account.expires_at,
+        )
+        self._cache[credentials.user_id] = (credentials, time.monotonic())
+        return credentials
+
+    async def _read_account(self, user_id: int):
+        async with session_manager.session() as session:
+            hh_account = await HHAccountRepository(session).get_hh_account_by_user_id(user_id)
+        if hh_account is None:
+            self.invalidate(user_id)
+            raise BadRequestException("HH account not found")
+        return hh_account
+
+    async def _acquire_refresh_lock(self, lock_key: str) -> tuple[bool, Optional[str]]:
+        """(получена ли блокировка, токен для её снятия); токен None — Redis недоступен"""
+        lock_token = uuid.uuid4().hex
+        deadline = time.monotonic() + settings.HH_TOKEN_REFRESH_LOCK_TTL
+        while True:
+            try:
+                if await get_redis().set(lock_key, lock_token, nx=True, ex=settings.HH_TOKEN_REFRESH_LOCK_TTL):
+                    return True, lock_token
+            except Exception as e:
+                # Без Redis обновляем без межпроцессной блокировки
+                logger.error(f"HH token refresh lock unavailable: {e}")
+                return True, None
+            if time.monotonic() > deadline:
+                return False, None
+            await asyncio.sleep(0.2)
+
+    async def _refresh(self, user_id: int, force: bool) -> HHCredentials:
+        lock_key = f"hh:token_refresh:{user_id}"
+        started_at = datetime.utcnow()
+        locked, lock_token = await self._acquire_refresh_lock(lock_key)
+        try:
+            hh_account = await self._read_account(user_id)
+
+            # Пока ждали блокировку, токен мог обновить другой процесс
+            updated_elsewhere = hh_account.updated_at is not None and hh_account.updated_at >= started_at
+            remaining = (hh_account.expires_at - datetime.utcnow()).total_seconds()
+            if updated_elsewhere or (not force and remaining >= settings.HH_TOKEN_REFRESH_AHEAD):
+                return self._remember(hh_account)
+
+            if not locked:
+                # Обновление в другом процессе не закончилось: второй запрос с тем же
+                # refresh token сделал бы недействительным один из новых токенов
+                self._metrics["refresh_lock_timeouts"] += 1
+                if not force and remaining > 0:
+                    return self._remember(hh_account)
+                raise BadRequestException("HH token refresh is in progress, try again later")
+
+            token_data = await self._request_new_token(hh_account.refresh_token)
+            async with session_manager.session() as session:
+                async with session.begin():
+                    hh_account = await HHAccountRepository(session).update_hh_account(user_id, {
+                        "access_token": token_data["access_token"],
+                        "refresh_token": token_data["refresh_token"],
+                        "expires_at": datetime.utcnow() + timedelta(seconds=token_data.get("expires_in", 3600)),
+                    })
+            self._metrics["refreshes"] += 1
+            return self._remember(hh_account)
+        except Exception:
+            self._metrics["refresh_errors"] += 1
+            raise
+        finally:
+            if lock_token is not None:
+                try:
+                    await get_redis().eval(_RELEASE_LOCK_LUA, 1, lock_key, lock_token)
+                except Exception as e:
+                    logger.warning(f"Failed to release HH token refresh lock: {e}")
+
+    @staticmethod
+    async def _request_new_token(refresh_token: str) -> dict:
+        data = {
+            "grant_type": "refresh_token",
+            "refresh_token": refresh_token,
+            "client_id": settings.CLIENT_ID,
+            "client_secret": settings.CLIENT_SECRET,
+        }
+        try:
+            response = await get_hh_client().request(
+                "POST",
+                "/token",
+                data=data,
+                headers={"Content-Type": "application/x-www-form-urlencoded"},
+            )
+        except httpx.RequestError as exc:
+            raise BadRequestException(f"HTTP error during token refresh: {exc}") from exc
+
+        if response.status_code != 200:
+            raise BadRequestException(f"Error refreshing token: {response.text}")
+        token_data = response.json()
+        if not (token_data.get("access_token") and token_data.get("refresh_token")):
+            raise BadRequestException("Incomplete token data received during refresh")
+        return token_data
+
+    def stats(self) -> dict:
+        return {
+            **self._metrics,
+            "cached_accounts": len(self._cache),
+            "refreshing": len(self._refreshing),
+        }
+
+
+hh_credentials = HHCredentialProvider()
@@ -0,0 +1,126 @@
+import json
+import logging
+import time
+from typing import Dict, Optional
+
+from src.core.redis_cli import get_redis
+from src.core.settings import settings
+from src.services.cache import BoundedLRUCache
+
+logger = logging.getLogger(__name__)
+
+
+class HHResumeCache:
+    """
+    Кэш полных резюме HH, ключ — (аккаунт HH, resume_id): доступ к резюме
+    зависит от прав аккаунта, поэтому между аккаунтами записи не разделяются.
+
+    Два уровня: in-process LRU с лимитом по байтам и Redis с TTL. Запись
+    хранит ETag/Last-Modified ответа — устаревшую запись можно проверить
+    условным запросом и при 304 не скачивать резюме заново.
+    """
+
+    def __init__(
+            self,
+            max_local_bytes: int = settings.HH_RESUME_CACHE_LOCAL_BYTES,
+            ttl: int = settings.HH_RESUME_CACHE_TTL,
+            fresh_seconds: int = settings.HH_RESUME_CACHE_FRESH_SECONDS,
+    ):
+        self.local = BoundedLRUCache(max_local_bytes, sizeof=lambda entry: entry["size"])
+        self.ttl = ttl
+        self.fresh_seconds = fresh_seconds
+        self.redis_hits = 0
+        self.misses = 0
+        self.revalidated = 0
+        self.redis_errors = 0
+
+    @staticmethod
+    def _key(account_key: str, resume_id: str) -> str:
+        return f"hh:resume:{account_key}:{resume_id}"
+
+    async def get(self, account_key: str, resume_id: str) -> Optional[dict]:
+        key = self._key(account_key, resume_id)
+        entry = self.local.get(key)
+        if entry is not None:
+            return entry
+
+        try:
+            raw = await get_redis().get(key)
+        except Exception as e:
+            self.redis_errors += 1
+            logger.warning(f"HH resume cache redis get failed: {e}")
+            raw = None
+
+        if raw is None:
+            self.misses += 1
+            return None
+
+        self.redis_hits += 1
+        entry = json.loads(raw)
+        entry["size"] = len(raw)
+        self.local.set(key, entry)
+        return entry
+
+    def is_fresh(self, entry: dict) -> bool:
+        return time.time() - entry["fetched_at"] < self.fresh_seconds
+
+    @staticmethod
+    def conditional_headers(entry: Optional[dict]) -> Dict[str, str]:
+        headers = {}
+        if entry is None:
+            return headers
+        if entry.get("etag"):
+            headers["If-None-Match"] = entry["etag"]
+        if entry.get("last_modified"):
+            headers["If-Modified-Since"] = entry["last_modified"]
+        return headers
+
+    async def set(
+            self,
+            account_key: str,
+            resume_id: str,
+            data: dict,
+            etag: Optional[str] = None,
+            last_modified: Optional[str] = None,
+    ) -> dict:
+        entry = {
+            "data": data,
+            "etag": etag,
+            "last_modified": last_modified,
+            "fetched_at": time.time(),
+        }
+        await self._store(self._key(account_key, resume_id), entry)
+        return entry
+
+    async def touch(self, account_key: str, resume_id: str, entry: dict) -> None:
+        """Резюме не изменилось (304) — продлеваем свежесть записи"""
+        self.revalidated += 1
+        entry = {**entry, "fetched_at": time.time()}
+        await self._store(self._key(account_key, resume_id), entry)
+
+    async def _store(self, key: str, entry: dict) -> None:
+        payload = {k: v for k, v in entry.items() if k != "size"}
+        raw = json.dumps(payload, ensure_ascii=False).encode("utf-8")
+        self.local.set(key, {**payload, "size": len(raw)})
+        try:
+            await get_redis().set(key, raw, ex=self.ttl)
+        except Exception as e:
+            self.redis_errors += 1
+            logger.warning(f"HH resume cache redis set failed: {e}")
+
+    def stats(self) -> dict:
+        hits = self.local.hits + self.redis_hits
+        lookups = hits + self.misses
+        return {
+            "hits": hits,
+            "local_hits": self.local.hits,
+            "redis_hits": self.redis_hits,
+            "misses": self.misses,
+            "revalidated": self.revalidated,
+            "redis_errors": self.redis_errors,
+            "hit_rate": round(hits / lookups, 4) if lookups else 0.0,
+            "local": self.local.stats(),
+        }
+
+
+hh_resume_cache = HHResumeCache()
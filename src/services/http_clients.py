@@ -0,0 +1,186 @@
+import asyncio
+import logging
+import random
+import time
+from contextlib import asynccontextmanager
+from typing import AsyncGenerator, Dict, Optional
+
+import aiohttp
+
+from src.core.metrics import HistogramRegistry
+from src.core.settings import settings
+
+logger = logging.getLogger(__name__)
+
+IDEMPOTENT_METHODS = {"GET", "HEAD", "OPTIONS", "PUT", "DELETE"}
+RETRY_STATUSES = {429, 502, 503, 504}
+
+
+class _ProviderRequest:
+    """
+    Запрос через общий пул, используемый как `async with ... as response`.
+
+    Повторяет запрос с экспоненциальной задержкой и jitter. Неидемпотентные
+    запросы (POST) повторяются только если соединение не удалось установить
+    или сервер ответил 429 — тогда запрос точно не был обработан.
+    """
+
+    def __init__(self, provider: "ProviderSession", method: str, url: str, kwargs: dict):
+        self.provider = provider
+        self.method = method.upper()
+        self.url = url
+        self.kwargs = kwargs
+        self._response: Optional[aiohttp.ClientResponse] = None
+
+    async def __aenter__(self) -> aiohttp.ClientResponse:
+        idempotent = self.method in IDEMPOTENT_METHODS
+        attempt = 0
+        while True:
+            started = time.monotonic()
+            try:
+                response = await self.provider.registry.session.request(self.method, self.url, **self.kwargs)
+            except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+                self.provider.observe(time.monotonic() - started, error=True)
+                can_retry = idempotent or isinstance(e, aiohttp.ClientConnectorError)
+                if not can_retry or attempt >= self.provider.retries:
+                    raise
+            else:
+                self.provider.observe(time.monotonic() - started, error=response.status >= 400)
+                can_retry = response.status in RETRY_STATUSES and (idempotent or response.status == 429)
+                if not can_retry or attempt >= self.provider.retries:
+                    self._response = response
+                    return response
+                response.release()
+
+            attempt += 1
+            self.provider.retried += 1
+            await asyncio.sleep(self.provider.backoff * 2 ** (attempt - 1) * random.uniform(0.5, 1.5))
+
+    async def __aexit__(self, exc_type, exc, tb):
+        if self._response is not None:
+            self._response.release()
+
+
+class ProviderSession:
+    """
+    Клиент одного внешнего API поверх общего пула: повторы и метрики по провайдеру.
+    Повторяет интерфейс aiohttp.ClientSession для get/post/request в `async with`.
+    """
+
+    def __init__(self, registry: "OutboundHttpClients", name: str, retries: int, backoff: float):
+        self.registry = registry
+        self.name = name
+        self.retries = retries
+        self.backoff = backoff
+        self.retried = 0
+
+    def observe(self, seconds: float, error: bool):
+        self.registry.latency.observe(self.name, seconds, error)
+
+    def request(self, method: str, url: str, **kwargs) -> _ProviderRequest:
+        return _ProviderRequest(self, method, url, kwargs)
+
+    def get(self, url: str, **kwargs) -> _ProviderRequest:
+        return self.request("GET", url, **kwargs)
+
+    def post(self, url: str, **kwargs) -> _ProviderRequest:
+        return self.request("POST", url, **kwargs)
+
+
+class OutboundHttpClients:
+    """
+    Общий для процесса пул исходящих HTTP-соединений к внешним API
+    (Green API, HH, платёжные провайдеры и т.п.).
+
+    Одна aiohttp-сессия с keep-alive, кэшем DNS и лимитом соединений на хост;
+    provider(name) отдаёт клиента с повторами и гистограммой задержек по имени
+    провайдера. Живёт в lifespan приложения и в воркерах Dramatiq.
+    """
+
+    def __init__(
+            self,
+            max_connections: int = settings.OUTBOUND_HTTP_MAX_CONNECTIONS,
+            max_connections_per_host: int = settings.OUTBOUND_HTTP_MAX_CONNECTIONS_PER_HOST,
+            timeout: float = settings.OUTBOUND_HTTP_TIMEOUT,
+    ):
+        connector = aiohttp.TCPConnector(
+            limit=max_connections,
+            limit_per_host=max_connections_per_host,
+            ttl_dns_cache=settings.OUTBOUND_HTTP_DNS_CACHE_TTL,
+            keepalive_timeout=settings.OUTBOUND_HTTP_KEEPALIVE_TIMEOUT,
+        )
+        self.session = aiohttp.ClientSession(
+            connector=connector,
+            timeout=aiohttp.ClientTimeout(total=timeout),
+        )
+        self.latency = HistogramRegistry()
+        self._providers: Dict[str, ProviderSession] = {}
+
+    def provider(
+            self,
+            name: str,
+            retries: int = settings.OUTBOUND_HTTP_RETRIES,
+            backoff: float = settings.OUTBOUND_HTTP_BACKOFF
+    ) -> ProviderSession:
+        provider = self._providers.get(name)
+        if provider is None:
+            provider = self._providers[name] = ProviderSession(self, name, retries, backoff)
+        return provider
+
+    async def close(self):
+        await self.session.close()
+
+    def stats(self) -> dict:
+        return {
+            "latency": self.latency.stats(),
+            "retries": {name: provider.retried for name, provider in self._providers.items()},
+        }
+
+
+_http_clients: OutboundHttpClients | None = None
+
+
+def get_http_clients() -> OutboundHttpClients:
+    if not _http_clients:
+        raise Exception("OutboundHttpClients is not initialized")
+    return _http_clients
+
+
+@asynccontextmanager
+async def provider_session(name: str) -> AsyncGenerator:
+    """
+    Сессия провайдера из общего пула, а если пул не поднят (скрипты,
+    одноразовые задачи) — временная aiohttp-сессия на время блока.
+    """
+    if _http_clients is not None:
+        yield _http_clients.provider(name)
+    else:
+        async with aiohttp.ClientSession() as session:
+            yield session
+
+
+async def start_http_clients() -> OutboundHttpClients:
+    global _http_clients
+
+    if not _http_clients:
+        _http_clients = OutboundHttpClients()
+        logger.info("Outbound HTTP clients started")
+
+    return _http_clients
+
+
+async def stop_http_clients() -> None:
+    global _http_clients
+
+    if _http_clients:
+        await _http_clients.close()
+        _http_clients = None
+
+
+@asynccontextmanager
+async def http_clients_lifespan() -> AsyncGenerator[OutboundHttpClients, None]:
+    await start_http_clients()
+    try:
+        yield get_http_clients()
+    finally:
+        await stop_http_clients()
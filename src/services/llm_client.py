@@ -0,0 +1,124 @@
+import asyncio
+import importlib.util
+import logging
+import time
+from contextlib import asynccontextmanager
+from typing import Any, AsyncGenerator, Dict
+
+import httpx
+
+from src.core.metrics import HistogramRegistry
+from src.core.settings import settings
+
+logger = logging.getLogger(__name__)
+
+HTTP2_AVAILABLE = importlib.util.find_spec("h2") is not None
+
+# Ограничение одновременных запросов на каждый маршрут LLM-сервиса.
+# Маршруты, которых нет в словаре, получают LLM_ENDPOINT_CONCURRENCY.
+ENDPOINT_CONCURRENCY = {
+    "/hr/analyze_cv_by_vacancy": settings.LLM_ANALYZE_CONCURRENCY,
+    "/hr/analyze_cv_batch": settings.LLM_ENDPOINT_CONCURRENCY,
+    "/hr/generate_vacancy": settings.LLM_ENDPOINT_CONCURRENCY,
+    "/hr/generate_questions_for_candidate": settings.LLM_ENDPOINT_CONCURRENCY,
+    "/hr/review_cv_results": settings.LLM_ENDPOINT_CONCURRENCY,
+}
+
+
+class LLMClient:
+    """
+    Общий для процесса HTTP-клиент к LLM-сервису.
+
+    Держит пул keep-alive соединений, ограничивает число одновременных
+    запросов на каждый маршрут и собирает гистограммы задержек.
+    """
+
+    def __init__(
+            self,
+            max_connections: int = settings.LLM_MAX_CONNECTIONS,
+            max_keepalive_connections: int = settings.LLM_MAX_KEEPALIVE_CONNECTIONS,
+            timeout: float = settings.LLM_TIMEOUT,
+    ):
+        self.http2 = HTTP2_AVAILABLE
+        self._client = httpx.AsyncClient(
+            http2=self.http2,
+            timeout=httpx.Timeout(timeout, read=timeout),
+            limits=httpx.Limits(
+                max_connections=max_connections,
+                max_keepalive_connections=max_keepalive_connections,
+            ),
+            headers={
+                'Accept': 'application/json',
+                'Content-Type': 'application/json'
+            },
+        )
+        self._semaphores: Dict[str, asyncio.Semaphore] = {}
+        self._in_flight: Dict[str, int] = {}
+        self.latency = HistogramRegistry()
+
+    def _semaphore(self, route: str) -> asyncio.Semaphore:
+        semaphore = self._semaphores.get(route)
+        if semaphore is None:
+            limit = ENDPOINT_CONCURRENCY.get(route, settings.LLM_ENDPOINT_CONCURRENCY)
+            semaphore = self._semaphores[route] = asyncio.Semaphore(limit)
+        return semaphore
+
+    async def post(self, url: str, data: Dict[str, Any]) -> httpx.Response:
+        route = httpx.URL(url).path
+        async with self._semaphore(route):
+            self._in_flight[route] = self._in_flight.get(route, 0) + 1
+            started = time.monotonic()
+            error = True
+            try:
+                response = await self._client.post(url, json=data)
+                error = response.is_error
+                return response
+            finally:
+                self._in_flight[route] -= 1
+                self.latency.observe(route, time.monotonic() - started, error)
+
+    async def close(self):
+        await self._client.aclose()
+
+    def stats(self) -> dict:
+        return {
+            "http2": self.http2,
+            "in_flight": dict(self._in_flight),
+            "latency": self.latency.stats(),
+        }
+
+
+_llm_client: LLMClient | None = None
+
+
+def get_llm_client() -> LLMClient:
+    if not _llm_client:
+        raise Exception("LLMClient is not initialized")
+    return _llm_client
+
+
+async def start_llm_client() -> LLMClient:
+    global _llm_client
+
+    if not _llm_client:
+        _llm_client = LLMClient()
+        logger.info(f"LLM client started (http2={_llm_client.http2})")
+
+    return _llm_client
+
+
+async def stop_llm_client() -> None:
+    global _llm_client
+
+    if _llm_client:
+        await _llm_client.close()
+        _llm_client = None
+
+
+@asynccontextmanager
+async def llm_client_lifespan() -> AsyncGenerator[LLMClient, None]:
+    await start_llm_client()
+    try:
+        yield get_llm_client()
+    finally:
+        await stop_llm_client()
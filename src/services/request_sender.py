@@ -1,9 +1,10 @@
 import logging
 import httpx
-from typing import Any, Dict
+from typing import Any, Dict, List
 from abc import ABC, abstractmethod
 
 from src.core.settings import settings
+from src.services.llm_client import get_llm_client
 
 logging.basicConfig(level=logging.INFO)
 
@@ -15,19 +16,16 @@ class IRequestSender(ABC):
 class RequestSender(IRequestSender):
 
     LLM_URL = f"{settings.LLM_SERVICE_URL}/hr/analyze_cv_by_vacancy"
+    BATCH_LLM_URL = f"{settings.LLM_SERVICE_URL}/hr/analyze_cv_batch"
 
     async def _send_request(self, data: Dict[str, Any], llm_url: str = LLM_URL) -> Dict[str, Any]:
-        headers = {
-            'Accept': 'application/json',
-            'Content-Type': 'application/json'
-        }
         try:
-            async with httpx.AsyncClient(timeout=httpx.Timeout(120.0, read=120.0)) as client:
-                response = await client.post(llm_url, json=data, headers=headers)
-                response.raise_for_status()  
-                response_data = response.json()
-                logging.info("Response data: %s", response_data)
-                return response_data
+            # Запрос идёт через общий пул соединений процесса (см. llm_client_lifespan)
+            response = await get_llm_client().post(llm_url, data)
+            response.raise_for_status()
+            response_data = response.json()
+            logging.info("Response data: %s", response_data)
+            return response_data
         except httpx.HTTPStatusError as http_err:
             logging.error(f"HTTP error occurred: {http_err.response.status_code} - {http_err.response.text}")
             raise Exception(f"HTTP error: {http_err.response.status_code} - {http_err.response.text}") from http_err
@@ -36,4 +34,18 @@ class RequestSender(IRequestSender):
             raise Exception(f"Request error: {req_err}") from req_err
         except Exception as err:
             logging.error(f"Unexpected error occurred: {err}")
-            raise Exception(f"Unexpected error: {err}") from err
\ No newline at end of file
+            raise Exception(f"Unexpected error: {err}") from err
+
+    async def _send_batch_request(self, vacancy_text: str, resumes: List[Dict[str, str]]) -> Dict[str, Dict[str, Any]]:
+        """
+        Анализ нескольких резюме по одной вакансии за один запрос.
+
+        Контракт: {"vacancy_text": str, "resumes": [{"id": str, "resume_text": str}]}
+        -> {"results": [{"id": str, "llm_response": dict, "tokens_spent": int, "error": str | None}]}
+        Возвращает результаты, сгруппированные по id.
+        """
+        response_data = await self._send_request(
+            data={"vacancy_text": vacancy_text, "resumes": resumes},
+            llm_url=self.BATCH_LLM_URL
+        )
+        return {str(item.get("id")): item for item in response_data.get("results", [])}
@@ -0,0 +1,172 @@
+import asyncio
+import csv
+import json
+import logging
+import tempfile
+from io import StringIO
+from typing import AsyncIterator, List, Optional, Sequence
+
+import xlsxwriter
+from sqlalchemy import select
+
+from src.core.databases import session_manager
+from src.models.hr_assistant_task import HRTask
+
+logger = logging.getLogger(__name__)
+
+EXPORT_CHUNK_SIZE = 500
+FILE_READ_CHUNK_SIZE = 64 * 1024
+
+EXPORT_COLUMNS = [
+    "fullname",
+    "gender",
+    "age",
+    "birth_date",
+    "phone_number",
+    "email",
+    "preferred_contact",
+    "location",
+    "languages",
+    "desired_position",
+    "specializations",
+    "employment_type",
+    "work_schedule",
+    "desired_salary",
+    "overall_years_experience",
+    "experience_details",
+    "education",
+    "skills",
+    "matching_percentage",
+    "overall_comment"
+]
+
+CSV_MEDIA_TYPE = "text/csv"
+XLSX_MEDIA_TYPE = "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
+
+
+def build_export_row(result_data) -> dict:
+    if isinstance(result_data, str):
+        result_data = json.loads(result_data)
+
+    candidate_info = result_data.get("candidate_info", {})
+    job_preferences = result_data.get("job_preferences", {})
+    analysis = result_data.get("analysis", {})
+    experience_obj = result_data.get("experience", {})
+    contacts = candidate_info.get("contacts", {})
+
+    experience_details = []
+    for exp in experience_obj.get("details", []):
+        duration = exp.get("duration", "N/A")
+        company = exp.get("company_name", "N/A")
+        role = exp.get("role", "")
+        experience_details.append(f"{duration}, {company}, {role}")
+
+    return {
+        "fullname": candidate_info.get("fullname", ""),
+        "gender": candidate_info.get("gender", ""),
+        "age": candidate_info.get("age", ""),
+        "birth_date": candidate_info.get("birth_date", ""),
+        "phone_number": contacts.get("phone_number", ""),
+        "email": contacts.get("email", ""),
+        "preferred_contact": contacts.get("preferred_contact", ""),
+        "location": candidate_info.get("location", ""),
+        "languages": ", ".join(candidate_info.get("languages", [])),
+        "desired_position": job_preferences.get("desired_position", ""),
+        "specializations": ", ".join(job_preferences.get("specializations", [])),
+        "employment_type": job_preferences.get("employment_type", ""),
+        "work_schedule": job_preferences.get("work_schedule", ""),
+        "desired_salary": job_preferences.get("desired_salary", ""),
+        "overall_years_experience": experience_obj.get("overall_years", ""),
+        "experience_details": " | ".join(experience_details),
+        "education": ", ".join(result_data.get("education", {}).get("degrees", [])),
+        "skills": ", ".join(result_data.get("skills", [])),
+        "matching_percentage": analysis.get("matching_percentage", ""),
+        "overall_comment": analysis.get("overall_comment", "")
+    }
+
+
+def parse_export_columns(columns: Optional[str]) -> List[str]:
+    """Разбирает список колонок вида "fullname,email"; пустое значение — все колонки"""
+    if not columns:
+        return list(EXPORT_COLUMNS)
+    selected = [column.strip() for column in columns.split(",") if column.strip()]
+    unknown = [column for column in selected if column not in EXPORT_COLUMNS]
+    if unknown:
+        raise ValueError(f"Unknown export columns: {', '.join(unknown)}")
+    return selected
+
+
+class SessionResultsExporter:
+    """
+    Потоковая выгрузка результатов сессии.
+
+    Строки читаются серверным курсором порциями по EXPORT_CHUNK_SIZE и сразу
+    отдаются клиенту, поэтому память не растёт с размером сессии. Генераторы
+    открывают собственную сессию БД: зависимость get_session закрывается
+    до того, как StreamingResponse начнёт отправлять тело.
+    """
+
+    def __init__(self, session_id: str, columns: Sequence[str], chunk_size: int = EXPORT_CHUNK_SIZE):
+        self.session_id = session_id
+        self.columns = list(columns)
+        self.chunk_size = chunk_size
+
+    async def _iter_rows(self) -> AsyncIterator[List[dict]]:
+        async with session_manager.session() as session:
+            result = await session.stream_scalars(
+                select(HRTask.result_data)
+                .where(HRTask.session_id == self.session_id)
+                .order_by(HRTask.id)
+                .execution_options(yield_per=self.chunk_size)
+            )
+            async for partition in result.partitions():
+                rows = []
+                for result_data in partition:
+                    if not result_data:
+                        continue
+                    try:
+                        rows.append(build_export_row(result_data))
+                    except Exception as e:
+                        logger.warning(f"Skipping malformed result in session {self.session_id}: {e}")
+                yield rows
+
+    async def stream_csv(self) -> AsyncIterator[bytes]:
+        buffer = StringIO()
+        writer = csv.DictWriter(
+            buffer,
+            fieldnames=self.columns,
+            delimiter=';',
+            quoting=csv.QUOTE_MINIMAL,
+            extrasaction='ignore'
+        )
+        writer.writeheader()
+        async for rows in self._iter_rows():
+            writer.writerows(rows)
+            yield buffer.getvalue().encode('utf-8')
+            buffer.seek(0)
+            buffer.truncate()
+        if buffer.tell():
+            yield buffer.getvalue().encode('utf-8')
+
+    async def stream_xlsx(self) -> AsyncIterator[bytes]:
+        # constant_memory сбрасывает каждую строку на диск сразу после записи;
+        # готовый архив тоже собирается во временном файле, а не в памяти.
+        with tempfile.TemporaryFile() as output:
+            workbook = xlsxwriter.Workbook(output, {'constant_memory': True, 'strings_to_numbers': False})
+            try:
+                worksheet = workbook.add_worksheet("results")
+                worksheet.write_row(0, 0, self.columns)
+                row_index = 1
+                async for rows in self._iter_rows():
+                    for row in rows:
+                        worksheet.write_row(row_index, 0, [str(row.get(column, "")) for column in self.columns])
+                        row_index += 1
+            finally:
+                await asyncio.to_thread(workbook.close)
+
+            output.seek(0)
+            while True:
+                chunk = await asyncio.to_thread(output.read, FILE_READ_CHUNK_SIZE)
+                if not chunk:
+                    break
+                yield chunk
@@ -0,0 +1,203 @@
+import asyncio
+import hashlib
+import logging
+from dataclasses import dataclass, field
+from typing import Awaitable, Callable, List, Optional
+
+from fastapi import UploadFile
+
+from src.core.settings import settings
+from src.services.helpers import generate_file_key
+
+logger = logging.getLogger(__name__)
+
+# Код ошибки в IngestionStats.error: обработка прервалась, часть задач уже создана.
+# Текст исключения пишется в лог и клиенту не отдаётся.
+INGESTION_INTERRUPTED = "ingestion_interrupted"
+
+_STOP = object()
+
+
+@dataclass
+class IngestedResume:
+    filename: str
+    text: str
+    text_hash: str
+    file_url: Optional[str] = None
+    file_key: Optional[str] = None
+    content: Optional[bytes] = field(default=None, repr=False)
+
+
+@dataclass
+class IngestionStats:
+    total_files: int = 0
+    duplicates: int = 0
+    failed_files: List[str] = field(default_factory=list)
+    # Файлы, из которых не удалось извлечь текст (сканы, пустые документы)
+    empty_files: List[str] = field(default_factory=list)
+    enqueued: int = 0
+    # Код ошибки (INGESTION_INTERRUPTED), если обработка прервалась после того,
+    # как часть резюме уже поставлена в очередь
+    error: Optional[str] = None
+
+
+class ResumeIngestionPipeline:
+    """
+    Потоковая обработка загруженных резюме:
+    extract -> hash/dedupe -> upload -> enqueue.
+
+    Стадии связаны ограниченными очередями, поэтому в памяти одновременно
+    находится не больше queue_size * 2 + extract_concurrency + upload_concurrency
+    файлов, независимо от размера пачки. Готовые резюме передаются в on_batch
+    порциями по batch_size (или раз в flush_interval секунд); значения по
+    умолчанию — RESUME_* в Settings.
+
+    Файл, который не удалось разобрать или загрузить, попадает в failed_files.
+    Если конвейер прервался (например, on_batch упал), а часть порций уже
+    передана, run возвращает статистику с кодом error вместо исключения, чтобы
+    вызывающий код сообщил о созданных задачах.
+    """
+
+    def __init__(
+            self,
+            text_extractor,
+            minio_service,
+            extract_concurrency: int = settings.RESUME_EXTRACT_CONCURRENCY,
+            upload_concurrency: int = settings.RESUME_UPLOAD_CONCURRENCY,
+            queue_size: int = settings.RESUME_INGESTION_QUEUE_SIZE,
+            batch_size: int = settings.RESUME_INGESTION_BATCH_SIZE,
+            flush_interval: float = settings.RESUME_INGESTION_FLUSH_INTERVAL,
+    ):
+        self.text_extractor = text_extractor
+        self.minio_service = minio_service
+        self.extract_concurrency = extract_concurrency
+        self.upload_concurrency = upload_concurrency
+        self.queue_size = queue_size
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+
+    @staticmethod
+    def get_text_hash(text: str) -> str:
+        return hashlib.sha256(text.encode('utf-8')).hexdigest()
+
+    async def run(
+            self,
+            resumes: List[UploadFile],
+            session_id: str,
+            on_batch: Callable[[List[IngestedResume]], Awaitable[None]],
+    ) -> IngestionStats:
+        stats = IngestionStats(total_files=len(resumes))
+        files_queue: asyncio.Queue = asyncio.Queue(maxsize=self.queue_size)
+        upload_queue: asyncio.Queue = asyncio.Queue(maxsize=self.queue_size)
+        batch_queue: asyncio.Queue = asyncio.Queue(maxsize=self.queue_size)
+        seen_hashes = set()
+
+        async def feed():
+            for resume in resumes:
+                await files_queue.put(resume)
+            for _ in range(self.extract_concurrency):
+                await files_queue.put(_STOP)
+
+        async def extract_worker():
+            while True:
+                resume = await files_queue.get()
+                if resume is _STOP:
+                    return
+                try:
+                    content = await resume.read()
+                    text = await self.text_extractor.extract_text_from_bytes(
+                        content,
+                        resume.content_type,
+                        resume.filename
+                    )
+                except Exception as e:
+                    logger.error(f"Failed to extract resume {resume.filename}: {e}")
+                    stats.failed_files.append(resume.filename)
+                    continue
+                finally:
+                    await resume.close()
+
+                cleaned_text = (text or "").strip()
+                if not cleaned_text:
+                    stats.empty_files.append(resume.filename)
+                    continue
+                text_hash = self.get_text_hash(cleaned_text)
+                if text_hash in seen_hashes:
+                    stats.duplicates += 1
+                    continue
+                seen_hashes.add(text_hash)
+                await upload_queue.put(
+                    IngestedResume(
+                        filename=resume.filename,
+                        text=cleaned_text,
+                        text_hash=text_hash,
+                        content=content
+                    )
+                )
+
+        async def upload_worker():
+            while True:
+                item = await upload_queue.get()
+                if item is _STOP:
+                    return
+                file_key = generate_file_key(session_id, item.filename)
+                try:
+                    item.file_url, item.file_key = await self.minio_service.upload_single_file(item.content, file_key)
+                except Exception as e:
+                    logger.error(f"Failed to upload resume {item.filename}: {e}")
+                    stats.failed_files.append(item.filename)
+                    continue
+                finally:
+                    item.content = None
+                await batch_queue.put(item)
+
+        async def extract_stage():
+            await asyncio.gather(*[extract_worker() for _ in range(self.extract_concurrency)])
+            for _ in range(self.upload_concurrency):
+                await upload_queue.put(_STOP)
+
+        async def upload_stage():
+            await asyncio.gather(*[upload_worker() for _ in range(self.upload_concurrency)])
+            await batch_queue.put(_STOP)
+
+        async def batch_consumer():
+            batch: List[IngestedResume] = []
+            while True:
+                try:
+                    item = await asyncio.wait_for(batch_queue.get(), timeout=self.flush_interval)
+                except asyncio.TimeoutError:
+                    item = None
+
+                if item is _STOP:
+                    break
+                if item is not None:
+                    batch.append(item)
+
+                if batch and (item is None or len(batch) >= self.batch_size):
+                    await on_batch(batch)
+                    stats.enqueued += len(batch)
+                    batch = []
+
+            if batch:
+                await on_batch(batch)
+                stats.enqueued += len(batch)
+
+        tasks = [
+            asyncio.create_task(feed()),
+            asyncio.create_task(extract_stage()),
+            asyncio.create_task(upload_stage()),
+            asyncio.create_task(batch_consumer()),
+        ]
+
+        try:
+            await asyncio.gather(*tasks)
+        except BaseException as e:
+            for task in tasks:
+                task.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
+            if not isinstance(e, Exception) or not stats.enqueued:
+                raise
+            logger.error(f"Resume ingestion stopped after {stats.enqueued} resumes", exc_info=e)
+            stats.error = INGESTION_INTERRUPTED
+
+        return stats
@@ -1,43 +1,267 @@
-from typing import Dict, Any
+import asyncio
+import json
+import logging
+import uuid
+from collections import deque
+from typing import Any, Deque, Dict, Optional, Set
 
 from fastapi import WebSocket
 
+from src.core.redis_cli import get_redis
+from src.core.settings import settings
+
+logger = logging.getLogger(__name__)
+
+CHANNEL_PREFIX = "ws:"
+
+
+def user_channel(user_id) -> str:
+    return f"user:{user_id}"
+
+
+def session_channel(session_id) -> str:
+    return f"session:{session_id}"
+
+
+class _Subscriber:
+    """
+    Один сокет и его очередь отправки.
+
+    Обычные сообщения стоят в ограниченной очереди, события прогресса
+    хранятся по одному (последнему) на канал — медленный клиент получает
+    только актуальное состояние, а не всю историю.
+    """
+
+    def __init__(self, websocket: WebSocket, on_close):
+        self.websocket = websocket
+        self._messages: Deque[dict] = deque()
+        self._progress: Dict[str, dict] = {}
+        self._ready = asyncio.Event()
+        self._on_close = on_close
+        self._task = asyncio.create_task(self._sender())
+
+    def put(self, channel: str, message: dict, coalesce: bool):
+        if coalesce:
+            self._progress[channel] = message
+            self._ready.set()
+            return
+        # Прогресс, поставленный до обычного сообщения, ушёл бы после него
+        # и перекрыл бы итоговое состояние (COMPLETED/FAILED) устаревшим
+        self._progress.pop(channel, None)
+        if len(self._messages) >= settings.WS_SEND_QUEUE_SIZE:
+            logger.warning("WebSocket consumer is too slow, closing connection")
+            self.close(code=1013)
+            return
+        else:
+            self._messages.append(message)
+        self._ready.set()
+
+    async def _sender(self):
+        try:
+            while True:
+                await self._ready.wait()
+                self._ready.clear()
+                while self._messages or self._progress:
+                    if self._messages:
+                        message = self._messages.popleft()
+                    else:
+                        _, message = self._progress.popitem()
+                    await asyncio.wait_for(self.websocket.send_json(message), timeout=settings.WS_SEND_TIMEOUT)
+        except asyncio.CancelledError:
+            pass
+        except Exception as e:
+            logger.info(f"WebSocket send failed: {e}")
+            await self._on_close(self)
+
+    def close(self, code: int = None):
+        self._task.cancel()
+        if code is not None:
+            asyncio.create_task(self._close_socket(code))
+        asyncio.create_task(self._on_close(self))
+
+    async def _close_socket(self, code: int):
+        try:
+            await self.websocket.close(code=code)
+        except Exception:
+            pass
+
 
 class ConnectionManager:
+    """
+    Рассылка сообщений в WebSocket через Redis pub/sub.
+
+    Публикация (send_json / notify_progress) возможна из любого процесса —
+    API, воркеров Dramatiq, Celery. Каждый процесс с открытыми сокетами
+    держит одну подписку pub/sub и раздаёт сообщения своим локальным
+    сокетам; на один канал может быть подключено несколько сокетов.
+    """
 
-    def __init__(self, ):
-        self.active_connections: Dict[Any, WebSocket] = {}
+    def __init__(self, coalesce_interval: float = settings.WS_COALESCE_INTERVAL):
+        self.node_id = uuid.uuid4().hex
+        self.coalesce_interval = coalesce_interval
+        self._subscribers: Dict[str, Set[_Subscriber]] = {}
+        self._pubsub = None
+        self._listener: Optional[asyncio.Task] = None
+        self._pending_progress: Dict[str, dict] = {}
+        self._flush_handle: Optional[asyncio.TimerHandle] = None
+
+    # --- подключения ---
 
     async def connect(self, user_id: int, websocket: WebSocket):
         await websocket.accept()
-        self.active_connections[user_id] = websocket
-        print(f"User {self.active_connections[user_id]} connected")  # Лог подключения
+        await self._register(user_channel(user_id), websocket)
 
     async def session_connect(self, session_id: str, websocket: WebSocket):
         await websocket.accept()
-        self.active_connections[session_id] = websocket
-        print(f"User {self.active_connections[session_id]} connected")  # Лог подключения
+        await self._register(session_channel(session_id), websocket)
 
-    async def disconnect(self, user_id: int):
-        if user_id in self.active_connections:
-            del self.active_connections[user_id]
+    async def disconnect(self, key, websocket: WebSocket = None):
+        """Отключает сокет (или все локальные сокеты), подписанные на user/session key"""
+        for channel in (user_channel(key), session_channel(key)):
+            for subscriber in list(self._subscribers.get(channel, ())):
+                if websocket is None or subscriber.websocket is websocket:
+                    subscriber.close()
 
-    async def send_json(self, user_id: int, message: dict):
-        websocket = self.active_connections.get(user_id)
-        if websocket:
+    async def _register(self, channel: str, websocket: WebSocket):
+        subscriber = _Subscriber(websocket, lambda sub: self._unregister(channel, sub))
+        subscribers = self._subscribers.setdefault(channel, set())
+        subscribers.add(subscriber)
+        if len(subscribers) == 1:
+            await self._subscribe(channel)
+        logger.info(f"WebSocket connected to {channel} ({len(subscribers)} local sockets)")
+
+    async def _unregister(self, channel: str, subscriber: _Subscriber):
+        subscribers = self._subscribers.get(channel)
+        if not subscribers or subscriber not in subscribers:
+            return
+        subscribers.discard(subscriber)
+        if not subscribers:
+            del self._subscribers[channel]
+            await self._unsubscribe(channel)
+
+    # --- pub/sub ---
+
+    async def _subscribe(self, channel: str):
+        try:
+            if self._pubsub is None:
+                self._pubsub = get_redis().pubsub()
+            await self._pubsub.subscribe(CHANNEL_PREFIX + channel)
+            if self._listener is None or self._listener.done():
+                self._listener = asyncio.create_task(self._listen())
+        except Exception as e:
+            # Без Redis сокет продолжит получать сообщения, опубликованные в этом процессе
+            logger.error(f"Failed to subscribe to {channel}: {e}")
+
+    async def _unsubscribe(self, channel: str):
+        if self._pubsub is None:
+            return
+        try:
+            await self._pubsub.unsubscribe(CHANNEL_PREFIX + channel)
+        except Exception as e:
+            logger.warning(f"Failed to unsubscribe from {channel}: {e}")
+
+    async def _listen(self):
+        while self._subscribers:
             try:
-                print(f"Sending message to user {user_id}: {message}")  # Лог перед отправкой
-                await websocket.send_json(message)
+                message = await self._pubsub.get_message(ignore_subscribe_messages=True, timeout=1.0)
+            except asyncio.CancelledError:
+                raise
             except Exception as e:
-                print(f"Error sending message to user {user_id}: {e}")
-                await self.disconnect(user_id)
-        else:
-            print(f"No active WebSocket connection for user {user_id}")
+                logger.error(f"WebSocket pub/sub listener error: {e}")
+                await asyncio.sleep(1)
+                continue
+            if not message or message.get("type") != "message":
+                continue
+            try:
+                envelope = json.loads(message["data"])
+            except (TypeError, ValueError):
+                continue
+            if envelope.get("node") == self.node_id:
+                # Своё сообщение уже доставлено локально при публикации
+                continue
+            channel = message["channel"]
+            if isinstance(channel, bytes):
+                channel = channel.decode()
+            self._deliver_local(channel[len(CHANNEL_PREFIX):], envelope["payload"], envelope.get("coalesce", False))
+
+    def _deliver_local(self, channel: str, payload: dict, coalesce: bool):
+        for subscriber in list(self._subscribers.get(channel, ())):
+            subscriber.put(channel, payload, coalesce)
+
+    async def publish(self, channel: str, payload: dict, coalesce: bool = False):
+        if not coalesce:
+            self._drop_pending_progress(channel)
+        self._deliver_local(channel, payload, coalesce)
+        envelope = json.dumps(
+            {"node": self.node_id, "payload": payload, "coalesce": coalesce},
+            ensure_ascii=False,
+            default=str
+        )
+        try:
+            await get_redis().publish(CHANNEL_PREFIX + channel, envelope)
+        except Exception as e:
+            logger.error(f"Failed to publish WebSocket message to {channel}: {e}")
+
+    async def publish_progress(self, channel: str, payload: dict):
+        """
+        Прогресс схлопывается на стороне издателя: за coalesce_interval в Redis
+        уходит только последнее событие канала.
+        """
+        self._pending_progress[channel] = payload
+        if self._flush_handle is None:
+            loop = asyncio.get_running_loop()
+            self._flush_handle = loop.call_later(
+                self.coalesce_interval,
+                lambda: asyncio.ensure_future(self.flush())
+            )
+
+    def _drop_pending_progress(self, channel: str):
+        """Отбрасывает ещё не отправленный прогресс канала: он старше сообщения, которое уходит сейчас"""
+        self._pending_progress.pop(channel, None)
+        if not self._pending_progress and self._flush_handle is not None:
+            self._flush_handle.cancel()
+            self._flush_handle = None
+
+    async def flush(self):
+        self._flush_handle = None
+        pending, self._pending_progress = self._pending_progress, {}
+        for channel, payload in pending.items():
+            await self.publish(channel, payload, coalesce=True)
+
+    # --- публичный API ---
+
+    async def send_json(self, user_id: int, message: dict):
+        await self.publish(user_channel(user_id), message)
+
+    async def send_progress(self, user_id: int, payload: Dict[str, Any]):
+        await self.publish_progress(user_channel(user_id), payload)
 
     async def notify_progress(self, session_id: str, payload: Dict[str, Any]):
-        websocket = self.active_connections.get(session_id)
-        if websocket:
-            await websocket.send_json(payload)
+        await self.publish_progress(session_channel(session_id), payload)
+
+    async def close(self):
+        if self._flush_handle is not None:
+            self._flush_handle.cancel()
+            await self.flush()
+        for subscribers in list(self._subscribers.values()):
+            for subscriber in list(subscribers):
+                subscriber.close()
+        if self._listener is not None:
+            self._listener.cancel()
+            self._listener = None
+        if self._pubsub is not None:
+            try:
+                await self._pubsub.aclose()
+            except Exception:
+                pass
+            self._pubsub = None
+
+    def stats(self) -> dict:
+        return {
+            "node_id": self.node_id,
+            "channels": len(self._subscribers),
+            "sockets": sum(len(subscribers) for subscribers in self._subscribers.values()),
+        }
 
 
 manager = ConnectionManager()
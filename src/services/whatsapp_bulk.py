@@ -0,0 +1,79 @@
+import asyncio
+import logging
+from typing import List, NamedTuple, Optional
+
+from src.core.rate_limit import RedisTokenBucket
+from src.core.settings import settings
+from src.services.green_api_instance_cli import GreenApiInstanceCli
+
+logger = logging.getLogger(__name__)
+
+# Пауза инстанса после ответа 429 от Green API
+GREEN_API_THROTTLE_PAUSE = 5.0
+
+
+class OutgoingMessage(NamedTuple):
+    chat_id: str
+    text: str
+
+
+class WhatsappBulkSender:
+    """
+    Рассылка сообщений через один инстанс Green API.
+
+    Сообщения уходят параллельно (не больше WHATSAPP_BULK_CONCURRENCY) через
+    одну HTTP-сессию (http_clients.provider_session); темп ограничен token
+    bucket на инстанс, общий для всех воркеров, поэтому две рассылки с одного
+    номера делят его лимит.
+    """
+
+    rate_limiter = RedisTokenBucket(
+        "green_api",
+        rate=settings.GREEN_API_RATE_LIMIT_PER_SECOND,
+        capacity=settings.GREEN_API_RATE_LIMIT_BURST
+    )
+
+    def __init__(
+            self,
+            instance_id: str,
+            instance_token: str,
+            http_session,
+            concurrency: int = settings.WHATSAPP_BULK_CONCURRENCY
+    ):
+        self.instance_id = instance_id
+        self.instance_token = instance_token
+        self.client = GreenApiInstanceCli(http_session)
+        self._semaphore = asyncio.Semaphore(concurrency)
+
+    async def send(self, message: OutgoingMessage) -> bool:
+        async with self._semaphore:
+            try:
+                await self.rate_limiter.acquire(self.instance_id, timeout=5 * 60)
+            except TimeoutError as e:
+                logger.error(f"WhatsApp {message.chat_id}: {e}")
+                return False
+            response = await self.client.send_message(
+                data={"chat_id": message.chat_id, "message": message.text},
+                instance_id=self.instance_id,
+                instance_token=self.instance_token
+            )
+        if response.get("success") is False:
+            if response.get("status") == 429:
+                await self.rate_limiter.pause(self.instance_id, GREEN_API_THROTTLE_PAUSE)
+            logger.error(f"WhatsApp {message.chat_id}: сообщение не отправлено: {response.get('error')}")
+            return False
+        return True
+
+    async def send_all(self, messages: List[OutgoingMessage]) -> List[str]:
+        """Отправляет сообщения; возвращает chat_id, которым отправка удалась"""
+        results = await asyncio.gather(*[self.send(message) for message in messages])
+        return [message.chat_id for message, sent in zip(messages, results) if sent]
+
+
+def to_whatsapp_chat_id(phone_number: Optional[str]) -> Optional[str]:
+    digits = "".join(ch for ch in (phone_number or "") if ch.isdigit())
+    if not digits:
+        return None
+    if digits.startswith("8"):
+        digits = "7" + digits[1:]
+    return f"{digits}@c.us"
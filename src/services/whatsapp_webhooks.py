@@ -0,0 +1,195 @@
+import json
+import logging
+import time
+from typing import Dict, Iterable, List, NamedTuple, Optional
+
+from src.core.redis_cli import get_redis
+from src.core.settings import settings
+
+logger = logging.getLogger(__name__)
+
+WHATSAPP_WEBHOOK_QUEUE_KEY = "whatsapp:webhooks"
+# Забранные обработчиком, но ещё не подтверждённые вебхуки (ack_webhooks)
+WHATSAPP_WEBHOOK_PROCESSING_KEY = "whatsapp:webhooks:processing"
+# Флаг «обработчик очереди уже запланирован», чтобы не ставить актор на каждый вебхук
+WHATSAPP_WEBHOOK_SCHEDULED_KEY = "whatsapp:webhooks:scheduled"
+
+HANDLED_WEBHOOK_TYPES = {"incomingMessageReceived", "pollAnswer"}
+
+
+def _dedup_key(message_id: str) -> str:
+    return f"whatsapp:webhooks:seen:{message_id}"
+
+
+def is_valid_webhook(data) -> bool:
+    return (
+        isinstance(data, dict)
+        and isinstance(data.get("typeWebhook"), str)
+        and isinstance(data.get("instanceData"), dict)
+        and data["instanceData"].get("idInstance") is not None
+    )
+
+
+async def push_webhook(data: dict) -> bool:
+    """
+    Кладёт вебхук в очередь Redis. Возвращает True, если обработчик очереди
+    нужно запланировать (флаг был снят и этот вызов его поставил).
+    """
+    async with get_redis().pipeline(transaction=False) as pipeline:
+        pipeline.rpush(WHATSAPP_WEBHOOK_QUEUE_KEY, json.dumps(data))
+        pipeline.set(WHATSAPP_WEBHOOK_SCHEDULED_KEY, 1, nx=True, ex=settings.WHATSAPP_WEBHOOK_SCHEDULED_TTL)
+        _, scheduled = await pipeline.execute()
+    return bool(scheduled)
+
+
+async def schedule_flag() -> bool:
+    return bool(await get_redis().set(
+        WHATSAPP_WEBHOOK_SCHEDULED_KEY, 1, nx=True, ex=settings.WHATSAPP_WEBHOOK_SCHEDULED_TTL
+    ))
+
+
+async def release_flag() -> bool:
+    """Снимает флаг; возвращает True, если за время обработки пришли новые вебхуки и флаг поставлен снова"""
+    redis = get_redis()
+    await redis.delete(WHATSAPP_WEBHOOK_SCHEDULED_KEY)
+    if await redis.llen(WHATSAPP_WEBHOOK_QUEUE_KEY):
+        return await schedule_flag()
+    return False
+
+
+async def claim_webhooks(count: int = settings.WHATSAPP_WEBHOOK_BATCH_SIZE) -> List[bytes]:
+    """
+    Переносит до count вебхуков из очереди в список обрабатываемых (LMOVE) и
+    возвращает их как есть. Пачку нужно подтвердить ack_webhooks после
+    коммита или вернуть в очередь requeue_webhooks при ошибке.
+    """
+    async with get_redis().pipeline(transaction=False) as pipeline:
+        for _ in range(count):
+            pipeline.lmove(WHATSAPP_WEBHOOK_QUEUE_KEY, WHATSAPP_WEBHOOK_PROCESSING_KEY, "LEFT", "RIGHT")
+        raw = await pipeline.execute()
+    return [item for item in raw if item is not None]
+
+
+def parse_webhooks(raw: List[bytes]) -> List[dict]:
+    events = []
+    for item in raw:
+        try:
+            events.append(json.loads(item))
+        except ValueError:
+            logger.error(f"WhatsApp webhook: некорректный JSON в очереди: {item[:200]!r}")
+    return events
+
+
+async def ack_webhooks(raw: List[bytes]):
+    """Удаляет обработанную пачку из списка обрабатываемых"""
+    async with get_redis().pipeline(transaction=False) as pipeline:
+        for item in raw:
+            pipeline.lrem(WHATSAPP_WEBHOOK_PROCESSING_KEY, 1, item)
+        await pipeline.execute()
+
+
+async def requeue_webhooks(raw: List[bytes]):
+    """Возвращает необработанную пачку в начало очереди в исходном порядке"""
+    if not raw:
+        return
+    async with get_redis().pipeline(transaction=True) as pipeline:
+        for item in raw:
+            pipeline.lrem(WHATSAPP_WEBHOOK_PROCESSING_KEY, 1, item)
+        pipeline.lpush(WHATSAPP_WEBHOOK_QUEUE_KEY, *reversed(raw))
+        await pipeline.execute()
+
+
+async def recover_webhooks() -> int:
+    """
+    Возвращает в очередь вебхуки, оставшиеся в списке обрабатываемых после
+    падения воркера. Вызывается в начале обработки: флаг schedule_flag не
+    даёт двум обработчикам работать одновременно.
+    """
+    redis = get_redis()
+    recovered = 0
+    while await redis.lmove(WHATSAPP_WEBHOOK_PROCESSING_KEY, WHATSAPP_WEBHOOK_QUEUE_KEY, "RIGHT", "LEFT"):
+        recovered += 1
+    return recovered
+
+
+async def drop_duplicates(events: List[dict]) -> List[dict]:
+    """
+    Оставляет вебхуки, чей idMessage ещё не обработан (см. mark_processed) и
+    не повторяется в самой пачке. Вебхуки без idMessage проходят как есть.
+    """
+    keyed = [event for event in events if event.get("idMessage")]
+    if not keyed:
+        return events
+
+    async with get_redis().pipeline(transaction=False) as pipeline:
+        for event in keyed:
+            pipeline.exists(_dedup_key(str(event["idMessage"])))
+        processed = await pipeline.execute()
+
+    seen = {str(event["idMessage"]) for event, exists in zip(keyed, processed) if exists}
+    result = []
+    for event in events:
+        message_id = event.get("idMessage")
+        if message_id:
+            if str(message_id) in seen:
+                continue
+            seen.add(str(message_id))
+        result.append(event)
+    return result
+
+
+async def mark_processed(events: List[dict]):
+    """
+    Запоминает idMessage обработанных вебхуков на WHATSAPP_WEBHOOK_DEDUP_TTL
+    (Green API повторяет недоставленные вебхуки). Вызывается после коммита,
+    чтобы при ошибке пачка могла быть обработана повторно.
+    """
+    keyed = [event for event in events if event.get("idMessage")]
+    if not keyed:
+        return
+    async with get_redis().pipeline(transaction=False) as pipeline:
+        for event in keyed:
+            pipeline.set(_dedup_key(str(event["idMessage"])), 1, ex=settings.WHATSAPP_WEBHOOK_DEDUP_TTL)
+        await pipeline.execute()
+
+
+class WhatsappInstanceRef(NamedTuple):
+    """Поля WhatsappInstance, нужные для обработки вебхука; не привязаны к сессии"""
+    id: int
+    instance_id: str
+    instance_token: str
+
+
+class WhatsappInstanceCache:
+    """
+    Кэш instance_id (idInstance в Green API) → WhatsappInstanceRef на уровне процесса.
+
+    Отсутствующие в кэше инстансы загружаются одним запросом на пачку вебхуков;
+    записи живут WHATSAPP_INSTANCE_CACHE_TTL секунд, так что смена токена подхватывается
+    без перезапуска воркера.
+    """
+
+    def __init__(self, ttl: int = settings.WHATSAPP_INSTANCE_CACHE_TTL):
+        self.ttl = ttl
+        self._instances: Dict[str, tuple[float, WhatsappInstanceRef]] = {}
+
+    def get(self, instance_id: str) -> Optional[WhatsappInstanceRef]:
+        cached = self._instances.get(instance_id)
+        if cached is None or cached[0] < time.monotonic():
+            return None
+        return cached[1]
+
+    async def resolve(self, instance_repo, instance_ids: Iterable[str]) -> Dict[str, WhatsappInstanceRef]:
+        instance_ids = set(instance_ids)
+        resolved = {instance_id: self.get(instance_id) for instance_id in instance_ids}
+        missing = [instance_id for instance_id, ref in resolved.items() if ref is None]
+        if missing:
+            expires_at = time.monotonic() + self.ttl
+            for instance in await instance_repo.get_by_instance_ids(missing):
+                ref = WhatsappInstanceRef(instance.id, instance.instance_id, instance.instance_token)
+                self._instances[instance.instance_id] = (expires_at, ref)
+                resolved[instance.instance_id] = ref
+        return {instance_id: ref for instance_id, ref in resolved.items() if ref is not None}
+
+
+whatsapp_instance_cache = WhatsappInstanceCache()
@@ -0,0 +1,191 @@
+import asyncio
+import uuid
+from contextlib import asynccontextmanager
+from datetime import datetime, timedelta
+from types import SimpleNamespace
+
+import pytest
+from sqlalchemy import delete, select
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+
+import src.repositories
+from src.core import dramatiq_worker
+from src.core.dramatiq_worker import DramatiqWorker
+from src.models.balance import Balance
+from src.models.organization import Organization
+from src.repositories.balance_ledger import BalanceLedgerRepository, InsufficientFundsError
+
+
+class FakeLedger:
+    def __init__(self, committed=True, funds=True):
+        self.committed = committed
+        self.funds = funds
+        self.calls = []
+
+    async def commit(self, reservation_id, spent):
+        self.calls.append(("commit", reservation_id, spent))
+        return self.committed or reservation_id == "recharge"
+
+    async def reserve(self, organization_id, amount, reference=None):
+        self.calls.append(("reserve", organization_id, amount))
+        return "recharge" if self.funds else None
+
+
+def test_commit_settles_reservation():
+    ledger = FakeLedger()
+    asyncio.run(DramatiqWorker._commit_reservation(ledger, "r1", 5, 1.5, reference="task"))
+    assert ledger.calls == [("commit", "r1", 1.5)]
+
+
+def test_commit_of_released_reservation_debits_again():
+    ledger = FakeLedger(committed=False)
+    asyncio.run(DramatiqWorker._commit_reservation(ledger, "r1", 5, 1.5, reference="task"))
+    assert ledger.calls == [("commit", "r1", 1.5), ("reserve", 5, 1.5), ("commit", "recharge", 1.5)]
+
+
+def test_commit_of_released_reservation_without_funds_fails_task():
+    # Анализ не должен сохраниться без оплаты: исключение откатывает транзакцию с результатом
+    ledger = FakeLedger(committed=False, funds=False)
+    with pytest.raises(InsufficientFundsError):
+        asyncio.run(DramatiqWorker._commit_reservation(ledger, "r1", 5, 1.5, reference="task"))
+    assert ledger.calls == [("commit", "r1", 1.5), ("reserve", 5, 1.5)]
+
+
+def test_sweep_skips_reservations_of_running_tasks():
+    now = datetime.utcnow()
+    session_id = uuid.uuid4()
+    other_session_id = uuid.uuid4()
+    stale = [
+        ("running-task", "task-1", now - timedelta(hours=2)),
+        ("finished-task", "task-2", now - timedelta(hours=2)),
+        ("running-batch", f"batch:{session_id}", now - timedelta(hours=2)),
+        ("finished-batch", f"batch:{other_session_id}", now - timedelta(hours=2)),
+        ("abandoned-task", "task-3", now - timedelta(hours=30)),
+        ("no-reference", None, now - timedelta(hours=2)),
+    ]
+
+    class FakeSession:
+        def __init__(self):
+            # Ответы по порядку запросов: резервы, pending задачи, pending пакеты
+            self.results = [stale, ["task-1", "task-3"], [session_id]]
+
+        async def execute(self, statement):
+            rows = self.results.pop(0)
+            return SimpleNamespace(all=lambda: rows, scalars=lambda: SimpleNamespace(all=lambda: rows))
+
+    stale_ids = asyncio.run(BalanceLedgerRepository(FakeSession()).get_stale_reservation_ids(
+        now - timedelta(hours=1), abandoned_before=now - timedelta(hours=24)
+    ))
+
+    assert stale_ids == ["finished-task", "finished-batch", "abandoned-task", "no-reference"]
+
+
+def test_reserve_without_funds_is_not_retried(monkeypatch):
+    class FakeSession:
+        @asynccontextmanager
+        async def begin(self):
+            yield
+
+    class FakeSessionManager:
+        @asynccontextmanager
+        async def session(self):
+            yield FakeSession()
+
+    class EmptyLedger:
+        def __init__(self, session):
+            pass
+
+        async def reserve(self, organization_id, amount, reference=None):
+            return None
+
+    monkeypatch.setattr(dramatiq_worker, "session_manager", FakeSessionManager())
+    monkeypatch.setattr(src.repositories, "BalanceLedgerRepository", EmptyLedger)
+
+    with pytest.raises(InsufficientFundsError):
+        asyncio.run(DramatiqWorker._reserve_tokens(5, 1.0, reference="task"))
+    for actor in (DramatiqWorker.process_resume, DramatiqWorker.process_resume_interactive):
+        assert InsufficientFundsError in actor.options["throws"]
+
+
+@pytest.fixture
+def ledger_db(migrated_db_url):
+    """(sessionmaker, organization_id) с балансом 10 ATL токенов; организация удаляется после теста"""
+    engine = create_async_engine(migrated_db_url)
+    sessions = async_sessionmaker(engine, expire_on_commit=False)
+
+    async def create():
+        async with sessions() as session:
+            async with session.begin():
+                organization = Organization(name="ledger test", email="ledger@test.local")
+                session.add(organization)
+                await session.flush()
+                session.add(Balance(organization_id=organization.id, atl_tokens=10.0))
+            return organization.id
+
+    async def drop(organization_id):
+        async with sessions() as session:
+            async with session.begin():
+                await session.execute(delete(Organization).where(Organization.id == organization_id))
+        await engine.dispose()
+
+    organization_id = asyncio.run(create())
+    yield sessions, organization_id
+    asyncio.run(drop(organization_id))
+
+
+def _run_in_transaction(sessions, organization_id, action):
+    async def run():
+        async with sessions() as session:
+            async with session.begin():
+                result = await action(BalanceLedgerRepository(session))
+        async with sessions() as session:
+            balance = await session.scalar(
+                select(Balance.atl_tokens).where(Balance.organization_id == organization_id)
+            )
+        return result, balance
+
+    return asyncio.run(run())
+
+
+def test_reserve_and_commit_refunds_unused_part(ledger_db):
+    sessions, organization_id = ledger_db
+    reservation_id, balance = _run_in_transaction(
+        sessions, organization_id, lambda ledger: ledger.reserve(organization_id, 4.0, "task")
+    )
+    assert reservation_id is not None
+    assert balance == pytest.approx(6.0)
+
+    committed, balance = _run_in_transaction(
+        sessions, organization_id, lambda ledger: ledger.commit(reservation_id, 1.5)
+    )
+    assert committed is True
+    assert balance == pytest.approx(8.5)
+
+    # Резерв завершается только один раз
+    assert _run_in_transaction(sessions, organization_id, lambda ledger: ledger.commit(reservation_id, 1.5))[0] is False
+    assert _run_in_transaction(sessions, organization_id, lambda ledger: ledger.release(reservation_id))[0] is False
+
+
+def test_release_returns_reservation(ledger_db):
+    sessions, organization_id = ledger_db
+    reservation_id, _ = _run_in_transaction(
+        sessions, organization_id, lambda ledger: ledger.reserve(organization_id, 4.0, "task")
+    )
+    released, balance = _run_in_transaction(sessions, organization_id, lambda ledger: ledger.release(reservation_id))
+    assert released is True
+    assert balance == pytest.approx(10.0)
+
+    committed, balance = _run_in_transaction(
+        sessions, organization_id, lambda ledger: ledger.commit(reservation_id, 1.0)
+    )
+    assert committed is False
+    assert balance == pytest.approx(10.0)
+
+
+def test_reserve_beyond_balance_is_refused(ledger_db):
+    sessions, organization_id = ledger_db
+    reservation_id, balance = _run_in_transaction(
+        sessions, organization_id, lambda ledger: ledger.reserve(organization_id, 10.5, "task")
+    )
+    assert reservation_id is None
+    assert balance == pytest.approx(10.0)
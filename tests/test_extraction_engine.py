@@ -0,0 +1,61 @@
+import asyncio
+import time
+
+import pytest
+
+from src.services import extraction_engine
+from src.services.extraction_engine import ExtractionEngine, ExtractionTimeoutError
+
+HANG = "application/x-hang"
+
+
+def _extract_or_hang(content_type, content, max_pages):
+    # Выполняется в процессе пула: «зависший» файл никогда не дочитывается
+    if content_type == HANG:
+        time.sleep(60)
+    return content.decode(), 1, "test"
+
+
+@pytest.fixture
+def hanging_parser(monkeypatch):
+    monkeypatch.setattr(extraction_engine, "_run_extraction", _extract_or_hang)
+
+
+def test_timeout_frees_the_worker(hanging_parser):
+    async def scenario():
+        engine = ExtractionEngine(max_workers=1, timeout=0.5)
+        await engine.start()
+        try:
+            with pytest.raises(ExtractionTimeoutError):
+                await engine.extract(HANG, b"")
+            # Единственный воркер не должен остаться занятым зависшим разбором
+            started = time.monotonic()
+            text = await engine.extract("text/plain", b"resume")
+            return text, time.monotonic() - started, engine.stats()
+        finally:
+            await engine.shutdown()
+
+    text, elapsed, stats = asyncio.run(scenario())
+    assert text == "resume"
+    assert elapsed < 0.5
+    assert stats["timeouts_total"] == 1
+    assert stats["files_total"] == 1
+
+
+def test_files_in_flight_survive_a_recycled_pool(hanging_parser):
+    async def scenario():
+        # Один воркер: второй файл ждёт в очереди за зависшим
+        engine = ExtractionEngine(max_workers=1, timeout=0.5)
+        await engine.start()
+        try:
+            return await asyncio.gather(
+                engine.extract(HANG, b""),
+                engine.extract("text/plain", b"resume"),
+                return_exceptions=True
+            )
+        finally:
+            await engine.shutdown()
+
+    hung, text = asyncio.run(scenario())
+    assert isinstance(hung, ExtractionTimeoutError)
+    assert text == "resume"
@@ -0,0 +1,142 @@
+import asyncio
+import time
+from contextlib import asynccontextmanager
+from datetime import datetime, timedelta
+from types import SimpleNamespace
+
+import pytest
+
+from src.core.exceptions import BadRequestException
+from src.core.settings import settings
+from src.services import hh_credentials
+from src.services.hh_credentials import HHCredentialProvider, HHCredentials
+
+
+def _provider_with_expiring_token(monkeypatch):
+    provider = HHCredentialProvider()
+    credentials = HHCredentials(
+        id=1,
+        user_id=7,
+        access_token="token",
+        # Уже пора обновлять в фоне, но синхронно ещё рано
+        expires_at=datetime.utcnow() + timedelta(seconds=settings.HH_TOKEN_MIN_VALIDITY + 60),
+    )
+    provider._cache[7] = (credentials, time.monotonic())
+
+    calls = []
+
+    async def failing_refresh(user_id, force=False):
+        calls.append(user_id)
+        raise RuntimeError("HH unavailable")
+
+    monkeypatch.setattr(provider, "refresh", failing_refresh)
+    return provider, calls
+
+
+def test_failed_background_refresh_backs_off(monkeypatch):
+    provider, calls = _provider_with_expiring_token(monkeypatch)
+
+    async def scenario():
+        for _ in range(5):
+            assert (await provider.get(7)).access_token == "token"
+            await asyncio.sleep(0)
+            await asyncio.gather(*provider._background)
+
+    asyncio.run(scenario())
+    assert calls == [7]
+
+
+def test_background_refresh_retries_after_backoff(monkeypatch):
+    provider, calls = _provider_with_expiring_token(monkeypatch)
+    monkeypatch.setattr(settings, "HH_TOKEN_REFRESH_RETRY_AFTER", 0)
+
+    async def scenario():
+        for _ in range(3):
+            await provider.get(7)
+            await asyncio.gather(*provider._background)
+
+    asyncio.run(scenario())
+    assert calls == [7, 7, 7]
+
+
+def _account(expires_in: int, updated_at=None):
+    return SimpleNamespace(
+        id=1, user_id=7, access_token="old", refresh_token="refresh",
+        expires_at=datetime.utcnow() + timedelta(seconds=expires_in), updated_at=updated_at,
+    )
+
+
+@pytest.fixture
+def refresh_env(monkeypatch):
+    """Провайдер, у которого БД и Redis подменены; open_sessions — сколько сессий БД открыто сейчас"""
+    provider = HHCredentialProvider()
+    state = SimpleNamespace(account=_account(-10), locked=True, open_sessions=0, token_requests=[])
+
+    class FakeRepository:
+        def __init__(self, session):
+            pass
+
+        async def get_hh_account_by_user_id(self, user_id):
+            return state.account
+
+        async def update_hh_account(self, user_id, attributes):
+            state.account = SimpleNamespace(**{**vars(state.account), **attributes})
+            return state.account
+
+    class FakeSession:
+        @asynccontextmanager
+        async def begin(self):
+            yield
+
+    class FakeSessionManager:
+        @asynccontextmanager
+        async def session(self):
+            state.open_sessions += 1
+            try:
+                yield FakeSession()
+            finally:
+                state.open_sessions -= 1
+
+    async def acquire_lock(lock_key):
+        return state.locked, None
+
+    async def request_new_token(refresh_token):
+        state.token_requests.append((refresh_token, state.open_sessions))
+        return {"access_token": "new", "refresh_token": "refresh-2", "expires_in": 3600}
+
+    monkeypatch.setattr(hh_credentials, "HHAccountRepository", FakeRepository)
+    monkeypatch.setattr(hh_credentials, "session_manager", FakeSessionManager())
+    monkeypatch.setattr(provider, "_acquire_refresh_lock", acquire_lock)
+    monkeypatch.setattr(provider, "_request_new_token", request_new_token)
+    return provider, state
+
+
+def test_token_request_runs_outside_db_session(refresh_env):
+    provider, state = refresh_env
+
+    credentials = asyncio.run(provider.refresh(7))
+
+    assert credentials.access_token == "new"
+    # Во время запроса к HH /token ни одна сессия БД не открыта
+    assert state.token_requests == [("refresh", 0)]
+
+
+def test_lock_timeout_returns_token_still_valid(refresh_env):
+    provider, state = refresh_env
+    state.locked = False
+    state.account = _account(settings.HH_TOKEN_REFRESH_AHEAD - 60)
+
+    credentials = asyncio.run(provider.refresh(7))
+
+    assert credentials.access_token == "old"
+    assert state.token_requests == []
+
+
+def test_lock_timeout_never_refreshes_without_lock(refresh_env):
+    provider, state = refresh_env
+    state.locked = False
+
+    with pytest.raises(BadRequestException):
+        asyncio.run(provider.refresh(7))
+    assert state.token_requests == []
+    assert provider.stats()["refresh_lock_timeouts"] == 1
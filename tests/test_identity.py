@@ -0,0 +1,26 @@
+from datetime import datetime, timedelta
+from types import SimpleNamespace
+
+from src.core.identity import Identity
+
+
+def _identity(bought_days_ago: int, active_days: int = 30) -> Identity:
+    return Identity(
+        user=SimpleNamespace(id=1),
+        role=SimpleNamespace(name="employer"),
+        member=None,
+        organization=SimpleNamespace(id=1),
+        balance=None,
+        subscription=SimpleNamespace(bought_date=datetime.utcnow() - timedelta(days=bought_days_ago)),
+        subscription_plan=SimpleNamespace(active_days=active_days),
+    )
+
+
+def test_active_subscription_until_expiration():
+    identity = _identity(bought_days_ago=10)
+    assert identity.active_subscription is identity.subscription
+
+
+def test_expired_subscription_is_not_active():
+    assert _identity(bought_days_ago=31).active_subscription is None
+    assert _identity(bought_days_ago=0)._replace(subscription=None).active_subscription is None
@@ -0,0 +1,217 @@
+import asyncio
+from contextlib import asynccontextmanager
+from types import SimpleNamespace
+
+import pytest
+from sqlalchemy import delete, text
+from sqlalchemy.dialects import postgresql
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+
+from src.core import outbox_relay
+from src.core.outbox_relay import OutboxPublishError, OutboxRelay
+from src.core.settings import settings
+from src.models.outbox import OutboxMessage, OutboxMessageStatus
+from src.repositories.outbox import OutboxRepository
+
+
+class FakeSession:
+    @asynccontextmanager
+    async def begin(self):
+        yield
+
+
+class FakeSessionManager:
+    @asynccontextmanager
+    async def session(self):
+        yield FakeSession()
+
+
+class FakeOutboxRepository:
+    def __init__(self, rows):
+        self.rows = rows
+        self.published = []
+        self.failed = []
+
+    async def claim_batch(self, limit):
+        return self.rows[:limit]
+
+    async def mark_published(self, ids):
+        self.published.extend(ids)
+
+    async def mark_failed(self, ids, error, max_attempts):
+        self.failed.append((ids, error, max_attempts))
+        return ids
+
+    async def purge_published(self, before):
+        return 0
+
+    @staticmethod
+    def to_message(row):
+        return row.message
+
+
+class FakeMessage(str):
+    def __new__(cls, text, actor_name="process_resume"):
+        message = super().__new__(cls, text)
+        message.actor_name = actor_name
+        return message
+
+    def encode(self):
+        return b"{}"
+
+
+class FakeBroker:
+    actors = {"process_resume"}
+
+    def __init__(self):
+        self.sent = []
+
+    def get_actor(self, actor_name):
+        if actor_name not in self.actors:
+            raise LookupError(f"Actor {actor_name} not found")
+
+
+@pytest.fixture
+def relay_env(monkeypatch):
+    rows = [SimpleNamespace(id=i, message=FakeMessage(f"message-{i}")) for i in range(1, 4)]
+    repo = FakeOutboxRepository(rows)
+    broker = FakeBroker()
+    monkeypatch.setattr(outbox_relay, "session_manager", FakeSessionManager())
+    monkeypatch.setattr(outbox_relay, "OutboxRepository", lambda session: repo)
+    monkeypatch.setattr(outbox_relay, "redis_broker", broker)
+    return repo, broker
+
+
+def test_relay_publishes_claimed_batch(relay_env):
+    repo, broker = relay_env
+    broker.enqueue_many = broker.sent.extend
+
+    published = asyncio.run(OutboxRelay(batch_size=2).relay_once())
+
+    assert published == 2
+    assert broker.sent == ["message-1", "message-2"]
+    assert repo.published == [1, 2]
+    assert repo.failed == []
+
+
+def test_broker_outage_does_not_count_attempts(relay_env):
+    repo, broker = relay_env
+
+    def enqueue_many(messages):
+        raise ConnectionError("redis is down")
+
+    broker.enqueue_many = enqueue_many
+    relay = OutboxRelay(batch_size=10)
+
+    # Сколько бы ни длился сбой, сообщения остаются в pending
+    for _ in range(20):
+        with pytest.raises(OutboxPublishError):
+            asyncio.run(relay.relay_once())
+
+    assert repo.published == []
+    assert repo.failed == []
+
+
+def test_broker_outage_backs_off_poll_loop(relay_env, monkeypatch):
+    repo, broker = relay_env
+    monkeypatch.setattr(settings, "OUTBOX_MAX_BACKOFF", 4)
+    relay = OutboxRelay(batch_size=10, poll_interval=0.5)
+    delays = []
+    outage = [True] * 5
+
+    def enqueue_many(messages):
+        if outage:
+            outage.pop()
+            raise ConnectionError("redis is down")
+        broker.sent.extend(messages)
+        relay.stop()
+
+    async def fake_wait_for(awaitable, timeout):
+        awaitable.close()
+        delays.append(timeout)
+        raise asyncio.TimeoutError
+
+    broker.enqueue_many = enqueue_many
+    monkeypatch.setattr(outbox_relay.asyncio, "wait_for", fake_wait_for)
+
+    asyncio.run(relay.run())
+
+    # После восстановления пауза возвращается к poll_interval
+    assert delays == [1, 2, 4, 4, 4, 0.5]
+    assert repo.published == [1, 2, 3]
+    assert repo.failed == []
+
+
+def test_unknown_actor_is_dead_lettered_alone(relay_env, monkeypatch):
+    repo, broker = relay_env
+    monkeypatch.setattr(settings, "OUTBOX_MAX_ATTEMPTS", 3)
+    repo.rows[1].message = FakeMessage("message-2", actor_name="removed_actor")
+    broker.enqueue_many = broker.sent.extend
+
+    published = asyncio.run(OutboxRelay(batch_size=10).relay_once())
+
+    assert published == 2
+    assert broker.sent == ["message-1", "message-3"]
+    assert repo.published == [1, 3]
+    assert repo.failed == [([2], "Actor removed_actor not found", 3)]
+
+
+def test_claim_skips_locked_and_non_pending_rows():
+    captured = []
+
+    class CapturingSession:
+        async def execute(self, statement):
+            captured.append(statement)
+            return SimpleNamespace(scalars=lambda: SimpleNamespace(all=lambda: []))
+
+    asyncio.run(OutboxRepository(CapturingSession()).claim_batch(5))
+
+    sql = str(captured[0].compile(dialect=postgresql.dialect(), compile_kwargs={"literal_binds": True}))
+    assert "outbox_messages.status = 'pending'" in sql
+    assert "FOR UPDATE SKIP LOCKED" in sql
+    assert "LIMIT 5" in sql
+
+
+def test_failed_message_goes_dead_and_can_be_redriven(migrated_db_url):
+    async def scenario():
+        engine = create_async_engine(migrated_db_url)
+        sessions = async_sessionmaker(engine, expire_on_commit=False)
+        try:
+            async with sessions() as session:
+                async with session.begin():
+                    await session.execute(delete(OutboxMessage))
+                    await session.execute(text(
+                        "INSERT INTO outbox_messages (actor_name, queue_name, message, created_at) "
+                        "VALUES ('process_resume', 'analysis', '{}', now()), "
+                        "('process_resume', 'analysis', '{}', now())"
+                    ))
+            dead = []
+            for _ in range(2):
+                async with sessions() as session:
+                    async with session.begin():
+                        repo = OutboxRepository(session)
+                        ids = [row.id for row in await repo.claim_batch(1)]
+                        dead += await repo.mark_failed(ids, "unknown actor", max_attempts=2)
+            async with sessions() as session:
+                async with session.begin():
+                    pending = await OutboxRepository(session).claim_batch(10)
+                    statuses = dict((await session.execute(
+                        text("SELECT id, status FROM outbox_messages")
+                    )).all())
+            async with sessions() as session:
+                async with session.begin():
+                    redriven = await OutboxRepository(session).redrive_dead(dead)
+                    after_redrive = await OutboxRepository(session).claim_batch(10)
+                    await session.execute(delete(OutboxMessage))
+            return dead, [row.id for row in pending], statuses, redriven, after_redrive
+        finally:
+            await engine.dispose()
+
+    dead, pending, statuses, redriven, after_redrive = asyncio.run(scenario())
+    assert len(dead) == 1
+    assert statuses[dead[0]] == OutboxMessageStatus.DEAD
+    assert dead[0] not in pending
+    assert len(pending) == 1
+    assert redriven == 1
+    redriven_row = next(row for row in after_redrive if row.id == dead[0])
+    assert (redriven_row.attempts, redriven_row.error) == (0, None)
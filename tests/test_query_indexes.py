@@ -0,0 +1,108 @@
+"""
+Проверка, что горячие выборки репозиториев используют индексы из миграций.
+
+Запросы берутся из самих методов репозиториев: сессия-заглушка перехватывает
+оператор, он компилируется с подставленными значениями и выполняется через
+EXPLAIN на мигрированной базе. Последовательное сканирование отключено, чтобы
+на пустых таблицах планировщик выбирал индекс, если тот подходит к условию.
+"""
+import asyncio
+import json
+import uuid
+
+import pytest
+from sqlalchemy import text
+from sqlalchemy.dialects import postgresql
+from sqlalchemy.ext.asyncio import create_async_engine
+
+from src.core.backend import BackgroundTasksBackend
+from src.repositories import (
+    BalanceUsageRepository,
+    BillingTransactionRepository,
+    ChatHistoryMessageRepository,
+    FavoriteResumeRepository,
+    OrganizationRepository,
+    VacancyRepository,
+)
+from src.repositories.user_interaction_repository import UserInteractionRepository
+
+
+class _Captured(Exception):
+    def __init__(self, statement):
+        self.statement = statement
+
+
+class _CapturingSession:
+    async def execute(self, statement, *args, **kwargs):
+        raise _Captured(statement)
+
+
+def _capture(repository_class, method, *args) -> str:
+    async def call():
+        await getattr(repository_class(_CapturingSession()), method)(*args)
+
+    with pytest.raises(_Captured) as captured:
+        asyncio.run(call())
+    return str(captured.value.statement.compile(
+        dialect=postgresql.dialect(), compile_kwargs={"literal_binds": True}
+    ))
+
+
+def _index_names(plan: dict) -> set:
+    names = {plan["Index Name"]} if "Index Name" in plan else set()
+    for child in plan.get("Plans", []):
+        names |= _index_names(child)
+    return names
+
+
+def _explain(url: str, sql: str) -> set:
+    async def run():
+        engine = create_async_engine(url)
+        try:
+            async with engine.connect() as connection:
+                await connection.execute(text("SET enable_seqscan = off"))
+                result = await connection.execute(text(f"EXPLAIN (FORMAT JSON) {sql}"))
+                plan = result.scalar()
+        finally:
+            await engine.dispose()
+        if isinstance(plan, str):
+            plan = json.loads(plan)
+        return _index_names(plan[0]["Plan"])
+
+    return asyncio.run(run())
+
+
+SESSION_ID = str(uuid.uuid4())
+
+CASES = [
+    (UserInteractionRepository, "get_last_interactions", (["77010000000@c.us", "77010000001@c.us"], 1),
+     "ix_user_interactions_chat_instance_last"),
+    (UserInteractionRepository, "get_interaction_by_chat_id", ("77010000000@c.us", 1),
+     "ix_user_interactions_chat_instance_last"),
+    (UserInteractionRepository, "get_session_chat_ids", (SESSION_ID, ["77010000000@c.us"]),
+     "ix_user_interactions_session_chat"),
+    (UserInteractionRepository, "get_interaction_by_session_id", ("77010000000@c.us", SESSION_ID),
+     "ix_user_interactions_session_chat"),
+    (UserInteractionRepository, "get_ignored_interactions", (SESSION_ID,),
+     "ix_user_interactions_session_ignored"),
+    (BackgroundTasksBackend, "get_by_task_id", ("task-1",), "ix_hr_assistant_tasks_task_id"),
+    (FavoriteResumeRepository, "get_favorite_resumes_by_resume_id", (1,), "ix_favorite_resumes_resume_id"),
+    (FavoriteResumeRepository, "update_favorite_resume", (None, "CA0001", {"is_responded": True}),
+     "ix_favorite_resumes_call_sid"),
+    (VacancyRepository, "get_by_session_id", (SESSION_ID,), "ix_vacancy_session_id"),
+    (ChatHistoryMessageRepository, "get_all_by_session_id", (SESSION_ID,),
+     "ix_chat_history_messages_session_created"),
+    (BalanceUsageRepository, "get_balance_usage", (1, 1, None, None, None), "ix_balance_usage_user_org_created"),
+    (OrganizationRepository, "get_user_organization", (1,), "ix_organization_members_user_id"),
+    (BillingTransactionRepository, "get_by_invoice_id", ("inv-1",), "ix_billing_transactions_invoice_id"),
+]
+
+
+@pytest.mark.parametrize(
+    "repository_class, method, args, index",
+    CASES,
+    ids=[f"{case[0].__name__}.{case[1]}" for case in CASES]
+)
+def test_query_uses_index(migrated_db_url, repository_class, method, args, index):
+    sql = _capture(repository_class, method, *args)
+    assert index in _explain(migrated_db_url, sql)
@@ -0,0 +1,98 @@
+import asyncio
+import uuid
+
+import pytest
+import redis.asyncio as aioredis
+
+from src.core import rate_limit
+from src.core.rate_limit import RedisTokenBucket
+
+
+class FakeRedis:
+    """Вместо Lua-скрипта по очереди отдаёт заранее заданные паузы (мс)"""
+
+    def __init__(self, waits=(), error=None):
+        self.waits = list(waits)
+        self.error = error
+        self.calls = []
+        self.paused = {}
+
+    def register_script(self, script):
+        async def run(keys, args):
+            self.calls.append((keys, args))
+            if self.error:
+                raise self.error
+            return self.waits.pop(0) if self.waits else 0
+
+        return run
+
+    async def set(self, key, value, px):
+        self.paused[key] = px
+
+
+@pytest.fixture
+def fake_redis(monkeypatch):
+    def install(**kwargs):
+        redis = FakeRedis(**kwargs)
+        monkeypatch.setattr(rate_limit, "get_redis", lambda: redis)
+        return redis
+
+    return install
+
+
+def test_acquire_waits_for_token(fake_redis):
+    redis = fake_redis(waits=[20, 10, 0])
+    bucket = RedisTokenBucket("test", rate=5, capacity=2)
+
+    asyncio.run(bucket.acquire("instance"))
+
+    assert len(redis.calls) == 3
+    assert redis.calls[0] == (["test:bucket:instance", "test:pause:instance"], [5, 2])
+
+
+def test_acquire_gives_up_after_timeout(fake_redis):
+    fake_redis(waits=[5000])
+    bucket = RedisTokenBucket("test", rate=0.2, capacity=1)
+
+    with pytest.raises(TimeoutError):
+        asyncio.run(bucket.acquire("instance", timeout=1))
+
+
+def test_acquire_passes_when_redis_is_down(fake_redis):
+    redis = fake_redis(error=ConnectionError("redis is down"))
+    bucket = RedisTokenBucket("test", rate=5, capacity=2)
+
+    asyncio.run(bucket.acquire("instance"))
+
+    assert len(redis.calls) == 1
+
+
+def test_pause_sets_pause_key(fake_redis):
+    redis = fake_redis()
+    asyncio.run(RedisTokenBucket("test", rate=5, capacity=2).pause("instance", 1.5))
+    assert redis.paused == {"test:pause:instance": 1500}
+
+
+def test_bucket_limits_burst_and_respects_pause(redis_url, monkeypatch):
+    async def scenario():
+        client = aioredis.from_url(redis_url)
+        monkeypatch.setattr(rate_limit, "get_redis", lambda: client)
+        bucket = RedisTokenBucket(f"test:{uuid.uuid4().hex}", rate=10, capacity=3)
+        script = client.register_script(rate_limit._TOKEN_BUCKET_LUA)
+        try:
+            burst = [await script(keys=bucket._keys("a"), args=[10, 3]) for _ in range(4)]
+            # Другой ключ не делит корзину с первым
+            other = await script(keys=bucket._keys("b"), args=[10, 3])
+            await bucket.pause("b", 0.5)
+            paused = await script(keys=bucket._keys("b"), args=[10, 3])
+            return burst, other, paused
+        finally:
+            await client.delete(*bucket._keys("a"), *bucket._keys("b"))
+            await client.aclose()
+
+    burst, other, paused = asyncio.run(scenario())
+    assert burst[:3] == [0, 0, 0]
+    # Токен пополняется за 100 мс при rate=10
+    assert 0 < burst[3] <= 100
+    assert other == 0
+    assert 0 < paused <= 500
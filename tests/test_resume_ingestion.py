@@ -0,0 +1,88 @@
+import asyncio
+
+import pytest
+
+from src.services.resume_ingestion import INGESTION_INTERRUPTED, ResumeIngestionPipeline
+
+
+class FakeUpload:
+    content_type = "text/plain"
+
+    def __init__(self, filename: str, content: bytes):
+        self.filename = filename
+        self.content = content
+
+    async def read(self) -> bytes:
+        return self.content
+
+    async def close(self):
+        pass
+
+
+class FakeExtractor:
+    async def extract_text_from_bytes(self, content, content_type, filename):
+        return content.decode()
+
+
+class FakeMinio:
+    def __init__(self, broken=()):
+        self.broken = set(broken)
+
+    async def upload_single_file(self, content, file_key):
+        if content.decode() in self.broken:
+            raise ConnectionError("minio is down")
+        return f"http://minio/{file_key}", file_key
+
+
+def _pipeline(minio=None) -> ResumeIngestionPipeline:
+    return ResumeIngestionPipeline(FakeExtractor(), minio or FakeMinio(), batch_size=1, flush_interval=0.05)
+
+
+def _run(pipeline, uploads, on_batch):
+    return asyncio.run(pipeline.run(uploads, "session", on_batch))
+
+
+def test_empty_and_failed_files_are_not_duplicates():
+    enqueued = []
+
+    async def on_batch(batch):
+        enqueued.extend(item.filename for item in batch)
+
+    uploads = [
+        FakeUpload("a.txt", b"resume a"),
+        FakeUpload("a-copy.txt", b"resume a"),
+        FakeUpload("scan.txt", b"   "),
+        FakeUpload("b.txt", b"resume b"),
+    ]
+    stats = _run(_pipeline(FakeMinio(broken={"resume b"})), uploads, on_batch)
+
+    assert enqueued == ["a.txt"] or enqueued == ["a-copy.txt"]
+    assert stats.duplicates == 1
+    assert stats.empty_files == ["scan.txt"]
+    assert stats.failed_files == ["b.txt"]
+    assert stats.enqueued == 1
+    assert stats.error is None
+
+
+def test_failure_after_first_batch_reports_partial_result():
+    calls = []
+
+    async def on_batch(batch):
+        calls.append(batch)
+        if len(calls) > 1:
+            raise RuntimeError("connection to postgresql://user:secret@db failed")
+
+    uploads = [FakeUpload(f"{i}.txt", f"resume {i}".encode()) for i in range(5)]
+    stats = _run(_pipeline(), uploads, on_batch)
+
+    assert stats.enqueued == 1
+    # Текст исключения (DSN, SQL) не попадает в ответ клиенту
+    assert stats.error == INGESTION_INTERRUPTED
+
+
+def test_failure_before_any_batch_is_raised():
+    async def on_batch(batch):
+        raise RuntimeError("database is down")
+
+    with pytest.raises(RuntimeError):
+        _run(_pipeline(), [FakeUpload("a.txt", b"resume a")], on_batch)
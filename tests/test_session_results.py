@@ -0,0 +1,89 @@
+import asyncio
+import importlib.util
+import uuid
+from pathlib import Path
+from types import SimpleNamespace
+
+import pytest
+from sqlalchemy.dialects import postgresql
+
+from src.core.backend import (
+    NO_SCORE,
+    BackgroundTasksBackend,
+    decode_results_cursor,
+    encode_results_cursor,
+    get_task_score,
+)
+
+
+@pytest.mark.parametrize("value, score", [
+    ("85", 85),
+    (85, 85),
+    (72.9, 72),
+    ("72.5", 72),
+    ("90%", 90),
+    (" 64 % ", 64),
+    ("", 0),
+    ("n/a", 0),
+    (None, 0),
+])
+def test_task_score_parses_matching_percentage(value, score):
+    assert get_task_score({"analysis": {"matching_percentage": value}}, "completed") == score
+
+
+def test_migration_backfill_matches_task_score():
+    # Миграция c41e8a7f5d29 держит свою копию разбора; расхождение с текущим
+    # кодом значит, что старые задачи нужно пересчитать новой миграцией
+    path = next(Path(__file__).resolve().parent.parent.glob("migrations/versions/c41e8a7f5d29*.py"))
+    spec = importlib.util.spec_from_file_location("score_migration", path)
+    migration = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(migration)
+    for value in ["85", 72.9, "90%", " 64 % ", "", "n/a", None]:
+        result_data = {"analysis": {"matching_percentage": value}}
+        assert migration._task_score(result_data) == get_task_score(result_data, "completed")
+    assert migration._task_score({"analysis": "broken"}) == 0
+
+
+def test_task_score_without_result():
+    assert get_task_score({"analysis": "broken"}, "completed") == 0
+    assert get_task_score(None, "completed") == 0
+    assert get_task_score({"analysis": {"matching_percentage": 90}}, "failed") == NO_SCORE
+
+
+@pytest.mark.parametrize("score, task_id", [(97, 12345), (0, 1), (NO_SCORE, 42)])
+def test_results_cursor_round_trip(score, task_id):
+    assert decode_results_cursor(encode_results_cursor(score, task_id)) == (score, task_id)
+
+
+class CapturingSession:
+    def __init__(self):
+        self.statements = []
+
+    async def execute(self, statement):
+        self.statements.append(statement)
+        return SimpleNamespace(all=lambda: [])
+
+    async def scalar(self, statement):
+        return 0
+
+
+def _results_sql(**kwargs) -> str:
+    session = CapturingSession()
+    asyncio.run(BackgroundTasksBackend(session).get_results_by_session_id(str(uuid.uuid4()), 1, **kwargs))
+    return str(session.statements[0].compile(
+        dialect=postgresql.dialect(), compile_kwargs={"literal_binds": True}
+    ))
+
+
+def test_results_page_uses_keyset_after_cursor():
+    sql = _results_sql(limit=20, cursor=(55, 1000))
+    assert "(hr_assistant_tasks.score, hr_assistant_tasks.id) < (55, 1000)" in sql
+    assert "ORDER BY hr_assistant_tasks.score DESC, hr_assistant_tasks.id DESC" in sql
+    assert "LIMIT 20" in sql
+    assert "OFFSET" not in sql
+
+
+def test_results_first_page_uses_offset():
+    sql = _results_sql(offset=40, limit=20)
+    assert "OFFSET 40" in sql
+    assert "(hr_assistant_tasks.score, hr_assistant_tasks.id) <" not in sql
@@ -0,0 +1,43 @@
+import asyncio
+import uuid
+
+import pytest
+import redis
+
+from src.core.dramatiq_middlewares import _DEQUEUE_LUA
+from src.core.exceptions import ForbiddenException
+from src.models.role import RoleEnum
+from src.routers.api.v1 import metrics
+
+
+@pytest.mark.parametrize("role", [RoleEnum.EMPLOYER.value, RoleEnum.ADMIN.value])
+def test_tenant_metrics_are_hidden_from_customers(role, monkeypatch):
+    monkeypatch.setattr(metrics, "get_tenant_queue_stats", lambda client: pytest.fail("stats were read"))
+    with pytest.raises(ForbiddenException):
+        asyncio.run(metrics.tenant_queue_metrics(current_user={"sub": 1, "role": role}))
+
+
+def test_tenant_metrics_for_super_admin(monkeypatch):
+    monkeypatch.setattr(metrics, "get_tenant_queue_stats", lambda client: {"tenants": {}})
+    result = asyncio.run(metrics.tenant_queue_metrics(current_user={"sub": 1, "role": RoleEnum.SUPER_ADMIN.value}))
+    assert result == {"tenants": {}}
+
+
+def test_queued_counter_is_removed_at_zero(redis_url):
+    client = redis.Redis.from_url(redis_url)
+    key = f"test:tenants:queued:{uuid.uuid4().hex}"
+    dequeue = client.register_script(_DEQUEUE_LUA)
+    try:
+        client.hincrby(key, "7", 2)
+        assert dequeue(keys=[key], args=["7"]) == 1
+        assert client.hexists(key, "7")
+        assert dequeue(keys=[key], args=["7"]) == 0
+        assert not client.hexists(key, "7")
+
+        # Сообщение взято раньше, чем учтено: -1 сохраняется до HINCRBY из after_enqueue
+        assert dequeue(keys=[key], args=["8"]) == -1
+        client.hincrby(key, "8", 1)
+        assert int(client.hget(key, "8")) == 0
+    finally:
+        client.delete(key)
+        client.close()
@@ -0,0 +1,106 @@
+import asyncio
+
+import pytest
+
+from src.services import websocket
+from src.services.websocket import ConnectionManager
+
+
+class FakeRedis:
+    def __init__(self):
+        self.published = []
+
+    def pubsub(self):
+        raise ConnectionError("pub/sub is not available in tests")
+
+    async def publish(self, channel, message):
+        self.published.append((channel, message))
+
+
+class FakeWebSocket:
+    def __init__(self):
+        self.sent = []
+
+    async def accept(self):
+        pass
+
+    async def send_json(self, message):
+        self.sent.append(message)
+
+    async def close(self, code=None):
+        pass
+
+
+@pytest.fixture
+def redis(monkeypatch):
+    fake = FakeRedis()
+    monkeypatch.setattr(websocket, "get_redis", lambda: fake)
+    return fake
+
+
+def run(coro):
+    return asyncio.run(coro)
+
+
+def test_progress_is_coalesced(redis):
+    async def scenario():
+        manager = ConnectionManager(coalesce_interval=0.05)
+        socket = FakeWebSocket()
+        await manager.connect(1, socket)
+        for done in range(10):
+            await manager.send_progress(1, {"status": "RUNNING", "done": done})
+        await asyncio.sleep(0.15)
+        await manager.close()
+        return socket.sent
+
+    assert run(scenario()) == [{"status": "RUNNING", "done": 9}]
+
+
+def test_terminal_message_is_not_overtaken_by_pending_progress(redis):
+    async def scenario():
+        manager = ConnectionManager(coalesce_interval=0.05)
+        socket = FakeWebSocket()
+        await manager.connect(1, socket)
+        await manager.send_progress(1, {"status": "RUNNING"})
+        await manager.send_json(1, {"status": "COMPLETED"})
+        await asyncio.sleep(0.15)
+        flush_scheduled = manager._flush_handle is not None
+        await manager.close()
+        return socket.sent, flush_scheduled
+
+    sent, flush_scheduled = run(scenario())
+    assert sent == [{"status": "COMPLETED"}]
+    assert not flush_scheduled
+
+
+def test_progress_of_other_channels_is_still_flushed(redis):
+    async def scenario():
+        manager = ConnectionManager(coalesce_interval=0.05)
+        first, second = FakeWebSocket(), FakeWebSocket()
+        await manager.connect(1, first)
+        await manager.connect(2, second)
+        await manager.send_progress(1, {"status": "RUNNING"})
+        await manager.send_progress(2, {"status": "RUNNING"})
+        await manager.send_json(1, {"status": "FAILED"})
+        await asyncio.sleep(0.15)
+        await manager.close()
+        return first.sent, second.sent
+
+    first_sent, second_sent = run(scenario())
+    assert first_sent == [{"status": "FAILED"}]
+    assert second_sent == [{"status": "RUNNING"}]
+
+
+def test_subscriber_drops_queued_progress_before_regular_message(redis):
+    async def scenario():
+        manager = ConnectionManager()
+        socket = FakeWebSocket()
+        await manager.connect(1, socket)
+        # Оба сообщения попадают в очередь сокета до того, как отправитель проснётся
+        manager._deliver_local("user:1", {"status": "RUNNING"}, coalesce=True)
+        manager._deliver_local("user:1", {"status": "COMPLETED"}, coalesce=False)
+        await asyncio.sleep(0.05)
+        await manager.close()
+        return socket.sent
+
+    assert run(scenario()) == [{"status": "COMPLETED"}]
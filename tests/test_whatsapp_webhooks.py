@@ -0,0 +1,188 @@
+import asyncio
+import json
+from contextlib import asynccontextmanager
+
+import pytest
+
+from src.controllers import whatsapp_webhook_controller
+from src.core import dramatiq_worker
+from src.core.dramatiq_worker import DramatiqWorker
+from src.core.settings import settings
+from src.services import whatsapp_webhooks
+from src.services.whatsapp_webhooks import (
+    WHATSAPP_WEBHOOK_PROCESSING_KEY,
+    WHATSAPP_WEBHOOK_QUEUE_KEY,
+    drop_duplicates,
+)
+
+
+class FakeRedis:
+    """Списки и ключи Redis в памяти; команды pipeline выполняются сразу"""
+
+    def __init__(self):
+        self.lists = {}
+        self.keys = {}
+
+    def pipeline(self, transaction=False):
+        redis = self
+
+        class Pipeline:
+            def __init__(self):
+                self.results = []
+
+            async def __aenter__(self):
+                return self
+
+            async def __aexit__(self, *exc):
+                return False
+
+            def __getattr__(self, name):
+                def command(*args, **kwargs):
+                    self.results.append(getattr(redis, "_" + name)(*args, **kwargs))
+                return command
+
+            async def execute(self):
+                return self.results
+
+        return Pipeline()
+
+    def _lmove(self, source, destination, where_from, where_to):
+        items = self.lists.setdefault(source, [])
+        if not items:
+            return None
+        item = items.pop(0 if where_from == "LEFT" else -1)
+        target = self.lists.setdefault(destination, [])
+        target.insert(0 if where_to == "LEFT" else len(target), item)
+        return item
+
+    def _lrem(self, key, count, value):
+        items = self.lists.setdefault(key, [])
+        if value in items:
+            items.remove(value)
+            return 1
+        return 0
+
+    def _lpush(self, key, *values):
+        for value in values:
+            self.lists.setdefault(key, []).insert(0, value)
+
+    def _rpush(self, key, value):
+        self.lists.setdefault(key, []).append(value)
+
+    def _exists(self, key):
+        return int(key in self.keys)
+
+    def _set(self, key, value, nx=False, ex=None):
+        if nx and key in self.keys:
+            return None
+        self.keys[key] = value
+        return True
+
+    async def lmove(self, *args):
+        return self._lmove(*args)
+
+    async def delete(self, key):
+        self.keys.pop(key, None)
+
+    async def llen(self, key):
+        return len(self.lists.get(key, []))
+
+    async def set(self, *args, **kwargs):
+        return self._set(*args, **kwargs)
+
+
+def _webhook(message_id: str) -> bytes:
+    return json.dumps({
+        "typeWebhook": "incomingMessageReceived",
+        "idMessage": message_id,
+        "instanceData": {"idInstance": 1},
+    }).encode()
+
+
+@pytest.fixture
+def redis(monkeypatch):
+    redis = FakeRedis()
+    monkeypatch.setattr(whatsapp_webhooks, "get_redis", lambda: redis)
+    return redis
+
+
+@pytest.fixture
+def worker_env(redis, monkeypatch):
+    """Запуск актора process_whatsapp_webhooks с подменённым контроллером"""
+    processed = []
+    scheduled = []
+
+    class FakeSessionManager:
+        @asynccontextmanager
+        async def session(self):
+            yield None
+
+    def run(process_webhooks):
+        class FakeController:
+            def __init__(self, session):
+                pass
+
+        FakeController.process_webhooks = staticmethod(process_webhooks)
+        monkeypatch.setattr(whatsapp_webhook_controller, "WhatsappWebhookController", FakeController)
+        asyncio.run(DramatiqWorker.process_whatsapp_webhooks.fn.__wrapped__())
+
+    monkeypatch.setattr(dramatiq_worker, "session_manager", FakeSessionManager())
+    monkeypatch.setattr(
+        DramatiqWorker.process_whatsapp_webhooks, "send_with_options", lambda **kwargs: scheduled.append(kwargs)
+    )
+    return run, processed, scheduled
+
+
+def test_failed_batch_goes_back_to_queue(redis, worker_env):
+    run, processed, scheduled = worker_env
+    redis.lists[WHATSAPP_WEBHOOK_QUEUE_KEY] = [_webhook("a"), _webhook("b")]
+
+    async def failing(events):
+        raise RuntimeError("database is down")
+
+    run(failing)
+
+    assert redis.lists[WHATSAPP_WEBHOOK_QUEUE_KEY] == [_webhook("a"), _webhook("b")]
+    assert redis.lists[WHATSAPP_WEBHOOK_PROCESSING_KEY] == []
+    assert scheduled == [{"delay": settings.WHATSAPP_WEBHOOK_RETRY_DELAY_MS}]
+
+    async def succeeding(events):
+        processed.extend(event["idMessage"] for event in events)
+        return {}
+
+    run(succeeding)
+
+    assert processed == ["a", "b"]
+    assert redis.lists[WHATSAPP_WEBHOOK_QUEUE_KEY] == []
+    assert redis.lists[WHATSAPP_WEBHOOK_PROCESSING_KEY] == []
+
+
+def test_batch_left_by_crashed_worker_is_recovered(redis, worker_env):
+    run, processed, scheduled = worker_env
+    redis.lists[WHATSAPP_WEBHOOK_PROCESSING_KEY] = [_webhook("a")]
+    redis.lists[WHATSAPP_WEBHOOK_QUEUE_KEY] = [_webhook("b")]
+
+    async def succeeding(events):
+        processed.extend(event["idMessage"] for event in events)
+        return {}
+
+    run(succeeding)
+
+    assert processed == ["a", "b"]
+    assert redis.lists[WHATSAPP_WEBHOOK_PROCESSING_KEY] == []
+
+
+def test_duplicates_are_dropped_only_after_processing(redis):
+    events = [json.loads(_webhook("a")), json.loads(_webhook("a")), json.loads(_webhook("b"))]
+
+    async def scenario():
+        first = await drop_duplicates(events)
+        # Пачка не обработана — повторная доставка не считается дублем
+        retry = await drop_duplicates(events)
+        await whatsapp_webhooks.mark_processed(first)
+        return first, retry, await drop_duplicates(events)
+
+    first, retry, after_commit = asyncio.run(scenario())
+    assert [event["idMessage"] for event in first] == ["a", "b"]
+    assert [event["idMessage"] for event in retry] == ["a", "b"]
+    assert after_commit == []